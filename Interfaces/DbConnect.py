@@ -27,6 +27,22 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# Colunas da tabela de cotas, na ordem exata do INSERT (73)
+COLUNAS_TABELA_COTAS = [
+    'codigo_estacao', 'data', 'hora', 'tipo_medicao_cota', 'nivel_consistencia',
+    'cota01', 'cota02', 'cota03', 'cota04', 'cota05', 'cota06', 'cota07', 'cota08', 'cota09', 'cota10',
+    'cota11', 'cota12', 'cota13', 'cota14', 'cota15', 'cota16', 'cota17', 'cota18', 'cota19', 'cota20',
+    'cota21', 'cota22', 'cota23', 'cota24', 'cota25', 'cota26', 'cota27', 'cota28', 'cota29', 'cota30',
+    'cota31', 'cota_maxima', 'cota_minima', 'cota_media',
+    'cota01_status', 'cota02_status', 'cota03_status', 'cota04_status', 'cota05_status',
+    'cota06_status', 'cota07_status', 'cota08_status', 'cota09_status', 'cota10_status',
+    'cota11_status', 'cota12_status', 'cota13_status', 'cota14_status', 'cota15_status',
+    'cota16_status', 'cota17_status', 'cota18_status', 'cota19_status', 'cota20_status',
+    'cota21_status', 'cota22_status', 'cota23_status', 'cota24_status', 'cota25_status',
+    'cota26_status', 'cota27_status', 'cota28_status', 'cota29_status', 'cota30_status',
+    'cota31_status', 'cota_maxima_status', 'cota_minima_status', 'cota_media_status'
+]
+
 class DatabaseConnection:
     """Classe para gerenciar conexões com PostgreSQL"""
     
@@ -517,108 +533,12 @@ class HidrowebDatabase:
             for i, row in df.head(3).iterrows():
                 logger.info(f"  Linha {i+1}: Estacao={row.get('codigo_estacao')}, Data={row.get('data')}, Hora={row.get('hora')}")
             
-            # DEFINIR AS 73 COLUNAS DA TABELA NA ORDEM EXATA
-            colunas_tabela = [
-                'codigo_estacao', 'data', 'hora', 'tipo_medicao_cota', 'nivel_consistencia',
-                'cota01', 'cota02', 'cota03', 'cota04', 'cota05', 'cota06', 'cota07', 'cota08', 'cota09', 'cota10',
-                'cota11', 'cota12', 'cota13', 'cota14', 'cota15', 'cota16', 'cota17', 'cota18', 'cota19', 'cota20',
-                'cota21', 'cota22', 'cota23', 'cota24', 'cota25', 'cota26', 'cota27', 'cota28', 'cota29', 'cota30',
-                'cota31', 'cota_maxima', 'cota_minima', 'cota_media',
-                'cota01_status', 'cota02_status', 'cota03_status', 'cota04_status', 'cota05_status',
-                'cota06_status', 'cota07_status', 'cota08_status', 'cota09_status', 'cota10_status',
-                'cota11_status', 'cota12_status', 'cota13_status', 'cota14_status', 'cota15_status',
-                'cota16_status', 'cota17_status', 'cota18_status', 'cota19_status', 'cota20_status',
-                'cota21_status', 'cota22_status', 'cota23_status', 'cota24_status', 'cota25_status',
-                'cota26_status', 'cota27_status', 'cota28_status', 'cota29_status', 'cota30_status',
-                'cota31_status', 'cota_maxima_status', 'cota_minima_status', 'cota_media_status'
-            ]
+            colunas_tabela = COLUNAS_TABELA_COTAS
             
             logger.info(f"INFO - Tabela espera {len(colunas_tabela)} colunas, CSV tem {len(df.columns)} colunas")
             
             # Preparar dados para inserção com conversão correta de tipos
-            dados_para_inserir = []
-            registros_com_erro = 0
-            registros_processados = 0
-            
-            logger.info("INFO - Iniciando processamento dos registros...")
-            
-            for index, row in df.iterrows():
-                registros_processados += 1
-                
-                # Log de progresso a cada 1000 registros
-                if registros_processados % 1000 == 0:
-                    porcentagem = (registros_processados/len(df)*100)
-                    logger.info(f"INFO - Processados: {registros_processados}/{len(df)} registros ({porcentagem:.1f}%)")
-                
-                try:
-                    # Função melhorada para conversão segura
-                    def safe_convert(value, tipo='float', nome_campo=''):
-                        try:
-                            if pd.isna(value) or value == '' or value is None:
-                                return None
-                            
-                            if tipo == 'int':
-                                # Converter float para int (importante para os status)
-                                if isinstance(value, float):
-                                    return int(value) if not pd.isna(value) else 0
-                                return int(float(value))
-                            elif tipo == 'str':
-                                return str(value).strip()
-                            else:  # float
-                                return float(value)
-                        except (ValueError, TypeError) as e:
-                            if registros_com_erro < 5:  # Log apenas os primeiros 5 erros
-                                logger.warning(f"AVISO - Erro ao converter {nome_campo}='{value}' para {tipo} na linha {index+1}: {e}")
-                            return None
-                    
-                    # PROCESSAR TODAS AS 73 COLUNAS NA ORDEM CORRETA
-                    dados_linha = []
-                    
-                    for coluna in colunas_tabela:
-                        if coluna == 'codigo_estacao':
-                            valor = safe_convert(row.get(coluna), 'int', coluna)
-                        elif coluna in ['data', 'hora']:
-                            valor = safe_convert(row.get(coluna), 'str', coluna)
-                        elif coluna in ['tipo_medicao_cota', 'nivel_consistencia']:
-                            valor = safe_convert(row.get(coluna, 1), 'int', coluna)
-                            if valor is None:
-                                valor = 1  # Valores padrão conforme estrutura da tabela
-                        elif coluna.endswith('_status'):
-                            # IMPORTANTE: Converter status de float para int
-                            valor_original = row.get(coluna, 0)
-                            if pd.isna(valor_original) or valor_original == '':
-                                valor = 0
-                            else:
-                                try:
-                                    valor = int(float(valor_original))  # Converter float->int
-                                except (ValueError, TypeError):
-                                    valor = 0
-                        else:  # cotas e estatísticas (float/real)
-                            valor = safe_convert(row.get(coluna), 'float', coluna)
-                        
-                        dados_linha.append(valor)
-                    
-                    # Verificar se os dados principais são válidos
-                    if dados_linha[0] is None or dados_linha[1] is None:  # codigo_estacao ou data
-                        if registros_com_erro < 5:
-                            logger.warning(f"AVISO - Linha {index+1} ignorada: codigo_estacao={dados_linha[0]}, data={dados_linha[1]}")
-                        registros_com_erro += 1
-                        continue
-                    
-                    # Verificar se temos exatamente 73 valores
-                    if len(dados_linha) != 73:
-                        logger.error(f"ERRO - Linha {index+1} tem {len(dados_linha)} valores, esperado 73")
-                        registros_com_erro += 1
-                        continue
-                    
-                    # Converter para tupla e adicionar
-                    dados_para_inserir.append(tuple(dados_linha))
-                    
-                except Exception as e:
-                    registros_com_erro += 1
-                    if registros_com_erro <= 5:  # Log apenas os primeiros 5 erros
-                        logger.warning(f"AVISO - Erro na linha {index + 1}: {e}")
-                    continue
+            dados_para_inserir, registros_com_erro = self.preparar_registros(df)
             
             # Resumo do processamento
             logger.info(f"INFO - RESUMO DO PROCESSAMENTO:")
@@ -626,36 +546,117 @@ class HidrowebDatabase:
             logger.info(f"  Registros validos processados: {len(dados_para_inserir)}")
             logger.info(f"  Registros com erro ignorados: {registros_com_erro}")
             
-            if not dados_para_inserir:
-                logger.error("ERRO - Nenhum registro valido para inserir!")
-                return False
-            
-            # NOVO: Verificar duplicatas antes da inserção
-            stats_duplicatas = self.verificar_duplicatas_antes_insercao(dados_para_inserir)
-            
-            # NOVO: Verificar locks antes de iniciar
-            logger.info("INFO - Verificando locks ativos na tabela...")
-            locks_ativos = self.db.verificar_locks_ativos()
-            
-            if locks_ativos:
-                logger.warning("AVISO - Locks ativos detectados. Isso pode causar timeout!")
-                for lock in locks_ativos[:3]:  # Mostrar apenas os primeiros 3
-                    logger.warning(f"  Lock: {lock.get('table_name')} - {lock.get('mode')}")
-            
-            # Testar conexão antes da inserção
-            logger.info("INFO - Testando conexao com banco antes da insercao...")
-            if not self.db.testar_conexao():
-                logger.error("ERRO - Conexao com banco falhou!")
-                return False
+            return self.inserir_registros(dados_para_inserir)
+                
+        except Exception as e:
+            logger.error(f"ERRO - Falha na insercao segura: {e}")
+            import traceback
+            logger.error(f"Traceback: {traceback.format_exc()}")
+            return False
+    
+    def preparar_registros(self, df: pd.DataFrame) -> Tuple[List[tuple], int]:
+        """
+        Converte as linhas de um DataFrame no padrão do consolidado em tuplas com
+        as 73 colunas da tabela, na ordem do INSERT.
+        
+        Args:
+            df: DataFrame com as colunas do arquivo consolidado
             
-            logger.info("SUCESSO - Conexao com banco OK, iniciando insercao...")
+        Returns:
+            Tupla (registros válidos, quantidade de linhas ignoradas por erro)
+        """
+        colunas_tabela = COLUNAS_TABELA_COTAS
+        
+        # Preparar dados para inserção com conversão correta de tipos
+        dados_para_inserir = []
+        registros_com_erro = 0
+        registros_processados = 0
+        
+        logger.info("INFO - Iniciando processamento dos registros...")
+        
+        for index, row in df.iterrows():
+            registros_processados += 1
             
-            # Obter contagem inicial da tabela
-            stats_inicial = self.obter_estatisticas_tabela()
-            contagem_inicial = stats_inicial['total_registros'] if stats_inicial else 0
+            # Log de progresso a cada 1000 registros
+            if registros_processados % 1000 == 0:
+                porcentagem = (registros_processados/len(df)*100)
+                logger.info(f"INFO - Processados: {registros_processados}/{len(df)} registros ({porcentagem:.1f}%)")
             
-            # SQL OTIMIZADO COM DO NOTHING - Muito mais rápido e seguro!
-            sql_insert = f"""
+            try:
+                # Função melhorada para conversão segura
+                def safe_convert(value, tipo='float', nome_campo=''):
+                    try:
+                        if pd.isna(value) or value == '' or value is None:
+                            return None
+                        
+                        if tipo == 'int':
+                            # Converter float para int (importante para os status)
+                            if isinstance(value, float):
+                                return int(value) if not pd.isna(value) else 0
+                            return int(float(value))
+                        elif tipo == 'str':
+                            return str(value).strip()
+                        else:  # float
+                            return float(value)
+                    except (ValueError, TypeError) as e:
+                        if registros_com_erro < 5:  # Log apenas os primeiros 5 erros
+                            logger.warning(f"AVISO - Erro ao converter {nome_campo}='{value}' para {tipo} na linha {index+1}: {e}")
+                        return None
+                
+                # PROCESSAR TODAS AS 73 COLUNAS NA ORDEM CORRETA
+                dados_linha = []
+                
+                for coluna in colunas_tabela:
+                    if coluna == 'codigo_estacao':
+                        valor = safe_convert(row.get(coluna), 'int', coluna)
+                    elif coluna in ['data', 'hora']:
+                        valor = safe_convert(row.get(coluna), 'str', coluna)
+                    elif coluna in ['tipo_medicao_cota', 'nivel_consistencia']:
+                        valor = safe_convert(row.get(coluna, 1), 'int', coluna)
+                        if valor is None:
+                            valor = 1  # Valores padrão conforme estrutura da tabela
+                    elif coluna.endswith('_status'):
+                        # IMPORTANTE: Converter status de float para int
+                        valor_original = row.get(coluna, 0)
+                        if pd.isna(valor_original) or valor_original == '':
+                            valor = 0
+                        else:
+                            try:
+                                valor = int(float(valor_original))  # Converter float->int
+                            except (ValueError, TypeError):
+                                valor = 0
+                    else:  # cotas e estatísticas (float/real)
+                        valor = safe_convert(row.get(coluna), 'float', coluna)
+                    
+                    dados_linha.append(valor)
+                
+                # Verificar se os dados principais são válidos
+                if dados_linha[0] is None or dados_linha[1] is None:  # codigo_estacao ou data
+                    if registros_com_erro < 5:
+                        logger.warning(f"AVISO - Linha {index+1} ignorada: codigo_estacao={dados_linha[0]}, data={dados_linha[1]}")
+                    registros_com_erro += 1
+                    continue
+                
+                # Verificar se temos exatamente 73 valores
+                if len(dados_linha) != 73:
+                    logger.error(f"ERRO - Linha {index+1} tem {len(dados_linha)} valores, esperado 73")
+                    registros_com_erro += 1
+                    continue
+                
+                # Converter para tupla e adicionar
+                dados_para_inserir.append(tuple(dados_linha))
+                
+            except Exception as e:
+                registros_com_erro += 1
+                if registros_com_erro <= 5:  # Log apenas os primeiros 5 erros
+                    logger.warning(f"AVISO - Erro na linha {index + 1}: {e}")
+                continue
+        
+        return dados_para_inserir, registros_com_erro
+    
+    def sql_insercao(self) -> str:
+        """INSERT com ON CONFLICT DO NOTHING: não modifica registros já existentes"""
+        return f"""
 INSERT INTO {self.nome_tabela} (
     codigo_estacao, data, hora, tipo_medicao_cota, nivel_consistencia,
     cota01, cota02, cota03, cota04, cota05, cota06, cota07, cota08, cota09, cota10,
@@ -673,48 +674,87 @@ INSERT INTO {self.nome_tabela} (
 ON CONFLICT (codigo_estacao, data, hora, tipo_medicao_cota, nivel_consistencia) 
 DO NOTHING;
 """
+    
+    def inserir_registros(self, dados_para_inserir: List[tuple]) -> bool:
+        """
+        Insere registros já convertidos por preparar_registros, escolhendo a
+        estratégia (lote único ou lotes otimizados) pelo volume.
+        
+        Usado pelo arquivo consolidado (inserir_dados_csv) e por cada bloco do
+        pipeline de carga: ambos passam pelas verificações de duplicatas, locks e
+        conexão e registram quantas linhas o bloco realmente inseriu.
+        
+        Args:
+            dados_para_inserir: Lista de tuplas na ordem de COLUNAS_TABELA_COTAS
             
-            logger.info(f"INFO - Iniciando insercao SEGURA de {len(dados_para_inserir)} registros")
-            logger.info("INFO - Usando ON CONFLICT DO NOTHING para proteger dados existentes")
-            logger.info(f"INFO - Registros na tabela antes: {contagem_inicial}")
-            
-            # Determinar estratégia baseada no tamanho
-            if len(dados_para_inserir) > 1000:
-                # Para grandes volumes: usar lotes otimizados
-                logger.info("INFO - Volume grande detectado, usando insercao em lotes otimizada")
-                batch_size = 1000 if len(dados_para_inserir) < 5000 else 500  # Lotes menores para volumes muito grandes
-                resultado = self.db.executar_lote_otimizado(sql_insert, dados_para_inserir, batch_size)
-            else:
-                # Para volumes pequenos: lote único
-                logger.info("INFO - Volume pequeno, usando lote unico")
-                resultado = self.db.executar_lote(sql_insert, dados_para_inserir)
-            
-            if resultado:
-                # Verificar quantos registros foram realmente inseridos
-                stats_final = self.obter_estatisticas_tabela()
-                contagem_final = stats_final['total_registros'] if stats_final else 0
-                registros_inseridos = contagem_final - contagem_inicial
-                registros_ignorados = len(dados_para_inserir) - registros_inseridos
-                
-                logger.info(f"SUCESSO - INSERCAO SEGURA CONCLUIDA!")
-                logger.info(f"  Registros processados: {len(dados_para_inserir)}")
-                logger.info(f"  Registros realmente inseridos: {registros_inseridos}")
-                logger.info(f"  Registros ja existentes (ignorados): {registros_ignorados}")
-                logger.info(f"  Tabela: {self.nome_tabela}")
-                logger.info(f"  Banco: {self.db.host}:{self.db.port}/{self.db.database}")
-                logger.info(f"  Total de registros na tabela agora: {contagem_final}")
-                logger.info(f"  Estrategia: DO NOTHING (nao sobrescreve dados existentes)")
-                
-                return True
-            else:
-                logger.error("ERRO - Falha na insercao segura!")
-                return False
-                
-        except Exception as e:
-            logger.error(f"ERRO - Falha na insercao segura: {e}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
+        Returns:
+            bool: True se inserido com sucesso
+        """
+        if not dados_para_inserir:
+            logger.error("ERRO - Nenhum registro valido para inserir!")
             return False
+        
+        # Verificar duplicatas antes da inserção
+        self.verificar_duplicatas_antes_insercao(dados_para_inserir)
+        
+        # Verificar locks antes de iniciar
+        logger.info("INFO - Verificando locks ativos na tabela...")
+        locks_ativos = self.db.verificar_locks_ativos()
+        
+        if locks_ativos:
+            logger.warning("AVISO - Locks ativos detectados. Isso pode causar timeout!")
+            for lock in locks_ativos[:3]:  # Mostrar apenas os primeiros 3
+                logger.warning(f"  Lock: {lock.get('table_name')} - {lock.get('mode')}")
+        
+        # Testar conexão antes da inserção
+        logger.info("INFO - Testando conexao com banco antes da insercao...")
+        if not self.db.testar_conexao():
+            logger.error("ERRO - Conexao com banco falhou!")
+            return False
+        
+        logger.info("SUCESSO - Conexao com banco OK, iniciando insercao...")
+        
+        # Obter contagem inicial da tabela
+        stats_inicial = self.obter_estatisticas_tabela()
+        contagem_inicial = stats_inicial['total_registros'] if stats_inicial else 0
+        
+        logger.info(f"INFO - Iniciando insercao SEGURA de {len(dados_para_inserir)} registros")
+        logger.info("INFO - Usando ON CONFLICT DO NOTHING para proteger dados existentes")
+        logger.info(f"INFO - Registros na tabela antes: {contagem_inicial}")
+        
+        sql_insert = self.sql_insercao()
+        
+        # Determinar estratégia baseada no tamanho
+        if len(dados_para_inserir) > 1000:
+            # Para grandes volumes: usar lotes otimizados
+            logger.info("INFO - Volume grande detectado, usando insercao em lotes otimizada")
+            batch_size = 1000 if len(dados_para_inserir) < 5000 else 500  # Lotes menores para volumes muito grandes
+            resultado = self.db.executar_lote_otimizado(sql_insert, dados_para_inserir, batch_size)
+        else:
+            # Para volumes pequenos: lote único
+            logger.info("INFO - Volume pequeno, usando lote unico")
+            resultado = self.db.executar_lote(sql_insert, dados_para_inserir)
+        
+        if not resultado:
+            logger.error("ERRO - Falha na insercao segura!")
+            return False
+        
+        # Verificar quantos registros foram realmente inseridos
+        stats_final = self.obter_estatisticas_tabela()
+        contagem_final = stats_final['total_registros'] if stats_final else 0
+        registros_inseridos = contagem_final - contagem_inicial
+        registros_ignorados = len(dados_para_inserir) - registros_inseridos
+        
+        logger.info(f"SUCESSO - INSERCAO SEGURA CONCLUIDA!")
+        logger.info(f"  Registros processados: {len(dados_para_inserir)}")
+        logger.info(f"  Registros realmente inseridos: {registros_inseridos}")
+        logger.info(f"  Registros ja existentes (ignorados): {registros_ignorados}")
+        logger.info(f"  Tabela: {self.nome_tabela}")
+        logger.info(f"  Banco: {self.db.host}:{self.db.port}/{self.db.database}")
+        logger.info(f"  Total de registros na tabela agora: {contagem_final}")
+        logger.info(f"  Estrategia: DO NOTHING (nao sobrescreve dados existentes)")
+        
+        return True
     
     def consultar_estacao(self, codigo_estacao: str, limite: int = 10) -> Optional[List[Dict]]:
         """
@@ -27,8 +27,11 @@ sys.path.insert(0, str(scripts_dir))
 # 🔧 CORREÇÃO: Imports absolutos ao invés de relativos
 try:
     from logica.play import baixar_estacoes
-    from logica.consumo import criar_pasta_base, criar_estrutura_pastas
-    from logica.extracaoZip import processar_estacoes_completo, limpar_arquivos_temporarios
+    from logica.sessaoNavegador import encerrar_sessao
+    from logica.consumo import criar_pasta_base, criar_estrutura_pastas, listar_estacoes_baixadas
+    from logica.diario import carregar_ultima_execucao_incompleta, descartar_ultima_execucao
+    from logica.extracaoZip import limpar_arquivos_temporarios
+    from logica.pipelineCarga import PipelineCarga
     from Interfaces.loginBanco import LoginBanco
     from logica.LogManager import log_manager, DialogManager
     print("✅ Todos os módulos importados com sucesso!")
@@ -190,18 +193,22 @@ def atualizar_progresso_adaptativo(etapa, atual, total, texto="", tipo="contagem
         
         janela.after_idle(lambda: None)
 
-def executar_consulta(tipo_consulta="consultadas"):
-    """Executa consulta simples (apenas salva arquivos ZIP) - VERSÃO MELHORADA"""
+def executar_consulta(tipo_consulta="consultadas", codigos=None, retomar_de=None):
+    """
+    Executa consulta simples (apenas salva arquivos ZIP) - VERSÃO MELHORADA
+    codigos/retomar_de: usados ao retomar uma execução interrompida (ver oferecer_retomada)
+    """
     global processo_ativo, parar_flag
     if processo_ativo:
         return
     parar_flag = False
     
-    codigos = obter_codigos_validos()
-    if not codigos:
-        return
-    
-    adicionar_ao_historico(codigos)
+    if codigos is None:
+        codigos = obter_codigos_validos()
+        if not codigos:
+            return
+        
+        adicionar_ao_historico(codigos)
     
     processo_ativo = True
     barra_progresso.pack(pady=10)
@@ -233,7 +240,9 @@ def executar_consulta(tipo_consulta="consultadas"):
                 codigos, 
                 callback_progresso=callback_progresso_personalizado, 
                 parar_callback=lambda: parar_flag,
-                tipo_consulta=tipo_consulta
+                tipo_consulta=tipo_consulta,
+                reutilizar_sessao=True,
+                retomar_de=retomar_de
             )
             
             if not parar_flag:
@@ -262,7 +271,9 @@ def executar_consulta(tipo_consulta="consultadas"):
                             estacoes_retry,
                             callback_progresso=callback_progresso_personalizado,
                             parar_callback=lambda: parar_flag,
-                            tipo_consulta=tipo_consulta
+                            tipo_consulta=tipo_consulta,
+                            reutilizar_sessao=True,
+                            reverificar_negativos=True
                         )
                         
                         # Atualizar resultados
@@ -301,6 +312,32 @@ def executar_consulta(tipo_consulta="consultadas"):
     
     Thread(target=tarefa, daemon=True).start()
 
+def oferecer_retomada():
+    """Na abertura, oferece retomar o último lote que foi interrompido (queda, fechamento ou parada)"""
+    try:
+        info = carregar_ultima_execucao_incompleta()
+    except Exception as e:
+        print(f"⚠️ Não foi possível ler o diário de execuções: {e}")
+        return
+    
+    if not info:
+        return
+    
+    pendentes = info['pendentes']
+    resolvidas = len(info['estacoes']) - len(pendentes)
+    pasta = "Consultadas" if info['tipo_consulta'] == "consultadas" else "principal"
+    
+    msg = f"A última execução ({info.get('em', 'data desconhecida')}) foi interrompida.\n\n"
+    msg += f"✅ Resolvidas: {resolvidas}\n"
+    msg += f"⏳ Pendentes ou com falha: {len(pendentes)}\n\n"
+    msg += f"Deseja retomar o download das pendentes (pasta {pasta})?"
+    
+    if messagebox.askyesno("Retomar última execução", msg):
+        log_manager.adicionar('processo', 'Download', f'Retomando execução interrompida: {len(pendentes)} estações', 'processando')
+        executar_consulta(info['tipo_consulta'], codigos=pendentes, retomar_de=info['caminho'])
+    else:
+        descartar_ultima_execucao()
+
 def executar_consulta_e_banco():
     """Executa consulta completa com processamento para banco de dados - VERSÃO MELHORADA"""
     def ao_conectar_banco(credenciais):
@@ -331,8 +368,45 @@ def executar_consulta_e_banco():
         
         def tarefa_completa():
             global processo_ativo
+            db_conn = None
+            pipeline = None
             try:
                 total_estacoes = len(codigos)
+                pasta_destino = criar_pasta_base("normal")
+                
+                # Importar e usar o DbConnect
+                import sys
+                from pathlib import Path
+                logica_dir = Path(__file__).parent.parent / "logica"
+                if str(logica_dir) not in sys.path:
+                    sys.path.insert(0, str(logica_dir))
+                
+                from DbConnect import DatabaseConnection, HidrowebDatabase
+                
+                # Conexão aberta antes do download: cada estação vai para o banco assim que chega
+                db_conn = DatabaseConnection(
+                    host=credenciais['host'],
+                    port=credenciais['port'],
+                    database=credenciais['database'],
+                    user=credenciais['user'],
+                    password=credenciais['password']
+                )
+                if not db_conn.conectar():
+                    log_manager.log_erro_geral('Banco', 'Falha na conexão com o banco')
+                    messagebox.showerror("Erro", "Não foi possível conectar ao banco de dados!")
+                    return
+                hidro_db = HidrowebDatabase(db_conn, credenciais.get('table') if credenciais.get('table') else None)
+                
+                # Pipeline: extração e inserção rodam enquanto os próximos downloads acontecem
+                def callback_carga(estacoes_carregadas, registros_inseridos):
+                    log_manager.adicionar('processo', 'Banco', f'{estacoes_carregadas} estações carregadas ({registros_inseridos:,} registros)', 'database')
+                
+                pipeline = PipelineCarga(
+                    pasta_destino, hidro_db.preparar_registros, hidro_db.inserir_registros,
+                    callback_progresso=callback_carga
+                ).iniciar()
+                
+                inicio_tempo = datetime.now()
                 
                 # Etapa 1: Download das estações
                 log_manager.adicionar('processo', 'Download', 'Iniciando download das estações', 'start')
@@ -348,7 +422,9 @@ def executar_consulta_e_banco():
                     codigos, 
                     callback_progresso=callback_download, 
                     parar_callback=lambda: parar_flag,
-                    tipo_consulta="normal"  # Para pasta principal
+                    tipo_consulta="normal",  # Para pasta principal
+                    reutilizar_sessao=True,
+                    ao_concluir_estacao=pipeline.ao_concluir_estacao
                 )
                 
                 if parar_flag:
@@ -357,6 +433,10 @@ def executar_consulta_e_banco():
                 estacoes_baixadas = resultado.get('baixadas', [])
                 estacoes_falharam = resultado.get('falharam', [])
                 estacoes_inexistentes = resultado.get('inexistentes', [])
+                estacoes_frescas = resultado.get('ignoradas_frescas', [])
+                
+                if estacoes_frescas:
+                    log_manager.adicionar('info', 'Download', f'{len(estacoes_frescas)} estações baixadas recentemente foram mantidas', 'info')
                 
                 # Log final do download
                 log_manager.log_download_final(estacoes_baixadas, estacoes_falharam, estacoes_inexistentes)
@@ -377,7 +457,10 @@ def executar_consulta_e_banco():
                             estacoes_retry,
                             callback_progresso=callback_download,
                             parar_callback=lambda: parar_flag,
-                            tipo_consulta="normal"
+                            tipo_consulta="normal",
+                            reutilizar_sessao=True,
+                            ao_concluir_estacao=pipeline.ao_concluir_estacao,
+                            reverificar_negativos=True
                         )
                         
                         # Atualizar resultados
@@ -388,90 +471,58 @@ def executar_consulta_e_banco():
                         log_manager.log_download_final(estacoes_baixadas, estacoes_falharam, estacoes_inexistentes)
                     
                     elif acao == "cancelar":
+                        # Estações que já chegaram ao banco permanecem; o restante da fila é descartado
+                        pipeline.finalizar(cancelar=True)
                         log_manager.adicionar('aviso', 'Sistema', 'Processamento cancelado pelo usuário', 'error')
                         return
                     
                     # Se acao == "prosseguir", continua para o banco
                 
-                if not estacoes_baixadas:
+                if not estacoes_baixadas and not estacoes_frescas:
+                    pipeline.finalizar()
                     log_manager.log_erro_geral('Download', 'Nenhuma estação foi baixada')
                     messagebox.showerror("Erro", "Nenhuma estação foi baixada com sucesso!")
                     return
                 
-                # Etapa 2: Processamento dos arquivos
-                log_manager.log_extracao_inicio()
-                atualizar_progresso_adaptativo("Extração", 50, 100, tipo="porcentagem")
+                # Demais ZIPs da pasta ainda não enviados ao banco entram no fim da fila
+                for codigo in sorted({e['codigo'] for e in listar_estacoes_baixadas(pasta_destino)}):
+                    pipeline.enviar(codigo)
                 
-                def callback_extracao(etapa, progresso, total, tipo="porcentagem"):
-                    atualizar_progresso_adaptativo("Extração", progresso, total, tipo=tipo)
-                    if "Processando" in etapa:
-                        arquivo = etapa.split("Processando ")[-1] if "Processando" in etapa else "arquivo"
-                        log_manager.log_extracao_progresso(arquivo, progresso, total)
+                # Etapas 2 e 3: aguarda a extração e o banco esvaziarem as filas
+                log_manager.log_extracao_inicio()
+                atualizar_progresso_adaptativo("Banco", 90, 100, tipo="porcentagem")
+                carga = pipeline.finalizar()
+                fim_tempo = datetime.now()
                 
-                arquivo_final = processar_estacoes_completo(
-                    resultado['pasta_destino'], 
-                    callback_progresso=callback_extracao
-                )
+                tempo_execucao = str(fim_tempo - inicio_tempo).split('.')[0]  # Remove microssegundos
+                total_registros = carga['registros']
                 
-                if not arquivo_final:
-                    log_manager.log_erro_geral('Extração', 'Falha no processamento dos arquivos')
-                    messagebox.showerror("Erro", "Falha no processamento dos arquivos!")
+                if not carga['carregadas'] and not carga['falharam']:
+                    log_manager.adicionar('info', 'Extração', 'Nenhuma estação com dados novos desde a última carga', 'info')
+                    messagebox.showinfo("Sem dados novos", "Todas as estações baixadas já estão atualizadas no banco.")
                     return
                 
-                # Contar registros do arquivo final
-                try:
-                    with open(arquivo_final, 'r', encoding='utf-8') as f:
-                        total_registros = sum(1 for _ in f) - 1  # -1 para excluir cabeçalho
-                except:
-                    total_registros = 0
-                
-                nome_arquivo = os.path.basename(arquivo_final)
-                log_manager.log_extracao_final(arquivo_final, total_registros)
-                
-                # Etapa 3: Inserção no banco
-                log_manager.log_banco_inicio(
-                    credenciais['host'], 
-                    credenciais['database'], 
-                    credenciais.get('table')
-                )
-                atualizar_progresso_adaptativo("Banco", 75, 100, tipo="porcentagem")
-                
-                # Importar e usar o DbConnect
-                import sys
-                from pathlib import Path
-                logica_dir = Path(__file__).parent.parent / "logica"
-                if str(logica_dir) not in sys.path:
-                    sys.path.insert(0, str(logica_dir))
-                
-                from DbConnect import processar_dados_completo
-                
-                # Inserção no banco com logs detalhados
-                log_manager.log_banco_insercao_inicio(total_registros)
-                
-                inicio_tempo = datetime.now()
-                sucesso_banco = processar_dados_completo(
-                    credenciais=credenciais,
-                    caminho_csv=arquivo_final,
-                    nome_tabela=credenciais.get('table') if credenciais.get('table') else None
-                )
-                fim_tempo = datetime.now()
+                if carga['sem_alteracao']:
+                    log_manager.adicionar('info', 'Extração', f"{len(carga['sem_alteracao'])} estações sem alteração ignoradas", 'info')
                 
-                tempo_execucao = str(fim_tempo - inicio_tempo).split('.')[0]  # Remove microssegundos
+                # Consolidado gravado pelo pipeline durante a extração
+                if carga['arquivo_consolidado']:
+                    log_manager.log_extracao_final(carga['arquivo_consolidado'], total_registros)
                 
                 # Finalização
                 atualizar_progresso_adaptativo("Concluído", 100, 100, tipo="porcentagem")
                 
-                if sucesso_banco:
+                if not carga['falharam']:
                     # Log de sucesso com detalhes
                     log_manager.log_banco_final(total_registros, tempo_execucao)
                     
                     # Limpar arquivos temporários
-                    limpar_arquivos_temporarios(resultado['pasta_destino'])
+                    limpar_arquivos_temporarios(pasta_destino)
                     log_manager.adicionar('info', 'Sistema', 'Arquivos temporários removidos', 'correto')
                     
                     # Mensagem de sucesso completo
                     msg = f"🎉 PROCESSAMENTO CONCLUÍDO COM SUCESSO!\n\n"
-                    msg += f"📊 Estações processadas: {len(estacoes_baixadas)}\n"
+                    msg += f"📊 Estações processadas: {len(carga['carregadas'])}\n"
                     msg += f"📋 Registros inseridos: {total_registros:,}\n"
                     msg += f"🗄️ Banco: {credenciais['host']}/{credenciais['database']}\n"
                     msg += f"⏱️ Tempo total: {tempo_execucao}\n"
@@ -481,12 +532,15 @@ def executar_consulta_e_banco():
                     
                     messagebox.showinfo("✅ Processamento Concluído", msg)
                 else:
-                    log_manager.log_erro_geral('Banco', 'Falha na inserção dos dados')
+                    log_manager.log_erro_geral('Banco', f"Falha ao carregar: {', '.join(carga['falharam'])}")
                     
-                    msg = f"❌ ERRO NA INSERÇÃO NO BANCO!\n\n"
-                    msg += f"✅ Download e extração: OK\n"
-                    msg += f"❌ Inserção no banco: FALHOU\n\n"
-                    msg += f"📁 Arquivo consolidado disponível:\n{nome_arquivo}\n\n"
+                    # ZIPs mantidos: as estações não marcadas no manifesto entram na próxima carga
+                    msg = f"❌ ERRO NA CARGA DE ALGUMAS ESTAÇÕES!\n\n"
+                    msg += f"✅ Carregadas: {len(carga['carregadas'])} ({total_registros:,} registros)\n"
+                    msg += f"❌ Falharam: {', '.join(carga['falharam'])}\n\n"
+                    msg += f"Os arquivos foram mantidos na pasta para uma nova tentativa.\n"
+                    if carga['arquivo_consolidado']:
+                        msg += f"📁 Arquivo consolidado disponível:\n{os.path.basename(carga['arquivo_consolidado'])}\n\n"
                     msg += f"Verifique o log para mais detalhes."
                     
                     messagebox.showerror("❌ Erro na Inserção", msg)
@@ -495,6 +549,10 @@ def executar_consulta_e_banco():
                 log_manager.log_erro_geral('Sistema', f'Erro crítico: {str(e)}')
                 messagebox.showerror("Erro Crítico", f"Erro durante o processamento:\n\n{str(e)}")
             finally:
+                if pipeline is not None and pipeline.ativo:
+                    pipeline.finalizar(cancelar=True)
+                if db_conn:
+                    db_conn.desconectar()
                 barra_progresso.pack_forget()
                 label_status.configure(text="")
                 processo_ativo = False
@@ -520,27 +578,30 @@ def obter_codigos_validos():
     return codigos
 
 def parar_consulta():
+    """
+    Pede a parada: o download confere a flag a cada ~100 ms (inclusive durante as
+    esperas do navegador), descarta arquivos parciais e a tarefa encerra sozinha,
+    sem reiniciar a interface.
+    """
     global parar_flag
+    if not processo_ativo:
+        return
     parar_flag = True
     log_manager.adicionar('aviso', 'Sistema', 'Solicitação de parada enviada', 'error')
-    def reiniciar_apos_parar():
-        import time
-        time.sleep(1)
-        texto_atual = entrada_codigo.get("1.0", "end-1c")
-        janela.after(0, lambda: reiniciar_com_texto(texto_atual))
-    Thread(target=reiniciar_apos_parar, daemon=True).start()
-
-def reiniciar_com_texto(texto):
-    os.environ['TEXTO_MANTIDO'] = texto
-    reiniciar_interface(manter_texto=True)
 
 def reiniciar_interface(manter_texto=True):
     texto_atual = entrada_codigo.get("1.0", "end-1c") if manter_texto else ""
+    encerrar_sessao()
     janela.destroy()
     if manter_texto and texto_atual:
         os.environ['TEXTO_MANTIDO'] = texto_atual
     os.execv(sys.executable, ['python'] + sys.argv)
 
+def ao_fechar_janela():
+    """Fecha o navegador mantido em segundo plano antes de sair"""
+    encerrar_sessao()
+    janela.destroy()
+
 def reiniciar_f5(event=None):
     reiniciar_interface(manter_texto=False)
 
@@ -836,6 +897,7 @@ def ao_desfocar_entrada(event):
 
 # LAYOUT PRINCIPAL COM DESIGN MODERNO
 janela.bind("<F5>", reiniciar_f5)
+janela.protocol("WM_DELETE_WINDOW", ao_fechar_janela)
 
 frame_container = ctk.CTkFrame(janela, fg_color="transparent")
 frame_container.pack(expand=True, fill="both", padx=25, pady=25)
@@ -1167,6 +1229,9 @@ else:
 # Atualiza a lista do histórico
 atualizar_lista_historico()
 
+# Oferece retomar um lote interrompido assim que a janela estiver pronta
+janela.after(500, oferecer_retomada)
+
 # Força atualização do layout
 def forcar_atualizacao_scroll():
     scrollable_historico.update_idletasks()
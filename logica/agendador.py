@@ -0,0 +1,290 @@
+# scripts/logica/agendador.py - AGENDADOR DE TENTATIVAS, DISJUNTOR DE FALHAS E CONCORRÊNCIA ADAPTATIVA
+import heapq
+import random
+import threading
+import time
+from collections import Counter, deque
+
+# Backoff entre tentativas da mesma estação (segundos)
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+# Disjuntor: abre quando TAXA_FALHA_MAX das últimas JANELA_DISJUNTOR estações falharam
+JANELA_DISJUNTOR = 10
+TAXA_FALHA_MAX = 0.6
+PAUSA_DISJUNTOR = 10.0
+PAUSA_DISJUNTOR_MAX = 120.0
+
+# Controle adaptativo de concorrência (AIMD)
+CONCORRENCIA_INICIAL = 2
+CONCORRENCIA_MAX_PADRAO = 6
+JANELA_CONTROLADOR = 8       # conclusões avaliadas antes de cada aumento
+TOLERANCIA_LATENCIA = 1.5    # mediana até 1.5x a melhor mediana observada é considerada saudável
+FATOR_REDUCAO = 0.5
+LATENCIA_SUSPEITA = 4.0      # "inexistente" mais lento que isso provavelmente foi timeout do site
+
+def calcular_backoff(tentativa, base=BACKOFF_BASE, maximo=BACKOFF_MAX):
+    """Espera antes da próxima tentativa: base * 2^(tentativa-1), limitada a maximo, com jitter"""
+    teto = min(maximo, base * (2 ** (tentativa - 1)))
+    return random.uniform(teto / 2, teto)
+
+class AgendadorTentativas:
+    """
+    Fila de estações compartilhada entre as páginas/conexões de um lote.
+
+    Estações novas saem na ordem recebida; as que falharam voltam com backoff
+    exponencial e, quando o tempo de espera vence, têm prioridade sobre as novas.
+    Assim os retries ficam intercalados com o trabalho novo em vez de concentrados
+    em passadas extras no fim do lote.
+    """
+
+    def __init__(self, estacoes, max_tentativas):
+        self.max_tentativas = max_tentativas
+        self._novas = deque(estacoes)
+        self._retries = []  # heap de (pronta_em, sequência, código, tentativa)
+        self._sequencia = 0
+        self._pendentes = len(self._novas)
+        self._em_andamento = Counter()  # entregues por proxima() e ainda não concluídas/reagendadas
+        self._condicao = threading.Condition()
+
+    def proxima(self, timeout=0.1):
+        """
+        Retorna (codigo, tentativa) da próxima estação pronta, ou None se nada está
+        pronto dentro do timeout (retries ainda em backoff ou estações em andamento).
+        """
+        with self._condicao:
+            agora = time.monotonic()
+            if self._retries and self._retries[0][0] <= agora:
+                _, _, codigo, tentativa = heapq.heappop(self._retries)
+                self._em_andamento[codigo] += 1
+                return codigo, tentativa
+            if self._novas:
+                codigo = self._novas.popleft()
+                self._em_andamento[codigo] += 1
+                return codigo, 1
+
+            espera = timeout
+            if self._retries:
+                espera = min(timeout, self._retries[0][0] - agora)
+            if self._pendentes > 0:
+                self._condicao.wait(max(0.0, espera))
+            return None
+
+    def reagendar(self, codigo, tentativa):
+        """Devolve a estação para a fila com backoff. Retorna False se as tentativas acabaram."""
+        if tentativa >= self.max_tentativas:
+            return False
+
+        espera = calcular_backoff(tentativa)
+        with self._condicao:
+            heapq.heappush(self._retries, (time.monotonic() + espera, self._sequencia, codigo, tentativa + 1))
+            self._sequencia += 1
+            self._em_andamento[codigo] -= 1
+            self._condicao.notify()
+
+        print(f"    🔁 {codigo}: nova tentativa em {espera:.1f}s")
+        return True
+
+    def concluir(self, codigo):
+        """
+        Marca uma estação como resolvida (baixada, inexistente, sem dados ou falha definitiva).
+        Retorna False, sem contar de novo, se ela não estava em andamento (já concluída ou reagendada).
+        """
+        with self._condicao:
+            if self._em_andamento[codigo] <= 0:
+                return False
+            self._em_andamento[codigo] -= 1
+            self._pendentes -= 1
+            self._condicao.notify_all()
+            return True
+
+    @property
+    def finalizado(self):
+        with self._condicao:
+            return self._pendentes <= 0
+
+    def drenar(self):
+        """Remove e retorna as estações que ainda não começaram ou aguardam retry (usado na parada)"""
+        with self._condicao:
+            restantes = list(self._novas) + [item[2] for item in sorted(self._retries)]
+            self._novas.clear()
+            self._retries = []
+            self._pendentes -= len(restantes)
+            self._condicao.notify_all()
+            return restantes
+
+class DisjuntorFalhas:
+    """
+    Circuit breaker do lote: quando a taxa de falhas técnicas na janela recente
+    passa do limite, todas as páginas pausam. Depois da pausa a primeira estação
+    funciona como teste - se falhar, a pausa recomeça com o dobro do tempo.
+
+    Estações inexistentes ou sem dados contam como sucesso: o site respondeu.
+    """
+
+    def __init__(self, janela=JANELA_DISJUNTOR, taxa_max=TAXA_FALHA_MAX, pausa=PAUSA_DISJUNTOR, pausa_max=PAUSA_DISJUNTOR_MAX):
+        self.taxa_max = taxa_max
+        self.pausa = pausa
+        self.pausa_max = pausa_max
+        self.aberturas = 0
+
+        self._resultados = deque(maxlen=janela)
+        self._aberto_ate = 0.0
+        self._pausa_atual = pausa
+        self._em_teste = False
+        self._trava = threading.Lock()
+
+    def _abrir(self, motivo):
+        self._aberto_ate = time.monotonic() + self._pausa_atual
+        self._em_teste = True
+        self.aberturas += 1
+        print(f"⚡ Disjuntor aberto ({motivo}) - pausando {self._pausa_atual:.0f}s")
+        self._pausa_atual = min(self._pausa_atual * 2, self.pausa_max)
+        self._resultados.clear()
+
+    def registrar(self, sucesso):
+        with self._trava:
+            if self._em_teste and time.monotonic() >= self._aberto_ate:
+                self._em_teste = False
+                if not sucesso:
+                    self._abrir("falha após a pausa")
+                    return
+                self._pausa_atual = self.pausa
+                print("✅ Disjuntor fechado - site respondendo")
+
+            self._resultados.append(bool(sucesso))
+            if sucesso or len(self._resultados) < self._resultados.maxlen:
+                return
+
+            taxa = self._resultados.count(False) / len(self._resultados)
+            if taxa >= self.taxa_max:
+                self._abrir(f"{taxa:.0%} de falhas")
+
+    def tempo_restante(self):
+        with self._trava:
+            return max(0.0, self._aberto_ate - time.monotonic())
+
+    def aguardar(self, parar_callback=None, fatia=0.1):
+        """Bloqueia enquanto o disjuntor estiver aberto. Retorna False se a parada foi pedida."""
+        while True:
+            restante = self.tempo_restante()
+            if restante <= 0:
+                return True
+            if parar_callback and parar_callback():
+                return False
+            time.sleep(min(fatia, restante))
+
+class ControladorConcorrencia:
+    """
+    Ajusta quantas páginas/conexões trabalham ao mesmo tempo (AIMD).
+
+    Os trabalhadores são criados até o teto, mas só 'limite' deles processa de cada
+    vez. A cada JANELA_CONTROLADOR estações concluídas com latência saudável o limite
+    sobe 1; um erro técnico - ou um "inexistente" tão lento que parece timeout -
+    corta o limite pela metade. Depois de um corte, novos cortes esperam as estações
+    que já estavam em andamento terminarem.
+    """
+
+    def __init__(self, maximo=CONCORRENCIA_MAX_PADRAO, inicial=CONCORRENCIA_INICIAL, minimo=1):
+        self.maximo = max(1, maximo)
+        self.minimo = max(1, min(minimo, self.maximo))
+        self.limite = max(self.minimo, min(inicial, self.maximo))
+
+        self._ativos = 0
+        self._latencias = []
+        self._melhor_mediana = None
+        self._concluidas_desde_corte = self.limite
+        self._conclusoes = []
+        self._inicio = time.monotonic()
+        self._condicao = threading.Condition()
+        self.historico = [(0.0, self.limite)]
+
+    def tentar_adquirir(self):
+        """Ocupa uma vaga se o limite atual permitir (não bloqueia)"""
+        with self._condicao:
+            if self._ativos >= self.limite:
+                return False
+            self._ativos += 1
+            return True
+
+    def adquirir(self, parar_callback=None, fatia=0.1):
+        """Bloqueia até haver vaga. Retorna False se a parada foi pedida."""
+        with self._condicao:
+            while self._ativos >= self.limite:
+                if parar_callback and parar_callback():
+                    return False
+                self._condicao.wait(fatia)
+            self._ativos += 1
+            return True
+
+    def devolver(self):
+        """Libera a vaga sem registrar medição (nada havia para processar)"""
+        with self._condicao:
+            self._ativos -= 1
+            self._condicao.notify()
+
+    def liberar(self, latencia, resultado):
+        """Libera a vaga e ajusta o limite com base no resultado da estação"""
+        erro = resultado is False or (resultado == "estacao_inexistente" and latencia >= LATENCIA_SUSPEITA)
+
+        with self._condicao:
+            self._ativos -= 1
+            self._conclusoes.append(time.monotonic() - self._inicio)
+            self._concluidas_desde_corte += 1
+
+            if erro:
+                self._reduzir()
+            else:
+                self._latencias.append(latencia)
+                if len(self._latencias) >= JANELA_CONTROLADOR:
+                    self._avaliar()
+
+            self._condicao.notify_all()
+
+    def _registrar_limite(self, novo_limite, motivo):
+        if novo_limite == self.limite:
+            return
+        print(f"🎚️ Concorrência {self.limite} → {novo_limite} ({motivo})")
+        self.limite = novo_limite
+        self.historico.append((time.monotonic() - self._inicio, novo_limite))
+
+    def _reduzir(self):
+        # Só corta de novo quando as estações do nível anterior já saíram
+        if self._concluidas_desde_corte < self.limite:
+            return
+        self._concluidas_desde_corte = 0
+        self._latencias = []
+        self._registrar_limite(max(self.minimo, int(self.limite * FATOR_REDUCAO)), "erro/timeout")
+
+    def _avaliar(self):
+        ordenadas = sorted(self._latencias)
+        mediana = ordenadas[len(ordenadas) // 2]
+        self._latencias = []
+
+        if self._melhor_mediana is None or mediana < self._melhor_mediana:
+            self._melhor_mediana = mediana
+
+        if mediana <= self._melhor_mediana * TOLERANCIA_LATENCIA and self.limite < self.maximo:
+            self._registrar_limite(self.limite + 1, f"mediana {mediana:.2f}s")
+
+    def resumo(self):
+        """Imprime a concorrência escolhida e a vazão (estações/min) ao longo do lote"""
+        with self._condicao:
+            conclusoes = list(self._conclusoes)
+            historico = list(self.historico)
+
+        print(f"   🎚️ Concorrência adaptativa: final {self.limite} | máx usada {max(l for _, l in historico)} | teto {self.maximo}")
+        if not conclusoes:
+            return
+
+        duracao = max(conclusoes[-1], 1e-6)
+        if duracao < 60:
+            print(f"   📈 Vazão: {len(conclusoes) / duracao * 60:.1f} estações/min")
+            return
+
+        por_minuto = {}
+        for instante in conclusoes:
+            minuto = int(instante // 60)
+            por_minuto[minuto] = por_minuto.get(minuto, 0) + 1
+        faixas = [f"{m}-{m + 1}min: {por_minuto.get(m, 0)}" for m in range(int(duracao // 60) + 1)]
+        print(f"   📈 Estações/min: {' | '.join(faixas[-10:])}")
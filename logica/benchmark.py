@@ -0,0 +1,121 @@
+# scripts/logica/benchmark.py - MEDIÇÃO DE ESTAÇÕES/MIN CONTRA O HIDROWEB SIMULADO
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from logica.servidorSimulado import ServidorSimulado
+
+# Códigos sintéticos (8 dígitos, como os do Hidroweb)
+CODIGO_INICIAL = 10000000
+
+def executar_benchmark(num_estacoes=100, motor="sincrono", num_paginas=1, rodadas=1, finalizar_em_paralelo=False, pasta_base=None, cache_navegador=False, **opcoes_servidor):
+    """
+    Sobe o Hidroweb simulado, aponta o downloader para ele e mede baixar_estacoes.
+
+    Deve rodar em um processo próprio (python -m logica.benchmark): as URLs do site
+    são lidas de HIDROWEB_URL/HIDROWEB_URL_CSV quando logica.play é importado.
+    A partir da 2ª rodada os ZIPs já estão na pasta e o conteúdo é idêntico,
+    o que mede o caminho de verificação sem substituição. Cada rodada abre um
+    navegador novo, então o tempo até o 1º download mostra o custo de carregar o
+    site - compare com e sem cache_navegador (a 1ª rodada enche o cache).
+
+    Args:
+        num_estacoes: Quantidade de códigos sintéticos por rodada
+        motor, num_paginas, finalizar_em_paralelo: Repassados a baixar_estacoes
+        rodadas: Quantas vezes o mesmo lote é baixado
+        cache_navegador: Serve a página e os scripts do cache em disco (ver logica.cacheRecursos)
+        pasta_base: Pasta usada como Estações_Hidroweb (None = pasta temporária, apagada ao final)
+        **opcoes_servidor: tamanho_kb, latencia_ms, taxa_falhas, ... (ver ServidorSimulado)
+
+    Returns:
+        list: Um dict por rodada com duracao, primeiro_download, estacoes_por_minuto e o resultado de baixar_estacoes
+    """
+    servidor = ServidorSimulado(**opcoes_servidor).iniciar()
+    pasta_temporaria = None
+    if pasta_base is None:
+        pasta_temporaria = pasta_base = tempfile.mkdtemp(prefix="hidroweb_benchmark_")
+
+    os.environ["HIDROWEB_URL"] = servidor.url
+    os.environ["HIDROWEB_URL_CSV"] = servidor.url_download
+    os.environ["HIDROWEB_PASTA_BASE"] = pasta_base
+    os.environ["HIDROWEB_CACHE_NAVEGADOR"] = "1" if cache_navegador else "0"
+
+    from logica.play import baixar_estacoes
+
+    estacoes = [str(CODIGO_INICIAL + indice) for indice in range(num_estacoes)]
+    medicoes = []
+
+    print(f"🧪 Benchmark: {num_estacoes} estações | motor {motor} | {num_paginas} página(s) | "
+          f"cache do navegador {'ligado' if cache_navegador else 'desligado'} | {servidor.url}")
+
+    try:
+        for rodada in range(1, rodadas + 1):
+            print(f"\n🏁 Rodada {rodada}/{rodadas}")
+            inicio = time.perf_counter()
+            primeiro = []
+            
+            def ao_concluir_estacao(codigo, situacao):
+                if situacao == "baixada" and not primeiro:
+                    primeiro.append(time.perf_counter() - inicio)
+            
+            resultado = baixar_estacoes(
+                estacoes, tipo_consulta="normal", num_paginas=num_paginas, motor=motor,
+                ttl_frescor_horas=0, finalizar_em_paralelo=finalizar_em_paralelo, registrar_diario=False,
+                ao_concluir_estacao=ao_concluir_estacao, ttl_negativo_horas=0
+            )
+            duracao = time.perf_counter() - inicio
+            medicoes.append({
+                'rodada': rodada,
+                'duracao': duracao,
+                'primeiro_download': primeiro[0] if primeiro else None,
+                'estacoes_por_minuto': num_estacoes / duracao * 60 if duracao else 0.0,
+                'resultado': resultado
+            })
+    finally:
+        servidor.encerrar()
+        if pasta_temporaria:
+            shutil.rmtree(pasta_temporaria, ignore_errors=True)
+
+    print(f"\n📈 BENCHMARK ({motor}, {num_paginas} página(s), cache do navegador {'ligado' if cache_navegador else 'desligado'})")
+    for medicao in medicoes:
+        resultado = medicao['resultado']
+        primeiro = f"{medicao['primeiro_download']:.2f}s" if medicao['primeiro_download'] is not None else "-"
+        print(
+            f"   Rodada {medicao['rodada']}: {medicao['duracao']:.1f}s | {medicao['estacoes_por_minuto']:.1f} estações/min"
+            f" | 1º download {primeiro}"
+            f" | baixadas {len(resultado['baixadas'])} | inexistentes {len(resultado['inexistentes'])}"
+            f" | sem dados {len(resultado['sem_dados'])} | falharam {len(resultado['falharam'])}"
+        )
+    contadores = servidor.contadores
+    print(f"   Servidor: {contadores['paginas']} páginas | {contadores['bundles']} scripts | {contadores['metadados']} metadados | {contadores['buscas']} buscas | {contadores['downloads']} downloads | "
+          f"{contadores['falhas']} falhas simuladas | {contadores['bytes'] / 1024 / 1024:.1f} MB")
+
+    return medicoes
+
+if __name__ == "__main__":
+    # python -m logica.benchmark --estacoes 200 --paginas 4 --latencia-ms 300 --taxa-falhas 0.02
+    argumentos = argparse.ArgumentParser(description="Mede estações/min do downloader contra o Hidroweb simulado")
+    argumentos.add_argument("--estacoes", type=int, default=100)
+    argumentos.add_argument("--motor", default="sincrono", choices=["sincrono", "assincrono", "http", "processos"])
+    argumentos.add_argument("--paginas", type=int, default=1, help="Páginas/conexões simultâneas")
+    argumentos.add_argument("--rodadas", type=int, default=1)
+    argumentos.add_argument("--finalizar-em-paralelo", action="store_true")
+    argumentos.add_argument("--pasta", default=None, help="Pasta de destino (padrão: temporária, apagada ao final)")
+    argumentos.add_argument("--tamanho-kb", type=int, default=64, help="Tamanho aproximado do _Cotas.csv de cada estação")
+    argumentos.add_argument("--latencia-ms", type=int, default=150, help="Atraso de cada resposta da busca e do download")
+    argumentos.add_argument("--taxa-falhas", type=float, default=0.0, help="Fração dos downloads que respondem HTTP 503")
+    argumentos.add_argument("--taxa-inexistentes", type=float, default=0.05)
+    argumentos.add_argument("--taxa-sem-dados", type=float, default=0.05)
+    argumentos.add_argument("--tamanho-bundle-kb", type=int, default=2048, help="Tamanho do script da página")
+    argumentos.add_argument("--banda-kbps", type=int, default=0, help="Velocidade de envio do script (0 = sem limite)")
+    argumentos.add_argument("--cache-navegador", action="store_true", help="Serve a página e os scripts do cache em disco")
+    opcoes = argumentos.parse_args()
+
+    executar_benchmark(
+        opcoes.estacoes, opcoes.motor, opcoes.paginas, opcoes.rodadas, opcoes.finalizar_em_paralelo, opcoes.pasta,
+        opcoes.cache_navegador, tamanho_kb=opcoes.tamanho_kb, latencia_ms=opcoes.latencia_ms, taxa_falhas=opcoes.taxa_falhas,
+        taxa_inexistentes=opcoes.taxa_inexistentes, taxa_sem_dados=opcoes.taxa_sem_dados,
+        tamanho_bundle_kb=opcoes.tamanho_bundle_kb, banda_kbps=opcoes.banda_kbps
+    )
@@ -0,0 +1,107 @@
+# scripts/logica/buscaEstacao.py - INTERPRETAÇÃO DA RESPOSTA DA BUSCA DE ESTAÇÕES (SEM NAVEGADOR)
+import json
+import re
+from urllib.parse import parse_qs, urlsplit
+
+# Listagem de estações chamada pela busca (/rest/api/estacoes no Hidroweb simulado): ficam de fora
+# o download (/documento) e os metadados estáticos da aplicação
+PADRAO_CAMINHO_BUSCA = re.compile(r'/rest/api/estac\w*/?$')
+
+def valores_de_codigo(dados):
+    """Valores dos campos cujo nome contém 'codigo', em qualquer nível de um JSON (ou do parse_qs)"""
+    if isinstance(dados, dict):
+        for chave, valor in dados.items():
+            if 'codigo' in str(chave).lower():
+                for item in (valor if isinstance(valor, list) else [valor]):
+                    if item is not None and not isinstance(item, (dict, list)):
+                        yield item
+            if isinstance(valor, (dict, list)):
+                yield from valores_de_codigo(valor)
+    elif isinstance(dados, list):
+        for item in dados:
+            yield from valores_de_codigo(item)
+
+def parametros_de_codigo(url, post_data=None):
+    """Códigos enviados na requisição: query string e corpo (JSON ou formulário)"""
+    valores = list(valores_de_codigo(parse_qs(urlsplit(url).query)))
+    if post_data:
+        try:
+            valores.extend(valores_de_codigo(json.loads(post_data)))
+        except ValueError:
+            valores.extend(valores_de_codigo(parse_qs(post_data)))
+    return valores
+
+def eh_requisicao_da_busca(url, post_data, codigo):
+    """
+    True se a requisição é a listagem de estações pesquisando exatamente este código.
+    Comparação por igualdade do parâmetro: a resposta atrasada da busca de "12345" não
+    serve para "1234", nem uma chamada qualquer que só contenha o código na URL.
+    """
+    if not PADRAO_CAMINHO_BUSCA.search(urlsplit(url).path):
+        return False
+    procurado = codigo.lstrip('0')
+    return any(str(valor).strip().lstrip('0') == procurado for valor in parametros_de_codigo(url, post_data))
+
+def eh_resposta_da_busca(resposta, codigo):
+    """True para a resposta XHR/fetch da listagem de estações gerada pela busca do código"""
+    requisicao = resposta.request
+    if requisicao.resource_type not in ("xhr", "fetch"):
+        return False
+    return eh_requisicao_da_busca(resposta.url, requisicao.post_data, codigo)
+
+# Onde a lista de estações pode vir dentro do JSON da busca
+CHAVES_LISTA_BUSCA = ('content', 'items', 'itens', 'data', 'dados', 'estacoes', 'result', 'results')
+
+def extrair_registros_busca(dados):
+    """Lista de registros (dicts) do JSON da busca, ou None se o formato não for reconhecido"""
+    if isinstance(dados, list):
+        return dados if all(isinstance(item, dict) for item in dados) else None
+    
+    if isinstance(dados, dict):
+        for chave in CHAVES_LISTA_BUSCA:
+            if isinstance(dados.get(chave), list):
+                return extrair_registros_busca(dados[chave])
+        if any('codigo' in chave.lower() for chave in dados):
+            return [dados]
+    
+    return None
+
+def classificar_dados_busca(dados, codigo):
+    """
+    Classifica a estação a partir do JSON recebido pela aplicação Angular.
+    Retorna "encontrada" (um registro traz exatamente o código pesquisado), "sem_dados"
+    (esse registro informa possuiDados falso), "inexistente" (lista vazia) ou None quando
+    o payload não permite decidir - inclusive registros de outros códigos, que podem ser
+    de uma busca anterior. Só "inexistente" e "sem_dados" vão para o cache negativo.
+    """
+    registros = extrair_registros_busca(dados)
+    if registros is None:
+        return None
+    if not registros:
+        return "inexistente"
+    
+    # Só campos de código da estação: 'id' é o identificador interno do registro
+    procurado = codigo.lstrip('0')
+    for registro in registros:
+        for chave, valor in registro.items():
+            if valor is not None and 'codigo' in chave.lower() and str(valor).strip().lstrip('0') == procurado:
+                if any(chave.lower().replace('_', '') == 'possuidados' and valor is False for chave, valor in registro.items()):
+                    return "sem_dados"
+                return "encontrada"
+    
+    return None
+
+def interpretar_resposta_busca(resposta, codigo):
+    """Lê a resposta capturada da busca: "encontrada", "sem_dados", "inexistente" ou None (decidir pelo DOM)"""
+    if resposta is None:
+        return None
+    if resposta.status == 404:
+        return "inexistente"
+    if not resposta.ok:
+        return None
+    
+    try:
+        dados = resposta.json()
+    except Exception:
+        return None
+    return classificar_dados_busca(dados, codigo)
@@ -0,0 +1,153 @@
+# scripts/logica/cacheNegativo.py - CACHE DE CÓDIGOS INEXISTENTES / SEM DADOS (COM TTL)
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from logica.consumo import criar_pasta_base
+from logica.manifesto import trava_entre_processos
+
+NOME_CACHE = "cache_negativo.json"
+
+# Por quanto tempo um código inexistente/sem dados deixa de ser consultado (0 = cache desativado)
+TTL_NEGATIVO_HORAS = float(os.environ.get("HIDROWEB_TTL_NEGATIVO_HORAS") or 7 * 24)
+
+class CacheNegativo:
+    """
+    Códigos que o Hidroweb respondeu como inexistentes ou sem dados, com a data da
+    última verificação (Scripts/dados/cache_negativo.json).
+
+    Cada código inexistente custa segundos de espera pela tabela e pelo botão no
+    navegador; com o cache, listas coladas cheias de códigos inválidos só pagam esse
+    custo uma vez a cada ttl_horas. Uma estação que volta a ser baixada sai do cache.
+    Só entram respostas do próprio site sobre o código (busca com lista vazia ou
+    possuiDados falso, HTTP 404/204 no download). Negativos deduzidos só do DOM (tabela
+    vazia, botão CSV ausente ou desabilitado) aparecem no resultado, mas são marcados
+    com marcar_nao_confirmado e não bloqueiam a estação por ttl_horas: uma página
+    lenta produz os mesmos sinais.
+    A gravação segue o manifesto: trava de arquivo e só os códigos alterados aqui
+    sobrescrevem o que outro processo gravou.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = Path(caminho)
+        self._trava = threading.RLock()
+        self._codigos = {}
+        self._alterados = set()
+        self._nao_confirmados = set()
+        self.carregar()
+
+    def carregar(self):
+        with self._trava:
+            try:
+                with open(self.caminho, 'r', encoding='utf-8') as f:
+                    self._codigos = json.load(f).get('codigos', {})
+            except FileNotFoundError:
+                self._codigos = {}
+            except Exception as e:
+                print(f"⚠️ Cache negativo inválido, recriando: {e}")
+                self._codigos = {}
+
+    def salvar(self):
+        with self._trava:
+            if not self._alterados:
+                return
+
+            with trava_entre_processos(self.caminho):
+                try:
+                    with open(self.caminho, 'r', encoding='utf-8') as f:
+                        em_disco = json.load(f).get('codigos', {})
+                except (FileNotFoundError, ValueError):
+                    em_disco = {}
+
+                for codigo in self._alterados:
+                    if codigo in self._codigos:
+                        em_disco[codigo] = self._codigos[codigo]
+                    else:
+                        em_disco.pop(codigo, None)
+                self._codigos = em_disco
+
+                temporario = f"{self.caminho}.{os.getpid()}.tmp"
+                with open(temporario, 'w', encoding='utf-8') as f:
+                    json.dump({'versao': 1, 'codigos': self._codigos}, f, ensure_ascii=False, indent=1)
+                os.replace(temporario, self.caminho)
+
+            self._alterados.clear()
+
+    def situacao(self, codigo, ttl_horas=TTL_NEGATIVO_HORAS):
+        """"inexistente" ou "sem_dados" se o código foi verificado há menos de ttl_horas, senão None"""
+        with self._trava:
+            entrada = self._codigos.get(codigo)
+        if not entrada or not ttl_horas or ttl_horas <= 0:
+            return None
+
+        try:
+            verificado_em = datetime.fromisoformat(entrada['verificado_em'])
+        except (KeyError, ValueError):
+            return None
+        if datetime.now() - verificado_em > timedelta(hours=ttl_horas):
+            return None
+        return entrada.get('situacao')
+
+    def separar(self, estacoes, ttl_horas=TTL_NEGATIVO_HORAS):
+        """
+        Returns:
+            tuple: (pendentes, inexistentes, sem_dados) preservando a ordem original
+        """
+        pendentes, inexistentes, sem_dados = [], [], []
+        for codigo in estacoes:
+            situacao = self.situacao(codigo, ttl_horas)
+            if situacao == "inexistente":
+                inexistentes.append(codigo)
+            elif situacao == "sem_dados":
+                sem_dados.append(codigo)
+            else:
+                pendentes.append(codigo)
+        return pendentes, inexistentes, sem_dados
+
+    def registrar(self, codigo, situacao):
+        with self._trava:
+            anterior = self._codigos.get(codigo, {})
+            self._codigos[codigo] = {
+                'situacao': situacao,
+                'verificado_em': datetime.now().isoformat(timespec='seconds'),
+                'vezes': anterior.get('vezes', 0) + 1
+            }
+            self._alterados.add(codigo)
+
+    def marcar_nao_confirmado(self, codigo):
+        """O negativo deste código nesta execução veio só do DOM: atualizar não o grava"""
+        with self._trava:
+            self._nao_confirmados.add(codigo)
+
+    def remover(self, codigo):
+        with self._trava:
+            if self._codigos.pop(codigo, None) is not None:
+                self._alterados.add(codigo)
+
+    def atualizar(self, resultado):
+        """Aplica o resultado de baixar_estacoes: novos negativos entram, estações baixadas saem"""
+        with self._trava:
+            nao_confirmados, self._nao_confirmados = self._nao_confirmados, set()
+        for codigo in resultado.get('inexistentes', []):
+            if codigo not in nao_confirmados:
+                self.registrar(codigo, "inexistente")
+        for codigo in resultado.get('sem_dados', []):
+            if codigo not in nao_confirmados:
+                self.registrar(codigo, "sem_dados")
+        for codigo in resultado.get('baixadas', []):
+            self.remover(codigo)
+        self.salvar()
+
+# Um cache por processo, compartilhado entre threads
+_cache = None
+_trava_cache = threading.Lock()
+
+def obter_cache_negativo():
+    """Retorna o cache negativo (Scripts/dados/cache_negativo.json), carregando-o na primeira chamada"""
+    global _cache
+    with _trava_cache:
+        if _cache is None:
+            _cache = CacheNegativo(Path(criar_pasta_base()) / "Scripts" / "dados" / NOME_CACHE)
+        return _cache
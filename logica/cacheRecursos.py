@@ -0,0 +1,204 @@
+# scripts/logica/cacheRecursos.py - CACHE EM DISCO DOS RECURSOS DO SITE (BUNDLES DO ANGULAR)
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from logica.consumo import criar_pasta_base
+
+# Liga o cache com HIDROWEB_CACHE_NAVEGADOR=1
+CACHE_NAVEGADOR = (os.environ.get("HIDROWEB_CACHE_NAVEGADOR") or "").lower() in ("1", "true", "sim")
+
+# Bundles têm hash no nome e mudam pouco; a página em si é revalidada com mais frequência
+VALIDADE_SCRIPTS_HORAS = 7 * 24
+VALIDADE_DOCUMENTO_HORAS = 12
+# Listas fixas da API (entidades, bacias...) que a página busca ao abrir
+VALIDADE_METADADOS_HORAS = 1
+
+# Consultas por estação nunca passam pelo cache: busca do código e download do CSV
+TRECHOS_API_DINAMICA = ('/estacoes', '/documento')
+
+# Cabeçalhos que não valem para o corpo já decodificado guardado em disco
+CABECALHOS_DESCARTADOS = ('content-encoding', 'content-length', 'transfer-encoding', 'connection', 'set-cookie')
+
+def criar_pasta_cache():
+    """Pasta do cache: Estações_Hidroweb/Scripts/cache_navegador"""
+    pasta = Path(criar_pasta_base()) / "Scripts" / "cache_navegador"
+    pasta.mkdir(parents=True, exist_ok=True)
+    return pasta
+
+class CacheRecursos:
+    """
+    Cache HTTP em disco, exclusivo da ferramenta, para os scripts e a página do Hidroweb.
+
+    Cada página roda num contexto anônimo (isolado, reciclável e paralelo), e contextos
+    anônimos do Chromium só guardam cache em memória: todo lançamento baixava de novo o
+    bundle do Angular. Aqui as requisições desses recursos passam por page.route: a
+    primeira resposta é gravada (corpo + status + cabeçalhos) e as seguintes - inclusive
+    de outras execuções - são servidas do disco até expirarem. GETs da API sem parâmetros
+    (metadados estáticos) também entram, com validade curta; busca e download, não.
+    """
+
+    def __init__(self, pasta):
+        self.pasta = Path(pasta)
+        self.pasta.mkdir(parents=True, exist_ok=True)
+        self.acertos = 0
+        self.faltas = 0
+        self.bytes_servidos = 0
+        self._trava = threading.Lock()
+
+    def _caminhos(self, url):
+        chave = hashlib.sha256(url.encode('utf-8')).hexdigest()
+        return self.pasta / f"{chave}.json", self.pasta / f"{chave}.bin"
+
+    def obter(self, url, validade_horas):
+        """(status, cabeçalhos, corpo) da cópia em disco ainda válida, ou None"""
+        caminho_info, caminho_corpo = self._caminhos(url)
+        try:
+            with open(caminho_info, 'r', encoding='utf-8') as f:
+                info = json.load(f)
+            if time.time() - info['salvo_em'] > validade_horas * 3600:
+                return None
+            corpo = caminho_corpo.read_bytes()
+        except (OSError, ValueError, KeyError):
+            return None
+
+        with self._trava:
+            self.acertos += 1
+            self.bytes_servidos += len(corpo)
+        return info['status'], info['cabecalhos'], corpo
+
+    def gravar(self, url, status, cabecalhos, corpo):
+        caminho_info, caminho_corpo = self._caminhos(url)
+        cabecalhos = {nome: valor for nome, valor in cabecalhos.items() if nome.lower() not in CABECALHOS_DESCARTADOS}
+        try:
+            # Corpo antes da descrição: uma descrição sempre aponta para um corpo completo
+            temporario = f"{caminho_corpo}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporario, 'wb') as f:
+                f.write(corpo)
+            os.replace(temporario, caminho_corpo)
+
+            temporario = f"{caminho_info}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump({'url': url, 'status': status, 'cabecalhos': cabecalhos, 'salvo_em': time.time()}, f)
+            os.replace(temporario, caminho_info)
+        except OSError as e:
+            print(f"⚠️ Cache do navegador: não foi possível gravar {url}: {e}")
+
+    def registrar_falta(self):
+        with self._trava:
+            self.faltas += 1
+
+    def resumo(self):
+        """Imprime e zera os contadores da execução"""
+        with self._trava:
+            acertos, faltas, servidos = self.acertos, self.faltas, self.bytes_servidos
+            self.acertos = self.faltas = self.bytes_servidos = 0
+        if acertos or faltas:
+            print(f"   🗃️ Cache do navegador: {acertos} do disco ({servidos / 1024 / 1024:.1f} MB) | {faltas} da rede")
+
+def eh_metadado_estatico(url):
+    """GET da API sem parâmetros e fora da busca/download: listas fixas carregadas pela página"""
+    partes = urlsplit(url)
+    if '/rest/api/' not in partes.path or partes.query:
+        return False
+    return not any(trecho in partes.path for trecho in TRECHOS_API_DINAMICA)
+
+def validade_da_requisicao(requisicao):
+    """Horas de validade conforme o tipo do recurso, ou None se não deve passar pelo cache"""
+    if requisicao.method != "GET":
+        return None
+    if requisicao.resource_type == "script":
+        return VALIDADE_SCRIPTS_HORAS
+    if requisicao.resource_type == "document":
+        return VALIDADE_DOCUMENTO_HORAS
+    if requisicao.resource_type in ("xhr", "fetch") and eh_metadado_estatico(requisicao.url):
+        return VALIDADE_METADADOS_HORAS
+    return None
+
+def instalar_cache_recursos(page, url_pagina):
+    """Serve a página e seus scripts a partir do cache em disco (page.route)"""
+    cache = obter_cache_recursos()
+
+    def servir(route):
+        requisicao = route.request
+        validade = validade_da_requisicao(requisicao)
+        if validade is None:
+            route.fallback()
+            return
+
+        guardado = cache.obter(requisicao.url, validade)
+        if guardado is not None:
+            status, cabecalhos, corpo = guardado
+            route.fulfill(status=status, headers=cabecalhos, body=corpo)
+            return
+
+        try:
+            resposta = route.fetch()
+            corpo = resposta.body()
+        except Exception:
+            # Sem resposta para guardar: o navegador tenta pela rede normalmente
+            route.fallback()
+            return
+        cache.registrar_falta()
+        if resposta.ok:
+            cache.gravar(requisicao.url, resposta.status, resposta.headers, corpo)
+        route.fulfill(response=resposta, body=corpo)
+
+    page.route(url_pagina, servir)
+    page.route("**/*.js", servir)
+    page.route(eh_metadado_estatico, servir)
+
+async def instalar_cache_recursos_async(page, url_pagina):
+    """Versão assíncrona de instalar_cache_recursos"""
+    cache = obter_cache_recursos()
+
+    async def servir(route):
+        requisicao = route.request
+        validade = validade_da_requisicao(requisicao)
+        if validade is None:
+            await route.fallback()
+            return
+
+        guardado = cache.obter(requisicao.url, validade)
+        if guardado is not None:
+            status, cabecalhos, corpo = guardado
+            await route.fulfill(status=status, headers=cabecalhos, body=corpo)
+            return
+
+        try:
+            resposta = await route.fetch()
+            corpo = await resposta.body()
+        except Exception:
+            # Sem resposta para guardar: o navegador tenta pela rede normalmente
+            await route.fallback()
+            return
+        cache.registrar_falta()
+        if resposta.ok:
+            cache.gravar(requisicao.url, resposta.status, resposta.headers, corpo)
+        await route.fulfill(response=resposta, body=corpo)
+
+    await page.route(url_pagina, servir)
+    await page.route("**/*.js", servir)
+    await page.route(eh_metadado_estatico, servir)
+
+# Um cache por processo, compartilhado por todas as páginas
+_cache = None
+_trava_cache = threading.Lock()
+
+def obter_cache_recursos():
+    global _cache
+    with _trava_cache:
+        if _cache is None:
+            _cache = CacheRecursos(criar_pasta_cache())
+        return _cache
+
+def resumo_cache_recursos():
+    """Imprime acertos/faltas do cache (se foi usado nesta execução)"""
+    with _trava_cache:
+        cache = _cache
+    if cache is not None:
+        cache.resumo()
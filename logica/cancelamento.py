@@ -0,0 +1,102 @@
+# scripts/logica/cancelamento.py - CANCELAMENTO COOPERATIVO DAS ESPERAS DO NAVEGADOR
+import threading
+import time
+
+from playwright.sync_api import TimeoutError as PlaywrightTimeoutError
+
+# Nenhuma espera fica mais do que isso sem conferir se a parada foi pedida
+FATIA_ESPERA_MS = 100
+
+class OperacaoCancelada(Exception):
+    """A parada foi pedida durante uma espera do navegador"""
+
+class TokenCancelamento:
+    """
+    Sinal de parada compartilhado por todas as páginas e threads de um lote.
+
+    É chamável como o antigo parar_callback (token() → True quando parado), então
+    pode ser passado onde um parar_callback é esperado. Opcionalmente embrulha um
+    parar_callback existente (ex.: a flag da interface), consultado a cada fatia.
+    As esperas longas do Playwright são divididas em fatias de FATIA_ESPERA_MS, e
+    verificar() interrompe a operação com OperacaoCancelada.
+    """
+
+    def __init__(self, parar_callback=None):
+        self._evento = threading.Event()
+        self._parar_callback = parar_callback
+
+    def cancelar(self):
+        self._evento.set()
+
+    @property
+    def cancelado(self):
+        if self._evento.is_set():
+            return True
+        if self._parar_callback and self._parar_callback():
+            self._evento.set()
+            return True
+        return False
+
+    def __call__(self):
+        return self.cancelado
+
+    def verificar(self):
+        """Lança OperacaoCancelada se a parada foi pedida"""
+        if self.cancelado:
+            raise OperacaoCancelada()
+
+    def esperar(self, segundos):
+        """time.sleep interrompível. Retorna False se a parada foi pedida antes do fim."""
+        limite = time.monotonic() + segundos
+        while not self.cancelado:
+            restante = limite - time.monotonic()
+            if restante <= 0:
+                return True
+            self._evento.wait(min(FATIA_ESPERA_MS / 1000, restante))
+        return False
+
+def obter_token(parar_callback=None):
+    """Usa o token recebido ou cria um que embrulha o parar_callback"""
+    if isinstance(parar_callback, TokenCancelamento):
+        return parar_callback
+    return TokenCancelamento(parar_callback)
+
+def aguardar_locator(locator, timeout, token=None, state='visible'):
+    """
+    locator.wait_for em fatias de FATIA_ESPERA_MS.
+    Retorna True quando o estado é atingido e False no timeout (ms).
+    """
+    if token is None:
+        try:
+            locator.wait_for(timeout=timeout, state=state)
+            return True
+        except PlaywrightTimeoutError:
+            return False
+
+    limite = time.monotonic() + timeout / 1000
+    while True:
+        token.verificar()
+        restante = (limite - time.monotonic()) * 1000
+        if restante <= 0:
+            return False
+        try:
+            locator.wait_for(timeout=max(1, min(FATIA_ESPERA_MS, restante)), state=state)
+            return True
+        except PlaywrightTimeoutError:
+            continue
+
+def aguardar_evento_pagina(page, recebidos, timeout, token=None, descricao="evento"):
+    """
+    Aguarda um ouvinte registrado com page.on(...) preencher a lista recebidos.
+    page.wait_for_timeout processa os eventos do Playwright entre as fatias.
+    Retorna o primeiro item recebido; PlaywrightTimeoutError no timeout (ms).
+    """
+    limite = time.monotonic() + timeout / 1000
+    while not recebidos:
+        if token is not None:
+            token.verificar()
+        restante = (limite - time.monotonic()) * 1000
+        if restante <= 0:
+            raise PlaywrightTimeoutError(f"Timeout {timeout}ms aguardando {descricao}")
+        page.wait_for_timeout(max(1, min(FATIA_ESPERA_MS, restante)))
+    return recebidos[0]
@@ -3,6 +3,8 @@ import os
 import re
 import getpass
 import shutil
+import threading
+import time
 from glob import glob
 from datetime import datetime
 from pathlib import Path
@@ -14,11 +16,17 @@ def criar_pasta_base(tipo_consulta="normal"):
     Args:
         tipo_consulta (str): "normal" para pasta principal, "consultadas" para apenas consultas
     
+    A variável de ambiente HIDROWEB_PASTA_BASE substitui Downloads/Estações_Hidroweb
+    (ex.: benchmarks contra o Hidroweb simulado sem tocar nos arquivos reais).
+    
     Returns:
         str: Caminho da pasta criada
     """
-    usuario = getpass.getuser()
-    caminho_base = Path(f"C:\\Users\\{usuario}\\Downloads\\Estações_Hidroweb")
+    if os.environ.get("HIDROWEB_PASTA_BASE"):
+        caminho_base = Path(os.environ["HIDROWEB_PASTA_BASE"])
+    else:
+        usuario = getpass.getuser()
+        caminho_base = Path(f"C:\\Users\\{usuario}\\Downloads\\Estações_Hidroweb")
     
     # SEMPRE criar pasta Scripts/dados
     pasta_scripts_dados = caminho_base / "Scripts" / "dados"
@@ -32,6 +40,303 @@ def criar_pasta_base(tipo_consulta="normal"):
     caminho_final.mkdir(parents=True, exist_ok=True)
     return str(caminho_final)
 
+def criar_pasta_staging(pasta_staging=None):
+    """
+    Cria a pasta de staging onde os downloads são gravados antes de irem para o destino.
+    
+    Args:
+        pasta_staging (str, optional): Caminho escolhido (ex.: um tmpfs). Se None, usa a
+            variável de ambiente HIDROWEB_STAGING ou Estações_Hidroweb/Scripts/staging
+    
+    Returns:
+        str: Caminho da pasta de staging
+    """
+    if pasta_staging is None:
+        pasta_staging = os.environ.get("HIDROWEB_STAGING")
+    
+    if pasta_staging is None:
+        # Mesmo volume do destino: a promoção do arquivo é um rename atômico
+        caminho = Path(criar_pasta_base()) / "Scripts" / "staging"
+    else:
+        caminho = Path(pasta_staging)
+    
+    caminho.mkdir(parents=True, exist_ok=True)
+    return str(caminho)
+
+# Nome dos ZIPs baixados: Estacao_<código>_CSV_<data>T<hora>.zip
+REGEX_ARQUIVO_ESTACAO = re.compile(r'Estacao_(\d+)_CSV_.*\.zip$')
+REGEX_DATA_ARQUIVO = re.compile(r'Estacao_\d+_CSV_(\d{4}-\d{2}-\d{2})T')
+
+class IndiceEstacoes:
+    """
+    Índice em memória dos ZIPs de uma pasta: código → versões (arquivo, nome, data, tamanho, mtime).
+    
+    Montado com uma única passada de os.scandir e atualizado no lugar quando este
+    processo adiciona, move ou remove arquivos, em vez de um glob + regex da pasta
+    inteira a cada consulta (O(arquivos) por estação, O(estações × arquivos) por lote).
+    Cada consulta confere o mtime da pasta: se outro processo (ou o usuário) mexeu
+    nela, o índice é refeito na próxima leitura.
+    
+    Para alterar a pasta: marca = indice.marca() antes da operação no disco e
+    adicionar/remover(caminho, marca) logo depois. O mtime resultante só é adotado
+    se a marca bate com o mtime já indexado; senão outro processo mexeu na pasta
+    (ex.: trabalhadores da fila compartilhada) e o índice é refeito na próxima leitura.
+    """
+    
+    def __init__(self, pasta):
+        self.pasta = str(pasta)
+        self._trava = threading.RLock()
+        self._versoes = {}
+        self._mtime_pasta = None
+    
+    def _mtime_atual(self):
+        try:
+            return os.stat(self.pasta).st_mtime_ns
+        except OSError:
+            return None
+    
+    def _descrever(self, codigo, caminho, nome, info):
+        match = REGEX_DATA_ARQUIVO.match(nome)
+        data = None
+        if match:
+            try:
+                data = datetime.strptime(match.group(1), "%Y-%m-%d")
+            except ValueError:
+                pass
+        return {
+            'codigo': codigo,
+            'arquivo': caminho,
+            'nome': nome,
+            'data': data,
+            'tamanho': info.st_size,
+            'mtime': info.st_mtime
+        }
+    
+    def recarregar(self):
+        """Refaz o índice com uma única varredura da pasta"""
+        with self._trava:
+            # mtime lido antes da varredura: mudanças durante ela forçam nova leitura
+            mtime = self._mtime_atual()
+            versoes = {}
+            try:
+                with os.scandir(self.pasta) as entradas:
+                    for entrada in entradas:
+                        match = REGEX_ARQUIVO_ESTACAO.match(entrada.name)
+                        if not match:
+                            continue
+                        try:
+                            if not entrada.is_file():
+                                continue
+                            info = entrada.stat()
+                        except OSError:
+                            continue
+                        versoes.setdefault(match.group(1), []).append(self._descrever(match.group(1), entrada.path, entrada.name, info))
+            except FileNotFoundError:
+                pass
+            self._versoes = versoes
+            self._mtime_pasta = mtime
+    
+    def marca(self):
+        """mtime atual da pasta, a ser lido antes de uma operação seguida de adicionar/remover"""
+        return self._mtime_atual()
+    
+    def _adotar_alteracao(self, marca):
+        # Chamado sob a trava. False = índice invalidado (refeito na próxima leitura)
+        if marca is None or self._mtime_pasta is None or marca != self._mtime_pasta:
+            self._mtime_pasta = None
+            return False
+        return True
+    
+    def _conferir(self):
+        if self._mtime_pasta is None or self._mtime_atual() != self._mtime_pasta:
+            self.recarregar()
+    
+    def versoes(self, codigo):
+        """Arquivos da estação na pasta (lista vazia se não houver)"""
+        with self._trava:
+            self._conferir()
+            return [dict(versao) for versao in self._versoes.get(codigo, [])]
+    
+    def mais_recente(self, codigo):
+        """Versão mais recente da estação (pela data do nome, depois pelo nome), ou None"""
+        versoes = self.versoes(codigo)
+        if not versoes:
+            return None
+        return max(versoes, key=lambda versao: (versao['data'] or datetime.min, versao['nome']))
+    
+    def codigos(self):
+        with self._trava:
+            self._conferir()
+            return list(self._versoes)
+    
+    def todas(self):
+        """Todas as versões de todas as estações"""
+        with self._trava:
+            self._conferir()
+            return [dict(versao) for versoes in self._versoes.values() for versao in versoes]
+    
+    def adicionar(self, caminho, marca=None):
+        """Registra um arquivo recém-gravado/movido para esta pasta (marca: ver marca())"""
+        nome = os.path.basename(caminho)
+        match = REGEX_ARQUIVO_ESTACAO.match(nome)
+        with self._trava:
+            if not self._adotar_alteracao(marca) or not match:
+                return
+            try:
+                info = os.stat(caminho)
+            except OSError:
+                self._mtime_pasta = None
+                return
+            versoes = [versao for versao in self._versoes.get(match.group(1), []) if versao['nome'] != nome]
+            versoes.append(self._descrever(match.group(1), os.path.join(self.pasta, nome), nome, info))
+            self._versoes[match.group(1)] = versoes
+            self._mtime_pasta = self._mtime_atual()
+    
+    def remover(self, caminho, marca=None):
+        """Tira do índice um arquivo apagado/movido desta pasta (marca: ver marca())"""
+        nome = os.path.basename(caminho)
+        match = REGEX_ARQUIVO_ESTACAO.match(nome)
+        with self._trava:
+            if not self._adotar_alteracao(marca) or not match:
+                return
+            versoes = [versao for versao in self._versoes.get(match.group(1), []) if versao['nome'] != nome]
+            if versoes:
+                self._versoes[match.group(1)] = versoes
+            else:
+                self._versoes.pop(match.group(1), None)
+            self._mtime_pasta = self._mtime_atual()
+
+# Um índice por pasta e por processo, compartilhado entre threads
+_indices = {}
+_trava_indices = threading.Lock()
+
+def obter_indice(pasta_destino=None):
+    """Retorna o índice de arquivos da pasta, montando-o na primeira chamada"""
+    if pasta_destino is None:
+        pasta_destino = criar_pasta_base()
+    chave = os.path.normcase(os.path.abspath(pasta_destino))
+    with _trava_indices:
+        if chave not in _indices:
+            _indices[chave] = IndiceEstacoes(pasta_destino)
+        return _indices[chave]
+
+def separar_estacoes_frescas(estacoes, pasta_destino, ttl_horas):
+    """
+    Separa as estações baixadas há menos de ttl_horas das que precisam ser baixadas.
+    
+    A data do download vem do manifesto (baixado_em) ou, sem registro, da data de
+    modificação do ZIP mais recente da estação na pasta de destino.
+    
+    Returns:
+        tuple: (pendentes, frescas) preservando a ordem original
+    """
+    if not ttl_horas or ttl_horas <= 0:
+        return list(estacoes), []
+    
+    from logica.manifesto import obter_manifesto
+    
+    limite = time.time() - ttl_horas * 3600
+    manifesto = obter_manifesto(pasta_destino)
+    
+    # mtime mais recente por código, a partir do índice da pasta
+    modificados = {}
+    for versao in obter_indice(pasta_destino).todas():
+        codigo = versao['codigo']
+        if versao['mtime'] > modificados.get(codigo, 0):
+            modificados[codigo] = versao['mtime']
+    
+    pendentes = []
+    frescas = []
+    for codigo in estacoes:
+        if codigo not in modificados:
+            pendentes.append(codigo)
+            continue
+        
+        momento = modificados[codigo]
+        entrada = manifesto.obter(codigo)
+        if entrada and entrada.get('baixado_em'):
+            try:
+                momento = datetime.fromisoformat(entrada['baixado_em']).timestamp()
+            except ValueError:
+                pass
+        
+        if momento >= limite:
+            frescas.append(codigo)
+        else:
+            pendentes.append(codigo)
+    
+    return pendentes, frescas
+
+# Ordem de trabalho de um lote: "maiores_primeiro" (menor tempo total em paralelo),
+# "menores_primeiro" (resultados rápidos) ou "original" (ordem colada pelo usuário)
+ORDEM_ESTACOES = os.environ.get("HIDROWEB_ORDEM_ESTACOES") or "maiores_primeiro"
+
+def tamanhos_conhecidos(estacoes, pasta_destino):
+    """
+    Tamanho (bytes) do último ZIP de cada estação: o do manifesto ou, sem registro,
+    o do arquivo mais recente na pasta. Estações nunca baixadas ficam de fora.
+    """
+    from logica.manifesto import obter_manifesto
+    
+    manifesto = obter_manifesto(pasta_destino)
+    tamanhos = {}
+    pendentes = set()
+    for codigo in estacoes:
+        entrada = manifesto.obter(codigo)
+        if entrada and entrada.get('tamanho'):
+            tamanhos[codigo] = entrada['tamanho']
+        else:
+            pendentes.add(codigo)
+    
+    if pendentes:
+        # Tamanho do arquivo mais recente (mtime) de cada código, a partir do índice da pasta
+        indice = obter_indice(pasta_destino)
+        for codigo in pendentes:
+            versoes = indice.versoes(codigo)
+            if versoes:
+                tamanhos[codigo] = max(versoes, key=lambda versao: versao['mtime'])['tamanho']
+    
+    return tamanhos
+
+def ordenar_por_tamanho(estacoes, pastas_destino, ordem=ORDEM_ESTACOES):
+    """
+    Ordena o lote pelo tamanho dos downloads anteriores.
+    
+    Com várias páginas em paralelo, começar pelas maiores (LPT) evita que o fim do
+    lote seja uma estação enorme baixando sozinha; começar pelas menores dá retorno
+    mais rápido. Estações sem histórico valem a mediana das conhecidas. Empates
+    mantêm a ordem original.
+    
+    Args:
+        estacoes: Códigos na ordem recebida
+        pastas_destino: Pasta (ou lista de pastas) onde procurar os ZIPs anteriores
+        ordem: "maiores_primeiro", "menores_primeiro" ou "original"
+    
+    Returns:
+        list: Códigos na nova ordem
+    """
+    if ordem not in ("maiores_primeiro", "menores_primeiro") or len(estacoes) < 2:
+        return list(estacoes)
+    
+    if isinstance(pastas_destino, (str, Path)):
+        pastas_destino = [pastas_destino]
+    
+    tamanhos = {}
+    for pasta in pastas_destino:
+        for codigo, tamanho in tamanhos_conhecidos(estacoes, pasta).items():
+            tamanhos[codigo] = max(tamanho, tamanhos.get(codigo, 0))
+    
+    if not tamanhos:
+        return list(estacoes)
+    
+    conhecidos = sorted(tamanhos.values())
+    mediana = conhecidos[len(conhecidos) // 2]
+    return sorted(
+        estacoes,
+        key=lambda codigo: tamanhos.get(codigo, mediana),
+        reverse=(ordem == "maiores_primeiro")
+    )
+
 def criar_estrutura_pastas():
     """Cria toda a estrutura de pastas necessária para o projeto"""
     estrutura = {
@@ -47,80 +352,37 @@ def criar_estrutura_pastas():
 
 def verificar_arquivo_existe(base_destino, codigo_estacao):
     """Verifica se arquivo da estação já existe na pasta especificada"""
-    if base_destino is None:
-        base_destino = criar_pasta_base()
-    
-    base_path = Path(base_destino)
-    padrao = f'Estacao_{codigo_estacao}_CSV_*.zip'
-    
-    arquivos = list(base_path.glob(padrao))
-    return len(arquivos) > 0
+    return len(obter_indice(base_destino).versoes(codigo_estacao)) > 0
 
 def verificar_arquivo_mais_recente(base_destino, codigo_estacao):
     """
     Retorna informações do arquivo mais recente da estação.
     Retorna dict com 'existe', 'arquivo', 'data', 'tamanho' ou None se não existir.
     """
-    if base_destino is None:
-        base_destino = criar_pasta_base()
-    
-    base_path = Path(base_destino)
-    padrao = f'Estacao_{codigo_estacao}_CSV_*.zip'
-    
-    arquivos = list(base_path.glob(padrao))
+    versao = obter_indice(base_destino).mais_recente(codigo_estacao)
     
-    if not arquivos:
+    if versao is None or versao['data'] is None:
         return None
     
-    arquivo_mais_recente = None
-    data_mais_recente = None
-    
-    for arquivo_path in arquivos:
-        nome = arquivo_path.name
-        match = re.search(r'Estacao_(\d+)_CSV_(\d{4}-\d{2}-\d{2})T', nome)
-        if match:
-            data_str = match.group(2)
-            try:
-                data_dt = datetime.strptime(data_str, "%Y-%m-%d")
-                if data_mais_recente is None or data_dt > data_mais_recente:
-                    data_mais_recente = data_dt
-                    arquivo_mais_recente = arquivo_path
-            except ValueError:
-                continue
-    
-    if arquivo_mais_recente:
-        return {
-            'existe': True,
-            'arquivo': str(arquivo_mais_recente),
-            'nome': arquivo_mais_recente.name,
-            'data': data_mais_recente,
-            'tamanho': arquivo_mais_recente.stat().st_size
-        }
-    
-    return None
+    return {
+        'existe': True,
+        'arquivo': versao['arquivo'],
+        'nome': versao['nome'],
+        'data': versao['data'],
+        'tamanho': versao['tamanho']
+    }
 
 def listar_estacoes_baixadas(base_destino=None):
     """Lista todas as estações baixadas com suas informações"""
-    if base_destino is None:
-        base_destino = criar_pasta_base()
-    
-    base_path = Path(base_destino)
-    padrao = 'Estacao_*_CSV_*.zip'
-    
     estacoes = []
     
-    for arquivo_path in base_path.glob(padrao):
-        nome = arquivo_path.name
-        match = re.search(r'Estacao_(\d+)_CSV_(\d{4}-\d{2}-\d{2})T', nome)
-        if match:
-            codigo = match.group(1)
-            data = match.group(2)
-            tamanho = arquivo_path.stat().st_size
+    for versao in obter_indice(base_destino).todas():
+        if versao['data'] is not None:
             estacoes.append({
-                'codigo': codigo,
-                'data': data,
-                'tamanho': tamanho,
-                'arquivo': nome
+                'codigo': versao['codigo'],
+                'data': versao['data'].strftime("%Y-%m-%d"),
+                'tamanho': versao['tamanho'],
+                'arquivo': versao['nome']
             })
     
     return sorted(estacoes, key=lambda x: x['codigo'])
@@ -149,30 +411,12 @@ def verificar_duplicatas_e_organizar(pasta_destino=None):
     
     print(f"🔍 Verificando duplicatas em: {pasta_destino}")
     
-    base_path = Path(pasta_destino)
-    padrao = 'Estacao_*_CSV_*.zip'
+    indice = obter_indice(pasta_destino)
     estacoes_por_codigo = {}
     
-    for arquivo_path in base_path.glob(padrao):
-        nome = arquivo_path.name
-        match = re.search(r'Estacao_(\d+)_CSV_(\d{4}-\d{2}-\d{2})T', nome)
-        if match:
-            codigo = match.group(1)
-            data = match.group(2)
-            try:
-                data_dt = datetime.strptime(data, "%Y-%m-%d")
-            except ValueError:
-                continue
-            
-            if codigo not in estacoes_por_codigo:
-                estacoes_por_codigo[codigo] = []
-            
-            estacoes_por_codigo[codigo].append({
-                'arquivo': str(arquivo_path),
-                'nome': nome,
-                'data': data_dt,
-                'tamanho': arquivo_path.stat().st_size
-            })
+    for versao in indice.todas():
+        if versao['data'] is not None:
+            estacoes_por_codigo.setdefault(versao['codigo'], []).append(versao)
     
     removidos = 0
     mantidos = 0
@@ -190,7 +434,9 @@ def verificar_duplicatas_e_organizar(pasta_destino=None):
             
             for arquivo_antigo in arquivos[1:]:
                 try:
+                    marca = indice.marca()
                     Path(arquivo_antigo['arquivo']).unlink()
+                    indice.remover(arquivo_antigo['arquivo'], marca)
                     print(f"    🗑️  Removido: {arquivo_antigo['nome']} ({arquivo_antigo['tamanho']} bytes)")
                     removidos += 1
                 except Exception as e:
@@ -252,16 +498,10 @@ def calcular_estatisticas(pasta_path):
             'tamanho_mb': 0
         }
     
-    padrao = 'Estacao_*_CSV_*.zip'
-    arquivos = list(base_path.glob(padrao))
+    arquivos = obter_indice(pasta_path).todas()
     
-    tamanho_total = sum(arquivo.stat().st_size for arquivo in arquivos)
-    
-    codigos_unicos = set()
-    for arquivo in arquivos:
-        match = re.search(r'Estacao_(\d+)_CSV_', arquivo.name)
-        if match:
-            codigos_unicos.add(match.group(1))
+    tamanho_total = sum(versao['tamanho'] for versao in arquivos)
+    codigos_unicos = {versao['codigo'] for versao in arquivos}
     
     return {
         'total_arquivos': len(arquivos),
@@ -270,24 +510,6 @@ def calcular_estatisticas(pasta_path):
         'tamanho_mb': round(tamanho_total / (1024 * 1024), 2)
     }
 
-def comparar_tamanhos_estacao(pasta_destino, codigo_estacao, novo_tamanho):
-    """
-    Compara o tamanho de um novo arquivo com o arquivo existente mais recente.
-    Retorna True se deve fazer download (tamanhos diferentes ou não existe),
-    False se não deve fazer download (mesmo tamanho).
-    """
-    info_arquivo = verificar_arquivo_mais_recente(pasta_destino, codigo_estacao)
-    
-    if not info_arquivo:
-        return True  # Não existe arquivo, deve fazer download
-    
-    if info_arquivo['tamanho'] != novo_tamanho:
-        print(f"    📊 Tamanhos diferentes - Existente: {info_arquivo['tamanho']} bytes, Novo: {novo_tamanho} bytes")
-        return True  # Tamanhos diferentes, deve fazer download
-    else:
-        print(f"    ⚖️ Mesmo tamanho ({info_arquivo['tamanho']} bytes) - Mantendo arquivo existente")
-        return False  # Mesmo tamanho, não precisa fazer download
-
 def mover_arquivos_entre_pastas(origem="consultadas", destino="principal"):
     """
     Move arquivos entre as pastas organizadas.
@@ -301,21 +523,22 @@ def mover_arquivos_entre_pastas(origem="consultadas", destino="principal"):
     
     print(f"📦 Movendo arquivos de {origem} para {destino}...")
     
-    origem_path = Path(pasta_origem)
     destino_path = Path(pasta_destino)
-    
-    padrao = 'Estacao_*_CSV_*.zip'
-    arquivos = list(origem_path.glob(padrao))
+    indice_origem = obter_indice(pasta_origem)
+    indice_destino = obter_indice(pasta_destino)
     
     movidos = 0
-    for arquivo in arquivos:
+    for versao in indice_origem.todas():
         try:
-            arquivo_destino = destino_path / arquivo.name
-            shutil.move(str(arquivo), str(arquivo_destino))
-            print(f"  ✅ Movido: {arquivo.name}")
+            arquivo_destino = destino_path / versao['nome']
+            marca_origem, marca_destino = indice_origem.marca(), indice_destino.marca()
+            shutil.move(versao['arquivo'], str(arquivo_destino))
+            indice_origem.remover(versao['arquivo'], marca_origem)
+            indice_destino.adicionar(str(arquivo_destino), marca_destino)
+            print(f"  ✅ Movido: {versao['nome']}")
             movidos += 1
         except Exception as e:
-            print(f"  ❌ Erro ao mover {arquivo.name}: {e}")
+            print(f"  ❌ Erro ao mover {versao['nome']}: {e}")
     
     print(f"📊 {movidos} arquivos movidos com sucesso")
     return movidos
@@ -326,17 +549,17 @@ def limpar_pasta_especifica(tipo_pasta="consultadas"):
     
     print(f"🧹 Limpando pasta {tipo_pasta}: {pasta_path}")
     
-    base_path = Path(pasta_path)
-    padrao = 'Estacao_*_CSV_*.zip'
-    arquivos = list(base_path.glob(padrao))
+    indice = obter_indice(pasta_path)
     
     removidos = 0
-    for arquivo in arquivos:
+    for versao in indice.todas():
         try:
-            arquivo.unlink()
+            marca = indice.marca()
+            Path(versao['arquivo']).unlink()
+            indice.remover(versao['arquivo'], marca)
             removidos += 1
         except Exception as e:
-            print(f"❌ Erro ao remover {arquivo.name}: {e}")
+            print(f"❌ Erro ao remover {versao['nome']}: {e}")
     
     print(f"✅ {removidos} arquivos removidos da pasta {tipo_pasta}")
     return removidos
\ No newline at end of file
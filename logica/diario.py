@@ -0,0 +1,164 @@
+# scripts/logica/diario.py - DIÁRIO DE EXECUÇÃO (CHECKPOINT E RETOMADA DE LOTES)
+import json
+import os
+import threading
+from datetime import datetime
+from pathlib import Path
+
+from logica.consumo import criar_pasta_base
+
+# Quantos diários antigos manter na pasta
+MAX_DIARIOS = 20
+
+# Resultados finais que dispensam a estação numa retomada
+RESULTADOS_CONCLUIDOS = ("baixada", "inexistente", "sem_dados", "fresca")
+
+def criar_pasta_diarios():
+    """Pasta dos diários: Estações_Hidroweb/Scripts/dados/execucoes"""
+    pasta = Path(criar_pasta_base()) / "Scripts" / "dados" / "execucoes"
+    pasta.mkdir(parents=True, exist_ok=True)
+    return pasta
+
+class DiarioExecucao:
+    """
+    Diário append-only de um lote (JSON Lines).
+
+    A primeira linha guarda a lista completa de estações; cada estação resolvida
+    ganha uma linha com o resultado, gravada com fsync antes de seguir. Se o
+    processo morrer no meio, o diário diz exatamente o que falta. A linha 'fim'
+    marca o lote como concluído (ou 'retomada' quando outro lote assumiu o resto).
+    """
+
+    def __init__(self, caminho):
+        self.caminho = Path(caminho)
+        self._trava = threading.Lock()
+        self._arquivo = open(self.caminho, 'a', encoding='utf-8')
+        self._ouvintes = []
+
+    @classmethod
+    def criar(cls, estacoes, tipo_consulta="normal", retomada_de=None):
+        pasta = criar_pasta_diarios()
+        nome = f"execucao_{datetime.now().strftime('%Y-%m-%dT%H%M%S_%f')}.jsonl"
+        diario = cls(pasta / nome)
+        diario._gravar({
+            'tipo': 'inicio',
+            'em': datetime.now().isoformat(timespec='seconds'),
+            'tipo_consulta': tipo_consulta,
+            'estacoes': list(estacoes),
+            'retomada_de': str(retomada_de) if retomada_de else None
+        })
+        limpar_diarios_antigos(pasta)
+        return diario
+
+    def _gravar(self, registro):
+        linha = json.dumps(registro, ensure_ascii=False)
+        with self._trava:
+            if self._arquivo.closed:
+                return
+            self._arquivo.write(linha + "\n")
+            self._arquivo.flush()
+            os.fsync(self._arquivo.fileno())
+
+    def adicionar_ouvinte(self, funcao):
+        """funcao(codigo, resultado) é chamada depois que cada estação é gravada (ex.: pipeline de carga)"""
+        self._ouvintes.append(funcao)
+
+    def registrar(self, codigo, resultado, tentativa=1):
+        """Grava o resultado final de uma estação: baixada, inexistente, sem_dados, falhou ou fresca"""
+        self._gravar({'tipo': 'estacao', 'codigo': codigo, 'resultado': resultado, 'tentativa': tentativa})
+        for ouvinte in self._ouvintes:
+            try:
+                ouvinte(codigo, resultado)
+            except Exception as e:
+                print(f"⚠️ Erro ao notificar resultado de {codigo}: {e}")
+
+    def registrar_varias(self, codigos, resultado):
+        for codigo in codigos:
+            self.registrar(codigo, resultado)
+
+    def finalizar(self, concluido=True):
+        """Fecha o diário; com concluido=True o lote não é mais oferecido para retomada"""
+        if concluido:
+            self._gravar({'tipo': 'fim', 'em': datetime.now().isoformat(timespec='seconds')})
+        with self._trava:
+            self._arquivo.close()
+
+def ler_diario(caminho):
+    """
+    Lê um diário tolerando uma última linha truncada (queda no meio da gravação).
+
+    Returns:
+        dict: caminho, tipo_consulta, estacoes, resultados {codigo: resultado}, concluido
+    """
+    info = {'caminho': str(caminho), 'tipo_consulta': 'normal', 'estacoes': [], 'resultados': {}, 'concluido': False}
+
+    with open(caminho, 'r', encoding='utf-8') as f:
+        for linha in f:
+            try:
+                registro = json.loads(linha)
+            except json.JSONDecodeError:
+                break
+
+            tipo = registro.get('tipo')
+            if tipo == 'inicio':
+                info['tipo_consulta'] = registro.get('tipo_consulta', 'normal')
+                info['estacoes'] = registro.get('estacoes', [])
+                info['em'] = registro.get('em')
+            elif tipo == 'estacao':
+                info['resultados'][registro['codigo']] = registro['resultado']
+            elif tipo in ('fim', 'retomada'):
+                info['concluido'] = True
+
+    return info
+
+def estacoes_para_retomar(info):
+    """Estações que ainda não foram resolvidas ou terminaram em falha, na ordem original"""
+    return [
+        codigo for codigo in info['estacoes']
+        if info['resultados'].get(codigo) not in RESULTADOS_CONCLUIDOS
+    ]
+
+def carregar_ultima_execucao_incompleta():
+    """
+    Retorna as informações do diário mais recente se ele não foi concluído e ainda tem
+    estações pendentes (com 'pendentes' preenchido), ou None.
+    """
+    pasta = criar_pasta_diarios()
+    diarios = sorted(pasta.glob("execucao_*.jsonl"))
+    if not diarios:
+        return None
+
+    try:
+        info = ler_diario(diarios[-1])
+    except OSError:
+        return None
+
+    if info['concluido']:
+        return None
+
+    info['pendentes'] = estacoes_para_retomar(info)
+    return info if info['pendentes'] else None
+
+def marcar_como_retomada(caminho):
+    """Marca um diário antigo como assumido por outro lote (não é mais oferecido)"""
+    try:
+        with open(caminho, 'a', encoding='utf-8') as f:
+            f.write(json.dumps({'tipo': 'retomada', 'em': datetime.now().isoformat(timespec='seconds')}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+    except OSError as e:
+        print(f"⚠️ Não foi possível atualizar o diário {caminho}: {e}")
+
+def descartar_ultima_execucao():
+    """Marca a última execução incompleta como encerrada (usuário recusou a retomada)"""
+    info = carregar_ultima_execucao_incompleta()
+    if info:
+        marcar_como_retomada(info['caminho'])
+
+def limpar_diarios_antigos(pasta, manter=MAX_DIARIOS):
+    diarios = sorted(Path(pasta).glob("execucao_*.jsonl"))
+    for caminho in diarios[:-manter]:
+        try:
+            caminho.unlink()
+        except OSError:
+            pass
@@ -0,0 +1,256 @@
+# scripts/logica/downloadHttp.py - DOWNLOAD DIRETO VIA HTTP (SEM NAVEGADOR)
+import http.client
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from urllib.parse import urlsplit
+
+from logica.consumo import criar_pasta_base, criar_pasta_staging
+from logica.manifesto import salvar_manifestos
+from logica.loteEstacoes import (
+    criar_lote_agendado, registrar_resultado_lote, abandonar_estacao_lote, finalizar_lote,
+    extrair_codigo_do_arquivo, mover_arquivo_para_destino, montar_resultado_final
+)
+
+# Endpoint chamado pelo botão CSV da tabela de séries históricas (tipo=3 -> CSV); HIDROWEB_URL_CSV substitui
+URL_DOWNLOAD_CSV = os.environ.get("HIDROWEB_URL_CSV") or "https://www.snirh.gov.br/hidroweb/rest/api/documento/convencionais?tipo=3&documentos={codigo}"
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+TAMANHO_BLOCO = 64 * 1024
+
+class PoolConexoesHttp:
+    """
+    Mantém uma conexão keep-alive por thread para o host do endpoint.
+    A conexão é reaberta automaticamente quando o servidor a encerra.
+    """
+
+    def __init__(self, url_base, timeout=30):
+        partes = urlsplit(url_base)
+        self.https = partes.scheme == "https"
+        self.host = partes.hostname
+        self.porta = partes.port
+        self.timeout = timeout
+        self._local = threading.local()
+        self._conexoes = []
+        self._trava = threading.Lock()
+
+    def _nova_conexao(self):
+        classe = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+        conexao = classe(self.host, self.porta, timeout=self.timeout)
+        with self._trava:
+            self._conexoes.append(conexao)
+        return conexao
+
+    def obter(self):
+        """Retorna a conexão da thread atual, criando-a se necessário"""
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None:
+            conexao = self._nova_conexao()
+            self._local.conexao = conexao
+        return conexao
+
+    def descartar(self):
+        """Fecha a conexão da thread atual (usada após erro de rede)"""
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is not None:
+            conexao.close()
+            self._local.conexao = None
+
+    def fechar_todas(self):
+        with self._trava:
+            for conexao in self._conexoes:
+                try:
+                    conexao.close()
+                except Exception:
+                    pass
+            self._conexoes = []
+
+def nome_arquivo_da_resposta(resposta, codigo):
+    """Usa o nome do Content-Disposition quando é da estação, senão gera no padrão do Hidroweb"""
+    disposicao = resposta.getheader('Content-Disposition') or ""
+    match = re.search(r'filename\*?=(?:UTF-8\'\')?"?([^";]+)"?', disposicao)
+    if match:
+        nome = os.path.basename(match.group(1).strip())
+        if extrair_codigo_do_arquivo(nome) == codigo and nome.endswith('.zip'):
+            return nome
+
+    timestamp = datetime.now().strftime("%Y-%m-%dT%H%M%S")
+    return f"Estacao_{codigo}_CSV_{timestamp}.zip"
+
+def baixar_estacao_http(pool, url_download, codigo, pasta_temp, pasta_destino):
+    """
+    Baixa o ZIP de uma estação com uma única requisição HTTP.
+    Retorna True, "estacao_inexistente", "estacao_sem_dados" ou False (falha técnica).
+    """
+    partes = urlsplit(url_download.format(codigo=codigo))
+    caminho = partes.path + (f"?{partes.query}" if partes.query else "")
+    cabecalhos = {
+        'User-Agent': USER_AGENT,
+        'Accept': 'application/zip, application/octet-stream, */*',
+        'Connection': 'keep-alive'
+    }
+
+    try:
+        conexao = pool.obter()
+        conexao.request("GET", caminho, headers=cabecalhos)
+        resposta = conexao.getresponse()
+
+        if resposta.status == 404:
+            resposta.read()
+            print(f"    ❌ Estação {codigo} não encontrada (HTTP 404)")
+            return "estacao_inexistente"
+
+        if resposta.status == 204:
+            resposta.read()
+            print(f"    📋 Estação {codigo} sem dados (HTTP 204)")
+            return "estacao_sem_dados"
+
+        if resposta.status != 200:
+            resposta.read()
+            print(f"    ❌ {codigo}: HTTP {resposta.status}")
+            return False
+
+        nome_arquivo = nome_arquivo_da_resposta(resposta, codigo)
+        caminho_temp = os.path.join(pasta_temp, nome_arquivo)
+
+        with open(caminho_temp, 'wb') as f:
+            primeiro_bloco = resposta.read(TAMANHO_BLOCO)
+            if not primeiro_bloco.startswith(b'PK'):
+                resposta.read()
+                f.close()
+                os.remove(caminho_temp)
+                if not primeiro_bloco:
+                    # Corpo vazio: a estação não tem CSV disponível
+                    print(f"    📋 Estação {codigo} sem dados CSV disponíveis")
+                    return "estacao_sem_dados"
+                # Página de erro/manutenção com status 200: não é uma resposta sobre a estação
+                print(f"    ❌ {codigo}: resposta não é um ZIP")
+                return False
+
+            f.write(primeiro_bloco)
+            while True:
+                bloco = resposta.read(TAMANHO_BLOCO)
+                if not bloco:
+                    break
+                f.write(bloco)
+
+        print(f"    💾 {nome_arquivo}")
+        return mover_arquivo_para_destino(caminho_temp, pasta_destino, codigo)
+
+    except (http.client.HTTPException, OSError) as e:
+        pool.descartar()
+        print(f"    ❌ Erro de rede em {codigo}: {str(e)}")
+        return False
+
+def baixar_estacoes_http(estacoes, callback_progresso=None, parar_callback=None, tipo_consulta="normal", num_conexoes=4, url_download=URL_DOWNLOAD_CSV, pasta_staging=None, estacoes_frescas=None, controlador=None, diario=None):
+    """
+    Baixa estações chamando diretamente o endpoint do botão CSV, sem abrir o navegador.
+
+    Args:
+        estacoes: Lista de códigos das estações
+        callback_progresso: Função de callback para progresso
+        parar_callback: Função de callback para parar
+        tipo_consulta: "normal" para pasta principal, "consultadas" para pasta consultadas
+        num_conexoes: Número de conexões keep-alive simultâneas
+        url_download: Modelo da URL com {codigo} (permite apontar para um servidor local)
+        pasta_staging: Pasta onde os ZIPs são gravados antes de irem ao destino
+        estacoes_frescas: Estações já filtradas pela política de frescor (só entram no relatório)
+        controlador: ControladorConcorrencia opcional (num_conexoes passa a ser o teto)
+        diario: DiarioExecucao onde cada estação resolvida é registrada
+
+    Returns:
+        dict: Mesmo formato de play.baixar_estacoes
+    """
+    pasta_destino = criar_pasta_base(tipo_consulta)
+    total_estacoes = len(estacoes)
+
+    print(f"📂 Destino: {pasta_destino}")
+    print(f"🎯 Total: {total_estacoes} estações")
+    print(f"📋 Tipo de consulta: {tipo_consulta}")
+    print(f"🔗 Modo HTTP direto - {num_conexoes} conexões")
+
+    lote = criar_lote_agendado(estacoes, controlador, diario=diario)
+    pool = PoolConexoesHttp(url_download)
+    pasta_temp = tempfile.mkdtemp(prefix="execucao_", dir=criar_pasta_staging(pasta_staging))
+
+    def trabalhador():
+        agendador = lote['agendador']
+        while not agendador.finalizado:
+            if parar_callback and parar_callback():
+                return
+            if not lote['disjuntor'].aguardar(parar_callback):
+                return
+            if controlador and not controlador.adquirir(parar_callback):
+                return
+
+            item = agendador.proxima()
+            if item is None:
+                if controlador:
+                    controlador.devolver()
+                continue
+            codigo, tentativa = item
+
+            # Daqui em diante a estação precisa ser registrada: um item que nunca é concluído
+            # deixa o agendador sem finalizar e os outros trabalhadores girando no while
+            resultado = False
+            vaga_ocupada = controlador is not None
+            try:
+                with lote['trava']:
+                    lote['iniciadas'] += 1
+                    idx = min(lote['iniciadas'], total_estacoes)
+
+                tentativa_text = f" (Retry {tentativa})" if tentativa > 1 else ""
+                print(f"[{idx}/{total_estacoes}] 🔗 {codigo}{tentativa_text}")
+                if callback_progresso:
+                    callback_progresso(idx, total_estacoes, f"Baixando {codigo}" + (f" - Retry {tentativa}" if tentativa > 1 else ""))
+
+                inicio = time.perf_counter()
+                try:
+                    resultado = baixar_estacao_http(pool, url_download, codigo, pasta_temp, pasta_destino)
+                except Exception as e:
+                    print(f"    ❌ Erro inesperado em {codigo}: {e}")
+                    resultado = False
+                latencia = time.perf_counter() - inicio
+                with lote['trava']:
+                    lote['latencias'].append(latencia)
+                if controlador:
+                    # liberar devolve a vaga antes de qualquer outra coisa
+                    vaga_ocupada = False
+                    controlador.liberar(latencia, resultado)
+            except Exception as e:
+                print(f"    ❌ Erro inesperado em {codigo}: {e}")
+            finally:
+                if vaga_ocupada:
+                    controlador.devolver()
+
+            try:
+                registrar_resultado_lote(lote, codigo, resultado, tentativa, parar_callback)
+            except Exception as e:
+                print(f"    ❌ Erro ao registrar {codigo}: {e}")
+                abandonar_estacao_lote(lote, codigo)
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, num_conexoes)) as executor:
+            futuros = [executor.submit(trabalhador) for _ in range(max(1, num_conexoes))]
+        for numero, futuro in enumerate(futuros, 1):
+            # Erro fora do download (agendador, controlador, disjuntor) encerra só este trabalhador
+            erro = futuro.exception()
+            if erro is not None:
+                print(f"    ❌ Conexão {numero} encerrada por erro inesperado: {erro!r}")
+    finally:
+        pool.fechar_todas()
+        shutil.rmtree(pasta_temp, ignore_errors=True)
+        salvar_manifestos()
+
+    estacoes_baixadas, estacoes_falharam, estacoes_inexistentes, estacoes_sem_dados = finalizar_lote(lote, parar_callback)
+
+    return montar_resultado_final(
+        estacoes, estacoes_baixadas, estacoes_falharam, estacoes_inexistentes, estacoes_sem_dados, pasta_destino,
+        estacoes_frescas
+    )
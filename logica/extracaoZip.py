@@ -1,12 +1,21 @@
 # scripts/logica/extracaoZip.py - VERSÃO CORRIGIDA E COMPLETA
+import io
 import zipfile
 import os
 import pandas as pd
 from datetime import datetime
 from pathlib import Path
 import getpass
+import re
 
-def extrair_arquivos_cotas(caminho_pasta_zip, caminho_saida=None, callback_progresso=None):
+from logica.manifesto import LINHAS_METADADOS_COTAS
+
+def codigo_estacao_do_arquivo(nome_arquivo):
+    """Extrai o código da estação do nome do ZIP (Estacao_<codigo>_CSV_...)"""
+    match = re.search(r'Estacao_(\d+)_CSV_', nome_arquivo)
+    return match.group(1) if match else None
+
+def extrair_arquivos_cotas(caminho_pasta_zip, caminho_saida=None, callback_progresso=None, apenas_estacoes=None):
     """
     Extrai apenas os arquivos *_Cotas.csv de todos os ZIPs na pasta especificada.
     
@@ -14,6 +23,8 @@ def extrair_arquivos_cotas(caminho_pasta_zip, caminho_saida=None, callback_progr
         caminho_pasta_zip (str): Caminho da pasta contendo os arquivos ZIP
         caminho_saida (str, optional): Pasta de destino. Se None, usa a mesma pasta dos ZIPs
         callback_progresso (callable, optional): Função para callback de progresso
+        apenas_estacoes (iterable, optional): Códigos a extrair (ex.: estações com conteúdo novo
+            segundo o manifesto). Se None, extrai todos os ZIPs
     
     Returns:
         list: Lista de arquivos CSV extraídos
@@ -30,6 +41,12 @@ def extrair_arquivos_cotas(caminho_pasta_zip, caminho_saida=None, callback_progr
     
     # Listar arquivos ZIP
     arquivos_zip = [f for f in os.listdir(caminho_pasta_zip) if f.endswith('.zip')]
+    
+    if apenas_estacoes is not None:
+        apenas_estacoes = set(apenas_estacoes)
+        arquivos_zip = [f for f in arquivos_zip if codigo_estacao_do_arquivo(f) in apenas_estacoes]
+        print(f"📋 {len(arquivos_zip)} ZIPs com conteúdo novo selecionados")
+    
     total_zips = len(arquivos_zip)
     
     if callback_progresso:
@@ -63,6 +80,159 @@ def extrair_arquivos_cotas(caminho_pasta_zip, caminho_saida=None, callback_progr
     print(f"📊 Total de arquivos extraídos: {len(arquivos_extraidos)}")
     return arquivos_extraidos
 
+def preparar_dataframe_cotas(df, arquivo):
+    """
+    Converte um *_Cotas.csv lido do Hidroweb para o padrão do banco SIPAM:
+    seleciona e renomeia as colunas, converte datas para YYYY-MM e formata as horas.
+    
+    Args:
+        df (DataFrame): Dados lidos do CSV (após as linhas de metadados)
+        arquivo (str): Nome do arquivo, usado nas mensagens
+    
+    Returns:
+        DataFrame: Dados no padrão do banco, ou None se o arquivo não puder ser usado
+    """
+    # Definir colunas esperadas
+    colunas_esperadas = [
+        'EstacaoCodigo', 'Data', 'hora', 'TipoMedicaoCotas', 'NivelConsistencia',
+        'Cota01', 'Cota02', 'Cota03', 'Cota04', 'Cota05', 'Cota06', 'Cota07', 'Cota08', 'Cota09',
+        'Cota10', 'Cota11', 'Cota12', 'Cota13', 'Cota14', 'Cota15', 'Cota16', 'Cota17', 'Cota18',
+        'Cota19', 'Cota20', 'Cota21', 'Cota22', 'Cota23', 'Cota24', 'Cota25', 'Cota26', 'Cota27',
+        'Cota28', 'Cota29', 'Cota30', 'Cota31', 'Maxima', 'Minima', 'Media',
+        'Cota01Status', 'Cota02Status', 'Cota03Status', 'Cota04Status', 'Cota05Status', 'Cota06Status',
+        'Cota07Status', 'Cota08Status', 'Cota09Status', 'Cota10Status', 'Cota11Status', 'Cota12Status',
+        'Cota13Status', 'Cota14Status', 'Cota15Status', 'Cota16Status', 'Cota17Status', 'Cota18Status',
+        'Cota19Status', 'Cota20Status', 'Cota21Status', 'Cota22Status', 'Cota23Status', 'Cota24Status',
+        'Cota25Status', 'Cota26Status', 'Cota27Status', 'Cota28Status', 'Cota29Status', 'Cota30Status',
+        'Cota31Status', 'MaximaStatus', 'MinimaStatus', 'MediaStatus'
+    ]
+    
+    # Verificar se todas as colunas esperadas existem
+    colunas_faltantes = [col for col in colunas_esperadas if col not in df.columns]
+    
+    if colunas_faltantes:
+        print(f"    ⚠️ Arquivo {arquivo} não possui todas as colunas esperadas")
+        print(f"    📋 Colunas disponíveis: {list(df.columns)}")
+        print(f"    ❌ Colunas faltantes: {colunas_faltantes}")
+        return None
+    
+    # Selecionar e renomear colunas
+    df_selecionado = df[colunas_esperadas].copy()
+    
+    # Renomear colunas para padrão do banco
+    novos_nomes = [
+        'codigo_estacao', 'data', 'hora', 'tipo_medicao_cota', 'nivel_consistencia',
+        'cota01', 'cota02', 'cota03', 'cota04', 'cota05', 'cota06', 'cota07', 'cota08', 'cota09',
+        'cota10', 'cota11', 'cota12', 'cota13', 'cota14', 'cota15', 'cota16', 'cota17', 'cota18',
+        'cota19', 'cota20', 'cota21', 'cota22', 'cota23', 'cota24', 'cota25', 'cota26', 'cota27',
+        'cota28', 'cota29', 'cota30', 'cota31', 'cota_maxima', 'cota_minima', 'cota_media',
+        'cota01_status', 'cota02_status', 'cota03_status', 'cota04_status', 'cota05_status', 'cota06_status',
+        'cota07_status', 'cota08_status', 'cota09_status', 'cota10_status', 'cota11_status', 'cota12_status',
+        'cota13_status', 'cota14_status', 'cota15_status', 'cota16_status', 'cota17_status', 'cota18_status',
+        'cota19_status', 'cota20_status', 'cota21_status', 'cota22_status', 'cota23_status', 'cota24_status',
+        'cota25_status', 'cota26_status', 'cota27_status', 'cota28_status', 'cota29_status', 'cota30_status',
+        'cota31_status', 'cota_maxima_status', 'cota_minima_status', 'cota_media_status'
+    ]
+    
+    df_selecionado.columns = novos_nomes
+    
+    # CORREÇÃO MELHORADA: Transformar formato de data com tratamento de erros
+    print(f"    🗓️ Convertendo datas...")
+    try:
+        # Opção 1: Converter para formato YYYY-MM (mais comum para dados mensais)
+        df_selecionado['data'] = pd.to_datetime(df_selecionado['data'], format='%d/%m/%Y').dt.strftime('%Y-%m')
+        print(f"    ✅ Datas convertidas para formato YYYY-MM")
+    except Exception as e:
+        print(f"    ⚠️ Erro na conversão de data com formato específico: {e}")
+        # Fallback: tentar formato automático
+        try:
+            df_selecionado['data'] = pd.to_datetime(df_selecionado['data']).dt.strftime('%Y-%m')
+            print(f"    ✅ Datas convertidas usando detecção automática")
+        except Exception as e2:
+            print(f"    ❌ Erro crítico na conversão de data: {e2}")
+            return None
+    
+    # Verificar se há valores inválidos na coluna data após conversão
+    valores_invalidos = df_selecionado['data'].isnull().sum()
+    if valores_invalidos > 0:
+        print(f"    ⚠️ {valores_invalidos} registros com data inválida serão removidos")
+        df_selecionado = df_selecionado.dropna(subset=['data'])
+    
+    # Verificar se ainda há dados após limpeza
+    if df_selecionado.empty:
+        print(f"    ❌ Nenhum registro válido após limpeza de datas")
+        return None
+    
+    # CORREÇÃO MELHORADA: Formatar coluna hora com tratamento de erros
+    print(f"    🕐 Formatando horas...")
+    def formatar_hora(x):
+        try:
+            if pd.isna(x) or x == '' or str(x).strip() == '':
+                return 'MEDIA'
+            
+            # Converter para string e limpar
+            hora_str = str(x).strip()
+            
+            # Se já está no formato HH:MM, manter
+            if ':' in hora_str:
+                return hora_str
+            
+            # Se é um número, adicionar :00
+            try:
+                hora_int = int(float(hora_str))
+                return f"{hora_int:02d}:00"
+            except (ValueError, TypeError):
+                return 'MEDIA'
+                
+        except Exception:
+            return 'MEDIA'
+    
+    df_selecionado['hora'] = df_selecionado['hora'].apply(formatar_hora)
+    print(f"    ✅ Horas formatadas")
+    
+    return df_selecionado
+
+def ler_cotas_do_zip(caminho_zip):
+    """
+    Lê o *_Cotas.csv direto de dentro do ZIP (sem extrair para o disco) e o converte
+    com preparar_dataframe_cotas, já sem duplicatas. Usado pelo pipeline de carga.
+    
+    Returns:
+        DataFrame: Dados no padrão do banco, ou None se o ZIP não tiver cotas utilizáveis
+    """
+    with zipfile.ZipFile(caminho_zip, 'r') as zip_ref:
+        membros = [nome for nome in zip_ref.namelist() if nome.endswith('_Cotas.csv')]
+        if not membros:
+            print(f"    ⚠️ {os.path.basename(caminho_zip)} não contém arquivo de cotas")
+            return None
+        conteudo = zip_ref.read(membros[0])
+    
+    df = None
+    for encoding in ['ISO-8859-1', 'utf-8', 'cp1252']:
+        try:
+            df = pd.read_csv(io.BytesIO(conteudo), sep=';', skiprows=LINHAS_METADADOS_COTAS, encoding=encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+        except Exception as e:
+            print(f"    ⚠️ Erro com encoding {encoding}: {e}")
+            continue
+    
+    if df is None or df.empty:
+        print(f"    ⚠️ {membros[0]} vazio ou ilegível")
+        return None
+    
+    df_selecionado = preparar_dataframe_cotas(df, membros[0])
+    if df_selecionado is None or df_selecionado.empty:
+        return None
+    
+    return df_selecionado.drop_duplicates(subset=['codigo_estacao', 'data', 'hora'], keep='first')
+
+def nome_arquivo_consolidado():
+    """Nome padrão do arquivo consolidado do dia (consolidação em lote e pipeline de carga)"""
+    data_atual = datetime.now().strftime('%Y-%m-%d')
+    return f'estacao_hidroweb_novosregistros_{data_atual}.csv'
+
 def consolidar_arquivos_cotas(pasta_csv, nome_arquivo_saida=None, callback_progresso=None):
     """
     Consolida todos os arquivos *_Cotas.csv em um único arquivo no padrão do banco SIPAM.
@@ -77,8 +247,7 @@ def consolidar_arquivos_cotas(pasta_csv, nome_arquivo_saida=None, callback_progr
         str: Caminho do arquivo consolidado criado
     """
     if nome_arquivo_saida is None:
-        data_atual = datetime.now().strftime('%Y-%m-%d')
-        nome_arquivo_saida = f'estacao_hidroweb_novosregistros_{data_atual}.csv'
+        nome_arquivo_saida = nome_arquivo_consolidado()
     
     caminho_arquivo_saida = os.path.join(pasta_csv, nome_arquivo_saida)
     
@@ -147,107 +316,11 @@ def consolidar_arquivos_cotas(pasta_csv, nome_arquivo_saida=None, callback_progr
                 total_arquivos_com_erro += 1
                 continue
             
-            # Definir colunas esperadas
-            colunas_esperadas = [
-                'EstacaoCodigo', 'Data', 'hora', 'TipoMedicaoCotas', 'NivelConsistencia',
-                'Cota01', 'Cota02', 'Cota03', 'Cota04', 'Cota05', 'Cota06', 'Cota07', 'Cota08', 'Cota09',
-                'Cota10', 'Cota11', 'Cota12', 'Cota13', 'Cota14', 'Cota15', 'Cota16', 'Cota17', 'Cota18',
-                'Cota19', 'Cota20', 'Cota21', 'Cota22', 'Cota23', 'Cota24', 'Cota25', 'Cota26', 'Cota27',
-                'Cota28', 'Cota29', 'Cota30', 'Cota31', 'Maxima', 'Minima', 'Media',
-                'Cota01Status', 'Cota02Status', 'Cota03Status', 'Cota04Status', 'Cota05Status', 'Cota06Status',
-                'Cota07Status', 'Cota08Status', 'Cota09Status', 'Cota10Status', 'Cota11Status', 'Cota12Status',
-                'Cota13Status', 'Cota14Status', 'Cota15Status', 'Cota16Status', 'Cota17Status', 'Cota18Status',
-                'Cota19Status', 'Cota20Status', 'Cota21Status', 'Cota22Status', 'Cota23Status', 'Cota24Status',
-                'Cota25Status', 'Cota26Status', 'Cota27Status', 'Cota28Status', 'Cota29Status', 'Cota30Status',
-                'Cota31Status', 'MaximaStatus', 'MinimaStatus', 'MediaStatus'
-            ]
-            
-            # Verificar se todas as colunas esperadas existem
-            colunas_faltantes = [col for col in colunas_esperadas if col not in df.columns]
-            
-            if colunas_faltantes:
-                print(f"    ⚠️ Arquivo {arquivo} não possui todas as colunas esperadas")
-                print(f"    📋 Colunas disponíveis: {list(df.columns)}")
-                print(f"    ❌ Colunas faltantes: {colunas_faltantes}")
-                total_arquivos_com_erro += 1
-                continue
-            
-            # Selecionar e renomear colunas
-            df_selecionado = df[colunas_esperadas].copy()
-            
-            # Renomear colunas para padrão do banco
-            novos_nomes = [
-                'codigo_estacao', 'data', 'hora', 'tipo_medicao_cota', 'nivel_consistencia',
-                'cota01', 'cota02', 'cota03', 'cota04', 'cota05', 'cota06', 'cota07', 'cota08', 'cota09',
-                'cota10', 'cota11', 'cota12', 'cota13', 'cota14', 'cota15', 'cota16', 'cota17', 'cota18',
-                'cota19', 'cota20', 'cota21', 'cota22', 'cota23', 'cota24', 'cota25', 'cota26', 'cota27',
-                'cota28', 'cota29', 'cota30', 'cota31', 'cota_maxima', 'cota_minima', 'cota_media',
-                'cota01_status', 'cota02_status', 'cota03_status', 'cota04_status', 'cota05_status', 'cota06_status',
-                'cota07_status', 'cota08_status', 'cota09_status', 'cota10_status', 'cota11_status', 'cota12_status',
-                'cota13_status', 'cota14_status', 'cota15_status', 'cota16_status', 'cota17_status', 'cota18_status',
-                'cota19_status', 'cota20_status', 'cota21_status', 'cota22_status', 'cota23_status', 'cota24_status',
-                'cota25_status', 'cota26_status', 'cota27_status', 'cota28_status', 'cota29_status', 'cota30_status',
-                'cota31_status', 'cota_maxima_status', 'cota_minima_status', 'cota_media_status'
-            ]
-            
-            df_selecionado.columns = novos_nomes
-            
-            # CORREÇÃO MELHORADA: Transformar formato de data com tratamento de erros
-            print(f"    🗓️ Convertendo datas...")
-            try:
-                # Opção 1: Converter para formato YYYY-MM (mais comum para dados mensais)
-                df_selecionado['data'] = pd.to_datetime(df_selecionado['data'], format='%d/%m/%Y').dt.strftime('%Y-%m')
-                print(f"    ✅ Datas convertidas para formato YYYY-MM")
-            except Exception as e:
-                print(f"    ⚠️ Erro na conversão de data com formato específico: {e}")
-                # Fallback: tentar formato automático
-                try:
-                    df_selecionado['data'] = pd.to_datetime(df_selecionado['data']).dt.strftime('%Y-%m')
-                    print(f"    ✅ Datas convertidas usando detecção automática")
-                except Exception as e2:
-                    print(f"    ❌ Erro crítico na conversão de data: {e2}")
-                    total_arquivos_com_erro += 1
-                    continue
-            
-            # Verificar se há valores inválidos na coluna data após conversão
-            valores_invalidos = df_selecionado['data'].isnull().sum()
-            if valores_invalidos > 0:
-                print(f"    ⚠️ {valores_invalidos} registros com data inválida serão removidos")
-                df_selecionado = df_selecionado.dropna(subset=['data'])
-            
-            # Verificar se ainda há dados após limpeza
-            if df_selecionado.empty:
-                print(f"    ❌ Nenhum registro válido após limpeza de datas")
+            df_selecionado = preparar_dataframe_cotas(df, arquivo)
+            if df_selecionado is None:
                 total_arquivos_com_erro += 1
                 continue
             
-            # CORREÇÃO MELHORADA: Formatar coluna hora com tratamento de erros
-            print(f"    🕐 Formatando horas...")
-            def formatar_hora(x):
-                try:
-                    if pd.isna(x) or x == '' or str(x).strip() == '':
-                        return 'MEDIA'
-                    
-                    # Converter para string e limpar
-                    hora_str = str(x).strip()
-                    
-                    # Se já está no formato HH:MM, manter
-                    if ':' in hora_str:
-                        return hora_str
-                    
-                    # Se é um número, adicionar :00
-                    try:
-                        hora_int = int(float(hora_str))
-                        return f"{hora_int:02d}:00"
-                    except (ValueError, TypeError):
-                        return 'MEDIA'
-                        
-                except Exception:
-                    return 'MEDIA'
-            
-            df_selecionado['hora'] = df_selecionado['hora'].apply(formatar_hora)
-            print(f"    ✅ Horas formatadas")
-            
             # Verificar amostra dos dados processados
             print(f"    📊 Amostra processada:")
             print(f"       Estação: {df_selecionado['codigo_estacao'].iloc[0] if not df_selecionado.empty else 'N/A'}")
@@ -326,7 +399,7 @@ def consolidar_arquivos_cotas(pasta_csv, nome_arquivo_saida=None, callback_progr
         print(f"💡 Verifique se os arquivos CSV possuem o formato esperado")
         return None
 
-def processar_estacoes_completo(pasta_base=None, callback_progresso=None):
+def processar_estacoes_completo(pasta_base=None, callback_progresso=None, apenas_estacoes=None):
     """
     Executa o processo completo: extração dos ZIPs e consolidação dos CSVs.
     VERSÃO MELHORADA com callback de progresso.
@@ -334,6 +407,7 @@ def processar_estacoes_completo(pasta_base=None, callback_progresso=None):
     Args:
         pasta_base (str, optional): Pasta base. Se None, usa a pasta padrão do usuário
         callback_progresso (callable, optional): Função para callback de progresso
+        apenas_estacoes (iterable, optional): Códigos a processar; os demais ZIPs são ignorados
     
     Returns:
         str: Caminho do arquivo consolidado final
@@ -376,7 +450,9 @@ def processar_estacoes_completo(pasta_base=None, callback_progresso=None):
     print("📦 ETAPA 1: Extraindo arquivos *_Cotas.csv dos ZIPs...")
     print("="*60)
     
-    arquivos_extraidos = extrair_arquivos_cotas(pasta_base, callback_progresso=callback_progresso)
+    arquivos_extraidos = extrair_arquivos_cotas(
+        pasta_base, callback_progresso=callback_progresso, apenas_estacoes=apenas_estacoes
+    )
     
     if not arquivos_extraidos:
         print("❌ Nenhum arquivo de cotas foi extraído!")
@@ -0,0 +1,452 @@
+# scripts/logica/filaCompartilhada.py - FILA SQLITE COMPARTILHADA ENTRE PROCESSOS/MÁQUINAS
+import argparse
+import os
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+from logica.agendador import calcular_backoff
+from logica.cacheNegativo import obter_cache_negativo
+from logica.consumo import criar_pasta_base, criar_pasta_staging
+from logica.loteEstacoes import MAX_TENTATIVAS, NegativoNaoConfirmado, montar_resultado_final
+from logica.manifesto import obter_manifesto, salvar_manifestos
+from logica.memoriaNavegador import OrcamentoMemoria
+from logica.telemetria import iniciar_rastro, finalizar_rastro
+
+# Estação reservada há mais tempo que isso sem conclusão volta para a fila (trabalhador caiu)
+PRAZO_RESERVA = 120.0
+
+# Intervalo de consulta da fila pelo coordenador e pelos trabalhadores ociosos
+INTERVALO_CONSULTA = 0.5
+
+# O parar_callback do trabalhador é chamado a cada fatia de espera (100 ms): o estado do
+# lote é relido do SQLite no máximo uma vez por este intervalo
+INTERVALO_ESTADO_LOTE = 1.0
+
+# Mesmo mapeamento usado pelo diário de execução
+SITUACOES = {
+    True: "baixada",
+    "estacao_inexistente": "inexistente",
+    "estacao_sem_dados": "sem_dados",
+}
+
+# Negativo deduzido só do DOM (loteEstacoes.NegativoNaoConfirmado): gravado como "inexistente_nao_confirmada"
+# para o coordenador deixá-lo fora do cache negativo
+SUFIXO_NAO_CONFIRMADA = "_nao_confirmada"
+
+def situacao_da_fila(resultado):
+    """Situação gravada na fila para o resultado de processar_estacao_rapida"""
+    situacao = SITUACOES.get(resultado, "falhou")
+    if isinstance(resultado, NegativoNaoConfirmado):
+        situacao += SUFIXO_NAO_CONFIRMADA
+    return situacao
+
+def situacao_confirmada(situacao):
+    """Situação sem a marca de negativo não confirmado (a usada no diário e nos resultados)"""
+    if situacao and situacao.endswith(SUFIXO_NAO_CONFIRMADA):
+        return situacao[:-len(SUFIXO_NAO_CONFIRMADA)]
+    return situacao
+
+def caminho_fila_padrao():
+    """Fila padrão: variável HIDROWEB_FILA ou Estações_Hidroweb/Scripts/dados/fila_estacoes.db"""
+    caminho = os.environ.get("HIDROWEB_FILA")
+    if caminho:
+        return caminho
+    return str(Path(criar_pasta_base()) / "Scripts" / "dados" / "fila_estacoes.db")
+
+class FilaCompartilhada:
+    """
+    Fila de estações em um banco SQLite que vários processos (inclusive em outras
+    máquinas, via pasta compartilhada) consomem ao mesmo tempo.
+
+    Cada reserva acontece em uma transação BEGIN IMMEDIATE, então duas reservas
+    nunca pegam a mesma estação. Estações reservadas por um trabalhador que parou
+    de responder voltam para a fila após PRAZO_RESERVA.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = str(caminho)
+        Path(self.caminho).parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit: as transações são abertas explicitamente
+        self._conexao = sqlite3.connect(self.caminho, timeout=30, isolation_level=None)
+        self._criar_tabelas()
+
+    def _criar_tabelas(self):
+        self._conexao.executescript("""
+            CREATE TABLE IF NOT EXISTS lotes (
+                id TEXT PRIMARY KEY,
+                tipo_consulta TEXT,
+                pasta_destino TEXT,
+                estado TEXT,
+                total INTEGER,
+                criado_em REAL
+            );
+            CREATE TABLE IF NOT EXISTS estacoes (
+                lote TEXT,
+                codigo TEXT,
+                ordem INTEGER,
+                estado TEXT DEFAULT 'pendente',
+                resultado TEXT,
+                tentativa INTEGER DEFAULT 1,
+                trabalhador TEXT,
+                disponivel_em REAL DEFAULT 0,
+                atualizado_em REAL,
+                PRIMARY KEY (lote, codigo)
+            );
+            CREATE INDEX IF NOT EXISTS idx_estacoes_fila ON estacoes (lote, estado, disponivel_em);
+        """)
+
+    @contextmanager
+    def _transacao(self):
+        self._conexao.execute("BEGIN IMMEDIATE")
+        try:
+            yield self._conexao
+            self._conexao.execute("COMMIT")
+        except Exception:
+            self._conexao.execute("ROLLBACK")
+            raise
+
+    def fechar(self):
+        self._conexao.close()
+
+    # ---- Coordenador ----
+
+    def criar_lote(self, estacoes, tipo_consulta, pasta_destino):
+        """Cria um lote com as estações (duplicatas ignoradas) e retorna seu id"""
+        lote = uuid.uuid4().hex[:12]
+        unicas = list(dict.fromkeys(estacoes))
+        with self._transacao() as c:
+            c.execute(
+                "INSERT INTO lotes VALUES (?, ?, ?, 'ativo', ?, ?)",
+                (lote, tipo_consulta, pasta_destino, len(unicas), time.time())
+            )
+            c.executemany(
+                "INSERT INTO estacoes (lote, codigo, ordem) VALUES (?, ?, ?)",
+                [(lote, codigo, ordem) for ordem, codigo in enumerate(unicas)]
+            )
+        return lote
+
+    def alterar_estado_lote(self, lote, estado):
+        """'concluido' ou 'cancelado': trabalhadores param de reservar estações do lote"""
+        with self._transacao() as c:
+            c.execute("UPDATE lotes SET estado = ? WHERE id = ?", (estado, lote))
+
+    def contagem(self, lote):
+        """Quantidade de estações por estado ('pendente', 'em_andamento', 'concluida')"""
+        linhas = self._conexao.execute(
+            "SELECT estado, COUNT(*) FROM estacoes WHERE lote = ? GROUP BY estado", (lote,)
+        ).fetchall()
+        return dict(linhas)
+
+    def concluidas(self, lote):
+        """Lista de (codigo, resultado) das estações já concluídas do lote"""
+        return [
+            (codigo, situacao_confirmada(resultado)) for codigo, resultado in self._conexao.execute(
+                "SELECT codigo, resultado FROM estacoes WHERE lote = ? AND estado = 'concluida' ORDER BY atualizado_em", (lote,)
+            )
+        ]
+
+    def nao_confirmadas(self, lote):
+        """Códigos do lote concluídos como inexistentes/sem dados só pelo DOM"""
+        return [codigo for (codigo,) in self._conexao.execute(
+            "SELECT codigo FROM estacoes WHERE lote = ? AND estado = 'concluida' AND resultado LIKE ?",
+            (lote, f"%{SUFIXO_NAO_CONFIRMADA}")
+        )]
+
+    def resultados(self, lote):
+        """Resultados no formato de baixar_estacoes; o que não foi concluído conta como falha"""
+        buckets = {'baixada': [], 'falhou': [], 'inexistente': [], 'sem_dados': []}
+        for codigo, estado, resultado in self._conexao.execute(
+            "SELECT codigo, estado, resultado FROM estacoes WHERE lote = ? ORDER BY ordem", (lote,)
+        ):
+            resultado = situacao_confirmada(resultado)
+            if estado != 'concluida' or resultado not in buckets:
+                resultado = 'falhou'
+            buckets[resultado].append(codigo)
+        return buckets['baixada'], buckets['falhou'], buckets['inexistente'], buckets['sem_dados']
+
+    # ---- Trabalhadores ----
+
+    def reservar(self, trabalhador, lote=None):
+        """
+        Reserva a próxima estação disponível (retries vencidos primeiro).
+        Retorna dict com lote, codigo, tentativa, total, tipo_consulta e pasta_destino, ou None.
+        """
+        agora = time.time()
+        with self._transacao() as c:
+            c.execute(
+                "UPDATE estacoes SET estado = 'pendente', trabalhador = NULL "
+                "WHERE estado = 'em_andamento' AND atualizado_em < ?",
+                (agora - PRAZO_RESERVA,)
+            )
+
+            consulta = (
+                "SELECT e.lote, e.codigo, e.tentativa, l.total, l.tipo_consulta, l.pasta_destino "
+                "FROM estacoes e JOIN lotes l ON l.id = e.lote "
+                "WHERE l.estado = 'ativo' AND e.estado = 'pendente' AND e.disponivel_em <= ?"
+            )
+            parametros = [agora]
+            if lote is not None:
+                consulta += " AND e.lote = ?"
+                parametros.append(lote)
+            consulta += " ORDER BY l.criado_em, e.tentativa DESC, e.ordem LIMIT 1"
+
+            linha = c.execute(consulta, parametros).fetchone()
+            if linha is None:
+                return None
+
+            c.execute(
+                "UPDATE estacoes SET estado = 'em_andamento', trabalhador = ?, atualizado_em = ? "
+                "WHERE lote = ? AND codigo = ?",
+                (trabalhador, agora, linha[0], linha[1])
+            )
+
+        chaves = ('lote', 'codigo', 'tentativa', 'total', 'tipo_consulta', 'pasta_destino')
+        return dict(zip(chaves, linha))
+
+    def concluir(self, lote, codigo, resultado):
+        with self._transacao() as c:
+            c.execute(
+                "UPDATE estacoes SET estado = 'concluida', resultado = ?, atualizado_em = ? "
+                "WHERE lote = ? AND codigo = ?",
+                (resultado, time.time(), lote, codigo)
+            )
+
+    def reagendar(self, lote, codigo, tentativa, espera):
+        """Devolve a estação para a fila como próxima tentativa, disponível após 'espera' segundos"""
+        with self._transacao() as c:
+            c.execute(
+                "UPDATE estacoes SET estado = 'pendente', trabalhador = NULL, tentativa = ?, disponivel_em = ? "
+                "WHERE lote = ? AND codigo = ?",
+                (tentativa + 1, time.time() + espera, lote, codigo)
+            )
+
+    def devolver(self, lote, codigo):
+        """Libera a reserva sem contar tentativa (trabalhador encerrando)"""
+        with self._transacao() as c:
+            c.execute(
+                "UPDATE estacoes SET estado = 'pendente', trabalhador = NULL "
+                "WHERE lote = ? AND codigo = ? AND estado = 'em_andamento'",
+                (lote, codigo)
+            )
+
+    def lote_ativo(self, lote):
+        linha = self._conexao.execute("SELECT estado FROM lotes WHERE id = ?", (lote,)).fetchone()
+        return linha is not None and linha[0] == 'ativo'
+
+    def ha_trabalho(self, lote=None):
+        """True enquanto houver estações pendentes ou em andamento em lotes ativos"""
+        consulta = (
+            "SELECT 1 FROM estacoes e JOIN lotes l ON l.id = e.lote "
+            "WHERE l.estado = 'ativo' AND e.estado != 'concluida'"
+        )
+        parametros = []
+        if lote is not None:
+            consulta += " AND e.lote = ?"
+            parametros.append(lote)
+        return self._conexao.execute(consulta + " LIMIT 1", parametros).fetchone() is not None
+
+def criar_parar_callback(fila, lote):
+    """parar_callback do lote: True depois que o coordenador cancela/conclui (consulta com cache)"""
+    estado = {'ativo': True, 'consultado_em': 0.0}
+
+    def parar():
+        agora = time.monotonic()
+        if estado['ativo'] and agora - estado['consultado_em'] >= INTERVALO_ESTADO_LOTE:
+            estado['ativo'] = fila.lote_ativo(lote)
+            estado['consultado_em'] = agora
+        return not estado['ativo']
+
+    return parar
+
+def executar_trabalhador(caminho_fila, lote=None, nome=None, pasta_staging=None):
+    """
+    Trabalhador: abre seu próprio navegador e consome a fila até não haver mais trabalho
+    (ou até o lote ser cancelado). Pode rodar em outra máquina apontando para a mesma fila.
+    """
+    from playwright.sync_api import sync_playwright
+    from logica.play import abrir_navegador, criar_pagina, acessar_site, reciclar_pagina, processar_estacao_rapida
+
+    nome = nome or f"{socket.gethostname()}-{os.getpid()}"
+    fila = FilaCompartilhada(caminho_fila)
+    pasta_temp = tempfile.mkdtemp(prefix=f"trabalhador_{os.getpid()}_", dir=criar_pasta_staging(pasta_staging))
+    processadas = 0
+    orcamento = OrcamentoMemoria()
+    estacoes_na_pagina = 0
+    paradas = {}
+
+    print(f"👷 Trabalhador {nome} - fila {caminho_fila}")
+    # Cada trabalhador grava o próprio rastro de fases (Scripts/dados/rastros)
+    iniciar_rastro("trabalhador")
+
+    try:
+        with sync_playwright() as p:
+            browser = abrir_navegador(p)
+            try:
+                page = criar_pagina(browser)
+                acessar_site(page)
+
+                while True:
+                    item = fila.reservar(nome, lote)
+                    if item is None:
+                        if not fila.ha_trabalho(lote):
+                            break
+                        time.sleep(INTERVALO_CONSULTA)
+                        continue
+
+                    motivo = orcamento.motivo_reciclagem(estacoes_na_pagina)
+                    if motivo:
+                        orcamento.registrar_reciclagem(motivo)
+                        try:
+                            page = reciclar_pagina(page)
+                        except Exception:
+                            fila.devolver(item['lote'], item['codigo'])
+                            raise
+                        estacoes_na_pagina = 0
+
+                    codigo, tentativa = item['codigo'], item['tentativa']
+                    pasta_destino = item['pasta_destino']
+                    if not pasta_destino or not os.path.isdir(pasta_destino):
+                        # Máquina sem acesso à pasta do coordenador: usa a pasta local equivalente
+                        pasta_destino = criar_pasta_base(item['tipo_consulta'])
+
+                    if item['lote'] not in paradas:
+                        paradas[item['lote']] = criar_parar_callback(fila, item['lote'])
+
+                    processadas += 1
+                    estacoes_na_pagina += 1
+                    resultado = processar_estacao_rapida(
+                        page, codigo, pasta_temp, pasta_destino, processadas, item['total'],
+                        parar_callback=paradas[item['lote']], tentativa=tentativa
+                    )
+
+                    if not fila.lote_ativo(item['lote']):
+                        fila.devolver(item['lote'], codigo)
+                        continue
+
+                    if resultado is False and tentativa < MAX_TENTATIVAS:
+                        fila.reagendar(item['lote'], codigo, tentativa, calcular_backoff(tentativa))
+                    else:
+                        fila.concluir(item['lote'], codigo, situacao_da_fila(resultado))
+            finally:
+                browser.close()
+    finally:
+        shutil.rmtree(pasta_temp, ignore_errors=True)
+        salvar_manifestos()
+        fila.fechar()
+        print(f"👷 Trabalhador {nome} encerrado após {processadas} estações")
+        finalizar_rastro()
+
+def iniciar_processo_trabalhador(caminho_fila, lote, nome):
+    """Inicia um trabalhador em um processo Python separado (navegador e GIL próprios)"""
+    pasta_scripts = Path(__file__).resolve().parent.parent
+    ambiente = dict(os.environ)
+    ambiente['PYTHONPATH'] = os.pathsep.join(filter(None, [str(pasta_scripts), ambiente.get('PYTHONPATH')]))
+    return subprocess.Popen(
+        [sys.executable, "-m", "logica.filaCompartilhada", "--fila", caminho_fila, "--lote", lote, "--nome", nome],
+        cwd=str(pasta_scripts),
+        env=ambiente
+    )
+
+def coordenar_lote(estacoes, callback_progresso=None, parar_callback=None, tipo_consulta="normal", num_processos=2, caminho_fila=None, estacoes_frescas=None, diario=None):
+    """
+    Coordenador: publica o lote na fila, inicia num_processos trabalhadores locais e
+    acompanha o progresso até tudo ser concluído. Trabalhadores de outras máquinas
+    podem ajudar apontando para a mesma fila (num_processos=0 espera só por eles).
+
+    Returns:
+        dict: Mesmo formato de play.baixar_estacoes
+    """
+    caminho_fila = caminho_fila or caminho_fila_padrao()
+    pasta_destino = criar_pasta_base(tipo_consulta)
+    # criar_lote ignora códigos repetidos: o total é o das estações únicas
+    total_estacoes = len(dict.fromkeys(estacoes))
+
+    print(f"📂 Destino: {pasta_destino}")
+    print(f"🎯 Total: {total_estacoes} estações")
+    print(f"📋 Tipo de consulta: {tipo_consulta}")
+    print(f"🗂️ Fila compartilhada: {caminho_fila} - {num_processos} processos locais")
+
+    fila = FilaCompartilhada(caminho_fila)
+    lote = fila.criar_lote(estacoes, tipo_consulta, pasta_destino)
+    processos = []
+    registradas = set()
+
+    def registrar_concluidas():
+        # Repassa ao diário (e a quem o observa) as estações concluídas desde a última consulta
+        if not diario:
+            return
+        for codigo, situacao in fila.concluidas(lote):
+            if codigo not in registradas:
+                registradas.add(codigo)
+                diario.registrar(codigo, situacao)
+
+    try:
+        if estacoes:
+            host = socket.gethostname()
+            processos = [
+                iniciar_processo_trabalhador(caminho_fila, lote, f"{host}-{numero}")
+                for numero in range(1, num_processos + 1)
+            ]
+
+        while estacoes:
+            registrar_concluidas()
+            contagem = fila.contagem(lote)
+            concluidas = contagem.get('concluida', 0)
+            if callback_progresso:
+                callback_progresso(concluidas, total_estacoes, f"{concluidas}/{total_estacoes} estações concluídas")
+
+            if concluidas >= total_estacoes:
+                break
+            if parar_callback and parar_callback():
+                print("⏹️ Interrompido")
+                fila.alterar_estado_lote(lote, 'cancelado')
+                break
+            if processos and all(processo.poll() is not None for processo in processos):
+                print("⚠️ Todos os trabalhadores locais encerraram antes do fim do lote")
+                break
+
+            time.sleep(INTERVALO_CONSULTA)
+    finally:
+        if fila.lote_ativo(lote):
+            fila.alterar_estado_lote(lote, 'concluido')
+        for processo in processos:
+            try:
+                processo.wait(timeout=30)
+            except subprocess.TimeoutExpired:
+                processo.kill()
+
+    registrar_concluidas()
+    estacoes_baixadas, estacoes_falharam, estacoes_inexistentes, estacoes_sem_dados = fila.resultados(lote)
+    for codigo in fila.nao_confirmadas(lote):
+        obter_cache_negativo().marcar_nao_confirmado(codigo)
+    fila.fechar()
+
+    if diario:
+        diario.registrar_varias([codigo for codigo in estacoes_falharam if codigo not in registradas], "falhou")
+
+    # Os trabalhadores gravaram o manifesto: recarrega a visão deste processo
+    obter_manifesto(pasta_destino).carregar()
+
+    return montar_resultado_final(
+        estacoes, estacoes_baixadas, estacoes_falharam, estacoes_inexistentes, estacoes_sem_dados, pasta_destino,
+        estacoes_frescas
+    )
+
+if __name__ == "__main__":
+    # Trabalhador avulso (ex.: em outra máquina): python -m logica.filaCompartilhada --fila \\servidor\hidroweb\fila.db
+    argumentos = argparse.ArgumentParser(description="Trabalhador da fila compartilhada do Hidroweb")
+    argumentos.add_argument("--fila", default=None, help="Caminho do banco SQLite da fila")
+    argumentos.add_argument("--lote", default=None, help="Consumir apenas este lote")
+    argumentos.add_argument("--nome", default=None, help="Identificação do trabalhador")
+    argumentos.add_argument("--staging", default=None, help="Pasta de staging dos downloads")
+    opcoes = argumentos.parse_args()
+
+    executar_trabalhador(opcoes.fila or caminho_fila_padrao(), opcoes.lote, opcoes.nome, opcoes.staging)
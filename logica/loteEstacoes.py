@@ -0,0 +1,310 @@
+# scripts/logica/loteEstacoes.py - ESTADO DO LOTE, PROMOÇÃO DOS ZIPs E RELATÓRIO (SEM NAVEGADOR)
+import errno
+import os
+import re
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from logica.agendador import AgendadorTentativas, DisjuntorFalhas
+from logica.cacheNegativo import obter_cache_negativo
+from logica.consumo import obter_indice
+from logica.manifesto import obter_manifesto, analisar_zip_estacao, assinatura_conteudo
+from logica.memoriaNavegador import OrcamentoMemoria
+from logica.telemetria import CronometroEstacao, finalizar_rastro
+
+# Número máximo de tentativas por estação (1ª tentativa + 2 retries)
+MAX_TENTATIVAS = 3
+
+class NegativoNaoConfirmado(str):
+    """
+    "estacao_inexistente" ou "estacao_sem_dados" deduzido só do DOM (tabela, validação
+    ou botão CSV), sem resposta da API sobre o código. Compara igual ao resultado comum
+    em todo o lote; só o cache negativo o ignora.
+    """
+
+INEXISTENTE_NAO_CONFIRMADA = NegativoNaoConfirmado("estacao_inexistente")
+SEM_DADOS_NAO_CONFIRMADA = NegativoNaoConfirmado("estacao_sem_dados")
+
+def anotar_negativo_nao_confirmado(codigo, resultado):
+    """Negativos vindos só do DOM entram no resultado, mas não no cache negativo"""
+    if isinstance(resultado, NegativoNaoConfirmado):
+        obter_cache_negativo().marcar_nao_confirmado(codigo)
+
+def extrair_codigo_do_arquivo(nome_arquivo):
+    """Extrai o código da estação do nome do arquivo"""
+    match = re.search(r'Estacao_(\d+)_CSV_', nome_arquivo)
+    return match.group(1) if match else None
+
+def resumir_latencias(latencias):
+    """Imprime média, mediana e máximo do tempo por estação (segundos)"""
+    if not latencias:
+        return
+    ordenadas = sorted(latencias)
+    media = sum(ordenadas) / len(ordenadas)
+    mediana = ordenadas[len(ordenadas) // 2]
+    print(f"   ⏱️ Tempo por estação: média {media:.2f}s | mediana {mediana:.2f}s | máx {ordenadas[-1]:.2f}s")
+
+def verificar_se_deve_substituir(pasta_destino, codigo_estacao, novo_arquivo_temp, info_novo=None):
+    """
+    Verifica se deve substituir arquivo existente comparando o hash do conteúdo
+    (_Cotas.csv, ou o ZIP inteiro) com o registrado no manifesto.
+    Retorna True se deve substituir, False caso contrário.
+    """
+    try:
+        # Arquivos existentes da mesma estação, pelo índice da pasta
+        indice = obter_indice(pasta_destino)
+        arquivos_existentes = indice.versoes(codigo_estacao)
+        
+        if not arquivos_existentes:
+            return True  # Não existe arquivo, pode baixar
+        
+        if info_novo is None:
+            info_novo = analisar_zip_estacao(novo_arquivo_temp)
+        
+        # Usa o manifesto quando ele descreve um arquivo que ainda está na pasta
+        info_existente = obter_manifesto(pasta_destino).obter(codigo_estacao)
+        nomes_existentes = {versao['nome'] for versao in arquivos_existentes}
+        
+        if not info_existente or info_existente.get('arquivo') not in nomes_existentes:
+            # Sem registro: analisa o arquivo mais recente uma única vez
+            info_existente = analisar_zip_estacao(indice.mais_recente(codigo_estacao)['arquivo'])
+        
+        if assinatura_conteudo(info_existente) != assinatura_conteudo(info_novo):
+            print(f"    📊 Conteúdo alterado - Existente: {info_existente['tamanho']} bytes, Novo: {info_novo['tamanho']} bytes")
+            return True  # Conteúdo diferente, deve substituir
+        else:
+            print(f"    ⚖️ Conteúdo idêntico ({info_novo['tamanho']} bytes) - Mantendo arquivo existente")
+            return False  # Mesmo conteúdo, não precisa substituir
+            
+    except Exception as e:
+        print(f"    ⚠️ Erro ao verificar substituição: {e}")
+        return True  # Em caso de erro, permite download
+
+def remover_arquivos_antigos_da_estacao(pasta_destino, codigo_estacao):
+    """Remove todos os arquivos antigos da estação especificada"""
+    try:
+        indice = obter_indice(pasta_destino)
+        
+        for versao in indice.versoes(codigo_estacao):
+            marca = indice.marca()
+            os.remove(versao['arquivo'])
+            indice.remover(versao['arquivo'], marca)
+            print(f"    🗑️ Removido arquivo antigo: {versao['nome']}")
+            
+    except Exception as e:
+        print(f"    ❌ Erro ao remover arquivos antigos: {e}")
+
+def promover_arquivo_atomico(arquivo_origem, arquivo_destino):
+    """
+    Move o arquivo do staging para o destino com rename atômico.
+    Se o staging estiver em outro volume (ex.: tmpfs), copia para um temporário na
+    pasta de destino e faz o rename a partir dele, para nunca expor um ZIP incompleto.
+    """
+    try:
+        os.replace(arquivo_origem, arquivo_destino)
+    except OSError as e:
+        if e.errno != errno.EXDEV:
+            raise
+        temporario = arquivo_destino + ".part"
+        shutil.copyfile(arquivo_origem, temporario)
+        os.replace(temporario, arquivo_destino)
+        os.remove(arquivo_origem)
+
+def mover_arquivo_para_destino(arquivo_origem, pasta_destino, codigo_estacao_esperado, cronometro=None):
+    """Move arquivo para destino verificando se é da estação correta"""
+    if cronometro is None:
+        cronometro = CronometroEstacao(codigo_estacao_esperado)
+    
+    if not os.path.exists(arquivo_origem):
+        return False
+    
+    nome_arquivo = os.path.basename(arquivo_origem)
+    codigo_arquivo = extrair_codigo_do_arquivo(nome_arquivo)
+    
+    # Verifica se o arquivo baixado é da estação correta
+    if codigo_arquivo != codigo_estacao_esperado:
+        print(f"    ⚠️ Arquivo incorreto: esperado {codigo_estacao_esperado}, obtido {codigo_arquivo}")
+        # Remove o arquivo incorreto
+        try:
+            os.remove(arquivo_origem)
+            print(f"    🗑️ Arquivo incorreto removido: {nome_arquivo}")
+        except:
+            pass
+        return False
+    
+    arquivo_destino = os.path.join(pasta_destino, nome_arquivo)
+    
+    try:
+        manifesto = obter_manifesto(pasta_destino)
+        with cronometro.fase('analise'):
+            info_novo = analisar_zip_estacao(arquivo_origem)
+        
+        # Verificar se deve substituir baseado no hash do conteúdo
+        with cronometro.fase('comparacao'):
+            substituir = verificar_se_deve_substituir(pasta_destino, codigo_estacao_esperado, arquivo_origem, info_novo)
+        
+        with cronometro.fase('movimentacao'):
+            if not substituir:
+                # Remove o arquivo temporário e retorna True (considera como sucesso)
+                os.remove(arquivo_origem)
+                manifesto.marcar_verificado(codigo_estacao_esperado)
+                return True
+            
+            # Remove arquivos antigos da mesma estação antes de mover o novo
+            remover_arquivos_antigos_da_estacao(pasta_destino, codigo_estacao_esperado)
+            
+            # Move o novo arquivo
+            indice = obter_indice(pasta_destino)
+            marca = indice.marca()
+            promover_arquivo_atomico(arquivo_origem, arquivo_destino)
+            indice.adicionar(arquivo_destino, marca)
+            manifesto.registrar(codigo_estacao_esperado, nome_arquivo, info_novo)
+        return True
+        
+    except Exception as e:
+        print(f"    ❌ Erro ao mover: {str(e)}")
+        return False
+
+def finalizar_download(caminho_temp, pasta_destino, codigo, cronometro=None):
+    """Verifica (hash/manifesto) e promove o ZIP salvo para o destino"""
+    if mover_arquivo_para_destino(caminho_temp, pasta_destino, codigo, cronometro):
+        print(f"    ✅ {codigo} OK!")
+        return True
+    return False
+
+def criar_lote_agendado(estacoes, controlador=None, finalizar_em_paralelo=False, diario=None, navegadores=1):
+    """
+    Estado compartilhado por todas as páginas de um lote: fila com retries, disjuntor,
+    controlador de concorrência opcional, executor de finalização opcional, diário
+    da execução, orçamento de memória dos navegadores e resultados.
+    """
+    return {
+        'diario': diario,
+        'orcamento': OrcamentoMemoria(navegadores=navegadores),
+        'agendador': AgendadorTentativas(estacoes, MAX_TENTATIVAS),
+        'disjuntor': DisjuntorFalhas(),
+        'controlador': controlador,
+        'finalizador': ThreadPoolExecutor(max_workers=2, thread_name_prefix="finalizacao") if finalizar_em_paralelo else None,
+        'resultados': {'baixadas': [], 'falharam': [], 'inexistentes': [], 'sem_dados': []},
+        'latencias': [],
+        'iniciadas': 0,
+        'total': len(estacoes),
+        'trava': threading.Lock()
+    }
+
+def registrar_resultado_lote(lote, codigo, resultado, tentativa, parar_callback=None):
+    """Classifica o resultado de uma tentativa; falhas técnicas voltam à fila com backoff"""
+    lote['disjuntor'].registrar(resultado is not False)
+    
+    if resultado is False and not (parar_callback and parar_callback()):
+        if lote['agendador'].reagendar(codigo, tentativa):
+            return
+    
+    try:
+        with lote['trava']:
+            if resultado == True:
+                lote['resultados']['baixadas'].append(codigo)
+                situacao = "baixada"
+                if tentativa > 1:
+                    print(f"    🎉 {codigo} recuperada na {tentativa}ª tentativa!")
+            elif resultado == "estacao_inexistente":
+                lote['resultados']['inexistentes'].append(codigo)
+                situacao = "inexistente"
+            elif resultado == "estacao_sem_dados":
+                lote['resultados']['sem_dados'].append(codigo)
+                situacao = "sem_dados"
+            else:
+                lote['resultados']['falharam'].append(codigo)
+                situacao = "falhou"
+        anotar_negativo_nao_confirmado(codigo, resultado)
+        
+        # Checkpoint durável antes de considerar a estação resolvida
+        if lote['diario']:
+            lote['diario'].registrar(codigo, situacao, tentativa)
+    finally:
+        # Mesmo com o diário falhando a estação sai do agendador, senão o lote nunca termina
+        lote['agendador'].concluir(codigo)
+
+def abandonar_estacao_lote(lote, codigo):
+    """Resolve como falha uma estação cujo registro foi interrompido por erro (não conta duas vezes)"""
+    if lote['agendador'].concluir(codigo):
+        with lote['trava']:
+            lote['resultados']['falharam'].append(codigo)
+
+def resultado_da_finalizacao(futuro, codigo):
+    """Resultado de uma finalização em segundo plano (erro inesperado conta como falha técnica)"""
+    try:
+        return futuro.result()
+    except Exception as e:
+        print(f"    ❌ Erro ao finalizar {codigo}: {e}")
+        return False
+
+def finalizar_lote(lote, parar_callback=None):
+    """Fecha o lote: o que não foi resolvido (parada ou páginas encerradas) conta como falha"""
+    if lote['finalizador'] is not None:
+        # Aguarda as promoções em andamento antes de apurar os resultados
+        lote['finalizador'].shutdown(wait=True)
+    
+    restantes = lote['agendador'].drenar()
+    lote['resultados']['falharam'].extend(restantes)
+    
+    if parar_callback and parar_callback():
+        print("⏹️ Interrompido")
+    if lote['disjuntor'].aberturas:
+        print(f"   ⚡ Disjuntor aberto {lote['disjuntor'].aberturas}x durante o lote")
+    
+    resumir_latencias(lote['latencias'])
+    if lote['controlador']:
+        lote['controlador'].resumo()
+    lote['orcamento'].resumo()
+    resultados = lote['resultados']
+    return resultados['baixadas'], resultados['falharam'], resultados['inexistentes'], resultados['sem_dados']
+
+def montar_resultado_final(estacoes, estacoes_baixadas, estacoes_falharam, estacoes_inexistentes, estacoes_sem_dados, pasta_destino, estacoes_frescas=None):
+    """Imprime o relatório final do lote e monta o dicionário de resultado"""
+    estacoes_frescas = list(estacoes_frescas or [])
+    total_solicitadas = len(estacoes) + len(estacoes_frescas)
+    total_baixadas = len(estacoes_baixadas)
+    total_falharam = len(estacoes_falharam) 
+    total_inexistentes = len(estacoes_inexistentes)
+    total_sem_dados = len(estacoes_sem_dados)
+    
+    print(f"\n📊 RESULTADO FINAL")
+    print(f"   📥 Baixadas: {total_baixadas}/{total_solicitadas}")
+    if estacoes_frescas:
+        print(f"   🕒 Ignoradas (baixadas recentemente): {len(estacoes_frescas)}")
+    print(f"   📁 Local: {pasta_destino}")
+    
+    if total_baixadas > 0:
+        taxa_sucesso = (total_baixadas/total_solicitadas*100)
+        print(f"   📈 Taxa: {taxa_sucesso:.1f}%")
+    
+    # Relatório detalhado dos problemas
+    if estacoes_falharam:
+        print(f"   ❌ Falharam após 3 tentativas: {', '.join(estacoes_falharam)}")
+        print(f"      💡 Possíveis problemas técnicos ou de conectividade")
+    
+    if estacoes_inexistentes:
+        print(f"   🚫 Estações inexistentes: {', '.join(estacoes_inexistentes)}")
+        print(f"      💡 Códigos não encontrados no sistema ou sem botão de download")
+    
+    if estacoes_sem_dados:
+        print(f"   📋 Sem dados para download: {', '.join(estacoes_sem_dados)}")
+        print(f"      💡 Estações existem mas não possuem dados CSV disponíveis")
+    
+    if not estacoes_falharam and not estacoes_inexistentes and not estacoes_sem_dados:
+        print(f"   🎉 TODAS PROCESSADAS COM SUCESSO!")
+    
+    # Onde o tempo foi gasto: p50/p95 de cada fase das tentativas
+    finalizar_rastro()
+    
+    return {
+        'sucesso': total_baixadas + len(estacoes_frescas) == total_solicitadas,
+        'baixadas': estacoes_baixadas,
+        'falharam': estacoes_falharam,
+        'inexistentes': estacoes_inexistentes,
+        'sem_dados': estacoes_sem_dados,
+        'ignoradas_frescas': estacoes_frescas,
+        'pasta_destino': pasta_destino
+    }
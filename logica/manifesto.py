@@ -0,0 +1,333 @@
+# scripts/logica/manifesto.py - MANIFESTO DE DOWNLOADS (HASH E METADADOS POR ESTAÇÃO)
+import csv
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+NOME_MANIFESTO = "manifesto_downloads.json"
+
+# Mesmo número de linhas de metadados usado na consolidação (extracaoZip)
+LINHAS_METADADOS_COTAS = 15
+
+# Intervalo mínimo entre gravações automáticas do manifesto (segundos)
+INTERVALO_GRAVACAO = 2.0
+
+# Trava de arquivo usada quando vários processos gravam o mesmo manifesto
+TIMEOUT_TRAVA_ARQUIVO = 10.0
+TRAVA_ABANDONADA_APOS = 60.0
+
+@contextmanager
+def trava_entre_processos(caminho, timeout=TIMEOUT_TRAVA_ARQUIVO):
+    """
+    Trava exclusiva baseada em arquivo (<caminho>.lock criado com O_EXCL).
+    Funciona entre processos e máquinas que compartilham a pasta; uma trava
+    mais velha que TRAVA_ABANDONADA_APOS é considerada de um processo que caiu.
+    """
+    caminho_trava = str(caminho) + ".lock"
+    limite = time.time() + timeout
+    while True:
+        try:
+            descritor = os.open(caminho_trava, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            break
+        except FileExistsError:
+            try:
+                if time.time() - os.path.getmtime(caminho_trava) > TRAVA_ABANDONADA_APOS:
+                    os.remove(caminho_trava)
+                    continue
+            except OSError:
+                continue
+            if time.time() > limite:
+                raise TimeoutError(f"Trava ocupada: {caminho_trava}")
+            time.sleep(0.05)
+
+    try:
+        os.write(descritor, str(os.getpid()).encode())
+        os.close(descritor)
+        yield
+    finally:
+        try:
+            os.remove(caminho_trava)
+        except OSError:
+            pass
+
+def calcular_sha256(caminho_arquivo, tamanho_bloco=1024 * 1024):
+    """Calcula o SHA-256 de um arquivo lendo em blocos"""
+    h = hashlib.sha256()
+    with open(caminho_arquivo, 'rb') as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b''):
+            h.update(bloco)
+    return h.hexdigest()
+
+def analisar_cotas_csv(conteudo):
+    """
+    Conta as linhas de dados e o período de um *_Cotas.csv do Hidroweb.
+    Retorna (linhas, data_inicio, data_fim) com datas em YYYY-MM-DD ou None.
+    """
+    texto = conteudo.decode('ISO-8859-1')
+    leitor = csv.reader(io.StringIO(texto), delimiter=';')
+
+    for _ in range(LINHAS_METADADOS_COTAS):
+        next(leitor, None)
+
+    cabecalho = next(leitor, None)
+    if not cabecalho:
+        return 0, None, None
+
+    try:
+        idx_data = [c.strip() for c in cabecalho].index('Data')
+    except ValueError:
+        idx_data = None
+
+    linhas = 0
+    data_inicio = None
+    data_fim = None
+
+    for linha in leitor:
+        if not linha or not any(c.strip() for c in linha):
+            continue
+        linhas += 1
+
+        if idx_data is None or idx_data >= len(linha):
+            continue
+        try:
+            data = datetime.strptime(linha[idx_data].strip(), "%d/%m/%Y").date()
+        except ValueError:
+            continue
+        if data_inicio is None or data < data_inicio:
+            data_inicio = data
+        if data_fim is None or data > data_fim:
+            data_fim = data
+
+    return (
+        linhas,
+        data_inicio.isoformat() if data_inicio else None,
+        data_fim.isoformat() if data_fim else None
+    )
+
+def analisar_zip_estacao(caminho_zip):
+    """
+    Gera os metadados de um ZIP de estação para o manifesto.
+
+    Returns:
+        dict: sha256_zip, tamanho, sha256_cotas, linhas, data_inicio, data_fim
+    """
+    info = {
+        'sha256_zip': calcular_sha256(caminho_zip),
+        'tamanho': os.path.getsize(caminho_zip),
+        'sha256_cotas': None,
+        'linhas': None,
+        'data_inicio': None,
+        'data_fim': None
+    }
+
+    try:
+        with zipfile.ZipFile(caminho_zip, 'r') as zip_ref:
+            for membro in zip_ref.namelist():
+                if membro.endswith('_Cotas.csv'):
+                    conteudo = zip_ref.read(membro)
+                    info['sha256_cotas'] = hashlib.sha256(conteudo).hexdigest()
+                    info['linhas'], info['data_inicio'], info['data_fim'] = analisar_cotas_csv(conteudo)
+                    break
+    except (zipfile.BadZipFile, OSError) as e:
+        print(f"    ⚠️ Não foi possível analisar {os.path.basename(caminho_zip)}: {e}")
+
+    return info
+
+def assinatura_conteudo(info):
+    """Hash usado para comparar versões: o do _Cotas.csv, ou o do ZIP se não houver cotas"""
+    if not info:
+        return None
+    return info.get('sha256_cotas') or info.get('sha256_zip')
+
+class ManifestoDownloads:
+    """
+    Manifesto JSON de uma pasta de destino, indexado pelo código da estação.
+
+    Cada entrada guarda o arquivo atual, os hashes do ZIP e do _Cotas.csv, tamanho,
+    linhas, período de dados, quando foi baixado e quando o conteúdo mudou pela
+    última vez. 'sha256_carregado' registra o conteúdo já enviado ao banco, para que
+    as etapas seguintes possam pular estações sem dados novos.
+    """
+
+    def __init__(self, pasta_destino):
+        self.caminho = Path(pasta_destino) / NOME_MANIFESTO
+        self._trava = threading.RLock()
+        self._estacoes = {}
+        self._alteradas = set()
+        self._alterado = False
+        self._ultima_gravacao = 0.0
+        self.carregar()
+
+    def carregar(self):
+        with self._trava:
+            try:
+                with open(self.caminho, 'r', encoding='utf-8') as f:
+                    self._estacoes = json.load(f).get('estacoes', {})
+            except FileNotFoundError:
+                self._estacoes = {}
+            except Exception as e:
+                print(f"⚠️ Manifesto inválido, recriando: {e}")
+                self._estacoes = {}
+
+    def salvar(self, forcar=True):
+        """
+        Grava o manifesto de forma atômica (arquivo temporário + rename).
+
+        Outros processos podem ter gravado o mesmo arquivo: sob a trava de arquivo,
+        o manifesto em disco é relido e só as estações alteradas aqui são sobrescritas.
+        """
+        with self._trava:
+            if not self._alterado:
+                return
+            if not forcar and time.time() - self._ultima_gravacao < INTERVALO_GRAVACAO:
+                return
+
+            with trava_entre_processos(self.caminho):
+                try:
+                    with open(self.caminho, 'r', encoding='utf-8') as f:
+                        em_disco = json.load(f).get('estacoes', {})
+                except (FileNotFoundError, ValueError):
+                    em_disco = {}
+
+                for codigo in self._alteradas:
+                    if codigo in self._estacoes:
+                        em_disco[codigo] = self._estacoes[codigo]
+                    else:
+                        em_disco.pop(codigo, None)
+                self._estacoes = em_disco
+
+                temporario = f"{self.caminho}.{os.getpid()}.tmp"
+                with open(temporario, 'w', encoding='utf-8') as f:
+                    json.dump({'versao': 1, 'estacoes': self._estacoes}, f, ensure_ascii=False, indent=1)
+                os.replace(temporario, self.caminho)
+
+            self._alteradas.clear()
+            self._alterado = False
+            self._ultima_gravacao = time.time()
+
+    def _salvar_periodico(self):
+        """
+        Gravação oportunista depois de registrar/marcar_verificado. O ZIP já foi promovido
+        nesse ponto: uma trava ocupada por outro processo não pode virar falha do download.
+        As alterações continuam pendentes e vão na próxima gravação (ou em salvar_manifestos).
+        """
+        try:
+            self.salvar(forcar=False)
+        except TimeoutError as e:
+            print(f"⚠️ Manifesto não gravado agora ({e}); a alteração fica para a próxima gravação")
+
+    def obter(self, codigo):
+        with self._trava:
+            entrada = self._estacoes.get(codigo)
+            return dict(entrada) if entrada else None
+
+    def registrar(self, codigo, nome_arquivo, info):
+        """Registra a versão atual do ZIP da estação"""
+        agora = datetime.now().isoformat(timespec='seconds')
+        with self._trava:
+            anterior = self._estacoes.get(codigo, {})
+            entrada = dict(anterior)
+            entrada.update(info)
+            entrada['arquivo'] = nome_arquivo
+            entrada['baixado_em'] = agora
+            if assinatura_conteudo(anterior) != assinatura_conteudo(info):
+                entrada['alterado_em'] = agora
+            self._estacoes[codigo] = entrada
+            self._alteradas.add(codigo)
+            self._alterado = True
+        self._salvar_periodico()
+
+    def marcar_verificado(self, codigo):
+        """Registra que a estação foi baixada novamente sem mudança de conteúdo"""
+        with self._trava:
+            if codigo in self._estacoes:
+                self._estacoes[codigo]['baixado_em'] = datetime.now().isoformat(timespec='seconds')
+                self._alteradas.add(codigo)
+                self._alterado = True
+        self._salvar_periodico()
+
+    def remover(self, codigo):
+        with self._trava:
+            if self._estacoes.pop(codigo, None) is not None:
+                self._alteradas.add(codigo)
+                self._alterado = True
+
+    def conteudo_mudou(self, codigo, info):
+        """True se o conteúdo é diferente da última versão registrada (ou não há registro)"""
+        anterior = self.obter(codigo)
+        return anterior is None or assinatura_conteudo(anterior) != assinatura_conteudo(info)
+
+    def precisa_carregar(self, codigo):
+        """True se a estação tem conteúdo ainda não enviado ao banco"""
+        entrada = self.obter(codigo)
+        if entrada is None:
+            return True
+        return entrada.get('sha256_carregado') != assinatura_conteudo(entrada)
+
+    def filtrar_pendentes(self, codigos):
+        """Mantém apenas as estações com conteúdo novo para as etapas de consolidação/banco"""
+        return [codigo for codigo in codigos if self.precisa_carregar(codigo)]
+
+    def marcar_carregadas(self, codigos, arquivos=None):
+        """
+        Registra que o conteúdo atual das estações já foi enviado ao banco.
+
+        Estações sem entrada (ZIPs baixados antes do manifesto) são analisadas a partir
+        do caminho em 'arquivos' ({codigo: caminho_zip}) e registradas aqui; sem isso,
+        precisa_carregar continuaria True e elas seriam carregadas em toda execução.
+        """
+        # Hash dos ZIPs fora da trava: é I/O
+        novas = {}
+        for codigo in codigos:
+            caminho_zip = (arquivos or {}).get(codigo)
+            if caminho_zip and self.obter(codigo) is None:
+                try:
+                    novas[codigo] = analisar_zip_estacao(caminho_zip)
+                except OSError as e:
+                    print(f"    ⚠️ Não foi possível registrar {codigo} no manifesto: {e}")
+                    continue
+                novas[codigo]['arquivo'] = os.path.basename(caminho_zip)
+
+        with self._trava:
+            for codigo in codigos:
+                entrada = self._estacoes.get(codigo)
+                if entrada is None and codigo in novas:
+                    entrada = self._estacoes[codigo] = novas[codigo]
+                if entrada:
+                    entrada['sha256_carregado'] = assinatura_conteudo(entrada)
+                    self._alteradas.add(codigo)
+                    self._alterado = True
+        self.salvar()
+
+    def estacoes(self):
+        with self._trava:
+            return {codigo: dict(entrada) for codigo, entrada in self._estacoes.items()}
+
+# Um manifesto por pasta de destino, compartilhado entre threads
+_manifestos = {}
+_trava_manifestos = threading.Lock()
+
+def obter_manifesto(pasta_destino):
+    """Retorna o manifesto da pasta, carregando-o na primeira chamada"""
+    chave = os.path.abspath(pasta_destino)
+    with _trava_manifestos:
+        if chave not in _manifestos:
+            _manifestos[chave] = ManifestoDownloads(pasta_destino)
+        return _manifestos[chave]
+
+def salvar_manifestos():
+    """Grava todos os manifestos com alterações pendentes"""
+    with _trava_manifestos:
+        manifestos = list(_manifestos.values())
+    for manifesto in manifestos:
+        try:
+            manifesto.salvar()
+        except Exception as e:
+            print(f"⚠️ Erro ao salvar manifesto {manifesto.caminho}: {e}")
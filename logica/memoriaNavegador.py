@@ -0,0 +1,100 @@
+# scripts/logica/memoriaNavegador.py - ORÇAMENTO DE MEMÓRIA E RECICLAGEM DE PÁGINAS DO CHROMIUM
+import os
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:  # Monitoramento de memória é opcional
+    psutil = None
+
+# Uma página é reciclada (contexto novo) depois de N estações (0 = só por memória)
+MAX_ESTACOES_POR_PAGINA = int(os.environ.get("HIDROWEB_RECICLAR_APOS") or 250)
+
+# Teto de RSS por navegador aberto; a soma de todos os navegadores é comparada com limite × navegadores
+LIMITE_MEMORIA_MB = float(os.environ.get("HIDROWEB_LIMITE_MEMORIA_MB") or 1500)
+
+# Medições reaproveitadas por alguns segundos (várias páginas consultam o mesmo orçamento)
+INTERVALO_MEDICAO = 2.0
+
+# Depois de uma reciclagem por memória, espera a memória ser devolvida antes de reciclar outra página
+PAUSA_APOS_RECICLAGEM = 5.0
+
+def medir_memoria_navegador_mb():
+    """
+    Soma o RSS (MB) dos processos filhos deste processo (driver do Playwright e Chromium).
+    Retorna None se o psutil não estiver instalado.
+    """
+    if psutil is None:
+        return None
+
+    try:
+        total = 0
+        for filho in psutil.Process(os.getpid()).children(recursive=True):
+            try:
+                total += filho.memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return total / (1024 * 1024)
+    except Exception:
+        return None
+
+class OrcamentoMemoria:
+    """
+    Decide quando uma página de um lote longo deve ser reciclada.
+
+    O estado do Angular, os objetos de download e a memória do renderer crescem a
+    cada estação; fechar o contexto e abrir outro no mesmo navegador devolve essa
+    memória sem o custo de reiniciar o Chromium. A reciclagem acontece após
+    max_estacoes estações na mesma página ou quando o RSS somado dos navegadores
+    passa de limite_memoria_mb × navegadores. Sem psutil vale só o limite de estações.
+    """
+
+    def __init__(self, max_estacoes=MAX_ESTACOES_POR_PAGINA, limite_memoria_mb=LIMITE_MEMORIA_MB, navegadores=1):
+        self.max_estacoes = max_estacoes
+        self.limite_total_mb = limite_memoria_mb * max(1, navegadores)
+        self.reciclagens = 0
+        self.pico_mb = None
+
+        self._medida = None
+        self._medida_em = 0.0
+        self._pausa_ate = 0.0
+        self._trava = threading.Lock()
+
+    def memoria_mb(self):
+        """RSS atual dos navegadores (MB), medido no máximo a cada INTERVALO_MEDICAO"""
+        with self._trava:
+            agora = time.monotonic()
+            if agora - self._medida_em >= INTERVALO_MEDICAO:
+                self._medida = medir_memoria_navegador_mb()
+                self._medida_em = agora
+                if self._medida is not None:
+                    self.pico_mb = max(self.pico_mb or 0.0, self._medida)
+            return self._medida
+
+    def motivo_reciclagem(self, estacoes_na_pagina):
+        """Retorna o motivo para reciclar a página agora, ou None"""
+        if self.max_estacoes and estacoes_na_pagina >= self.max_estacoes:
+            return f"{estacoes_na_pagina} estações na página"
+
+        if estacoes_na_pagina == 0 or time.monotonic() < self._pausa_ate:
+            return None
+
+        memoria = self.memoria_mb()
+        if memoria is not None and memoria > self.limite_total_mb:
+            return f"memória dos navegadores em {memoria:.0f} MB"
+        return None
+
+    def registrar_reciclagem(self, motivo, rotulo=""):
+        with self._trava:
+            self.reciclagens += 1
+            # Próxima decisão por memória só com uma medição nova, depois da memória ser devolvida
+            self._medida_em = 0.0
+            self._pausa_ate = time.monotonic() + PAUSA_APOS_RECICLAGEM
+        print(f"♻️ {rotulo}Reciclando página ({motivo})")
+
+    def resumo(self):
+        if not self.reciclagens and self.pico_mb is None:
+            return
+        pico = f" | pico de memória {self.pico_mb:.0f} MB" if self.pico_mb is not None else ""
+        print(f"   ♻️ Páginas recicladas: {self.reciclagens}{pico}")
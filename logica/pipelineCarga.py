@@ -0,0 +1,245 @@
+# scripts/logica/pipelineCarga.py - PIPELINE DOWNLOAD → EXTRAÇÃO → BANCO EM FLUXO CONTÍNUO
+import os
+import queue
+import threading
+import time
+
+from logica.consumo import obter_indice
+from logica.extracaoZip import ler_cotas_do_zip, nome_arquivo_consolidado
+from logica.manifesto import obter_manifesto
+
+# Lotes de registros convertidos aguardando o banco (limita a memória quando o banco atrasa)
+TAMANHO_FILA_REGISTROS = 8
+
+# Registros acumulados antes de cada inserção no banco
+REGISTROS_POR_CARGA = 5000
+
+# Resultados do download que têm ZIP na pasta de destino
+RESULTADOS_COM_ZIP = ("baixada", "fresca")
+
+_FIM = object()
+
+class PipelineCarga:
+    """
+    Carrega cada estação no banco assim que o ZIP chega, em vez de esperar o lote
+    inteiro para extrair e só então inserir:
+
+        download → extração (thread) → banco (thread)
+
+    A extração lê o _Cotas.csv direto do ZIP e converte as linhas para tuplas da
+    tabela; o estágio do banco insere em blocos de REGISTROS_POR_CARGA e marca as
+    estações no manifesto. A fila entre extração e banco é limitada: se o banco
+    atrasar, a extração espera em vez de acumular o lote todo em memória. A fila
+    de códigos que chega do download não bloqueia (o ZIP já está em disco), para
+    nunca segurar o navegador.
+
+    Estações cujo conteúdo atual já foi carregado (manifesto) são ignoradas. As demais
+    são acrescentadas, na ordem da extração, ao arquivo consolidado do dia
+    (estacao_hidroweb_novosregistros_*.csv), como na consolidação em lote.
+    """
+
+    def __init__(self, pasta_destino, converter_registros, inserir_registros, registros_por_carga=REGISTROS_POR_CARGA, callback_progresso=None):
+        """
+        Args:
+            pasta_destino: Pasta onde os ZIPs são promovidos
+            converter_registros: DataFrame → (lista de tuplas, linhas com erro) (ex.: HidrowebDatabase.preparar_registros)
+            inserir_registros: lista de tuplas → bool (ex.: HidrowebDatabase.inserir_registros)
+            registros_por_carga: Registros acumulados antes de cada inserção
+            callback_progresso: Chamada com (estacoes_carregadas, registros_inseridos) após cada inserção
+        """
+        self.pasta_destino = pasta_destino
+        self.converter_registros = converter_registros
+        self.inserir_registros = inserir_registros
+        self.registros_por_carga = registros_por_carga
+        self.callback_progresso = callback_progresso
+        self.manifesto = obter_manifesto(pasta_destino)
+        self.arquivo_consolidado = None
+
+        self.carregadas = []
+        self.falharam = []
+        self.sem_alteracao = []
+        self.total_registros = 0
+        self.tempos = {'extracao': 0.0, 'banco': 0.0}
+
+        self._fila_estacoes = queue.Queue()
+        self._fila_registros = queue.Queue(maxsize=TAMANHO_FILA_REGISTROS)
+        self._enviadas = set()
+        self._trava = threading.Lock()
+        self._cancelado = threading.Event()
+        self._threads = []
+        self._inicio = None
+        self._finalizado = False
+        self._consolidado_iniciado = False
+
+    def iniciar(self):
+        self._inicio = time.perf_counter()
+        self.arquivo_consolidado = os.path.join(self.pasta_destino, nome_arquivo_consolidado())
+        self._threads = [
+            threading.Thread(target=self._extrair, name="pipeline-extracao", daemon=True),
+            threading.Thread(target=self._carregar, name="pipeline-banco", daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    @property
+    def ativo(self):
+        """True entre iniciar() e finalizar()"""
+        return bool(self._threads) and not self._finalizado
+
+    def enviar(self, codigo):
+        """Coloca a estação na fila de extração (cada código entra uma vez)"""
+        with self._trava:
+            if codigo in self._enviadas:
+                return
+            self._enviadas.add(codigo)
+        self._fila_estacoes.put(codigo)
+
+    def ao_concluir_estacao(self, codigo, resultado):
+        """Ouvinte para baixar_estacoes(ao_concluir_estacao=...): envia as estações com ZIP na pasta"""
+        if resultado in RESULTADOS_COM_ZIP:
+            self.enviar(codigo)
+
+    def finalizar(self, cancelar=False):
+        """
+        Aguarda os estágios esvaziarem as filas (ou descarta o que falta, com cancelar=True)
+        e imprime o resumo.
+
+        Returns:
+            dict: carregadas, falharam, sem_alteracao, registros, arquivo_consolidado
+                  (None se nenhuma estação foi extraída) e tempos por estágio
+        """
+        if cancelar:
+            self._cancelado.set()
+        self._finalizado = True
+        self._fila_estacoes.put(_FIM)
+        for thread in self._threads:
+            thread.join()
+
+        duracao = time.perf_counter() - self._inicio if self._inicio else 0.0
+        print(f"\n📊 PIPELINE DE CARGA")
+        print(f"   🗄️ Estações carregadas: {len(self.carregadas)} | Registros: {self.total_registros:,}")
+        if self.sem_alteracao:
+            print(f"   ⏭️ Já carregadas anteriormente: {len(self.sem_alteracao)}")
+        if self.falharam:
+            print(f"   ❌ Falharam: {', '.join(self.falharam)}")
+        if self._consolidado_iniciado:
+            print(f"   📁 Arquivo consolidado: {os.path.basename(self.arquivo_consolidado)}")
+        print(f"   ⏱️ Extração {self.tempos['extracao']:.1f}s | Banco {self.tempos['banco']:.1f}s | Total {duracao:.1f}s")
+
+        return {
+            'carregadas': list(self.carregadas),
+            'falharam': list(self.falharam),
+            'sem_alteracao': list(self.sem_alteracao),
+            'registros': self.total_registros,
+            'arquivo_consolidado': self.arquivo_consolidado if self._consolidado_iniciado else None,
+            'tempos': dict(self.tempos)
+        }
+
+    def _localizar_zip(self, codigo):
+        """ZIP atual da estação: o registrado no manifesto ou, sem registro, o mais recente da pasta"""
+        entrada = self.manifesto.obter(codigo)
+        if entrada and entrada.get('arquivo'):
+            caminho = os.path.join(self.pasta_destino, entrada['arquivo'])
+            if os.path.exists(caminho):
+                return caminho
+
+        versoes = obter_indice(self.pasta_destino).versoes(codigo)
+        return max(versoes, key=lambda versao: versao['mtime'])['arquivo'] if versoes else None
+
+    def _extrair(self):
+        while True:
+            codigo = self._fila_estacoes.get()
+            if codigo is _FIM:
+                break
+            if self._cancelado.is_set():
+                continue
+
+            if not self.manifesto.precisa_carregar(codigo):
+                self.sem_alteracao.append(codigo)
+                continue
+
+            caminho_zip = self._localizar_zip(codigo)
+            if caminho_zip is None:
+                print(f"    ⚠️ Pipeline: ZIP de {codigo} não encontrado em {self.pasta_destino}")
+                self.falharam.append(codigo)
+                continue
+
+            inicio = time.perf_counter()
+            try:
+                df = ler_cotas_do_zip(caminho_zip)
+                registros, com_erro = self.converter_registros(df) if df is not None else ([], 0)
+            except Exception as e:
+                print(f"    ❌ Pipeline: erro ao extrair {codigo}: {e}")
+                self.falharam.append(codigo)
+                continue
+            finally:
+                self.tempos['extracao'] += time.perf_counter() - inicio
+
+            if not registros:
+                print(f"    ⚠️ Pipeline: {codigo} sem registros válidos")
+                self.falharam.append(codigo)
+                continue
+
+            self._anexar_ao_consolidado(codigo, df)
+            print(f"    📤 {codigo}: {len(registros)} registros na fila do banco")
+            self._fila_registros.put((codigo, caminho_zip, registros))
+
+        # O estágio do banco sempre recebe o fim, mesmo em cancelamento
+        self._fila_registros.put(_FIM)
+
+    def _anexar_ao_consolidado(self, codigo, df):
+        """
+        Acrescenta as cotas da estação ao consolidado (só a thread de extração escreve).
+        O primeiro bloco da execução recria o arquivo com cabeçalho. Uma falha aqui
+        não impede a carga no banco.
+        """
+        try:
+            df.to_csv(
+                self.arquivo_consolidado, mode='a' if self._consolidado_iniciado else 'w',
+                header=not self._consolidado_iniciado, index=False, encoding='utf-8'
+            )
+            self._consolidado_iniciado = True
+        except Exception as e:
+            print(f"    ⚠️ Pipeline: {codigo} não foi gravada no arquivo consolidado: {e}")
+
+    def _carregar(self):
+        codigos, registros, arquivos = [], [], {}
+        while True:
+            item = self._fila_registros.get()
+            fim = item is _FIM
+
+            if not fim and not self._cancelado.is_set():
+                codigo, caminho_zip, registros_estacao = item
+                codigos.append(codigo)
+                arquivos[codigo] = caminho_zip
+                registros.extend(registros_estacao)
+
+            if registros and (fim or len(registros) >= self.registros_por_carga):
+                self._inserir(codigos, registros, arquivos)
+                codigos, registros, arquivos = [], [], {}
+
+            if fim:
+                break
+
+    def _inserir(self, codigos, registros, arquivos):
+        inicio = time.perf_counter()
+        try:
+            sucesso = self.inserir_registros(registros)
+        except Exception as e:
+            print(f"    ❌ Pipeline: erro ao inserir no banco: {e}")
+            sucesso = False
+        self.tempos['banco'] += time.perf_counter() - inicio
+
+        if not sucesso:
+            self.falharam.extend(codigos)
+            return
+
+        # Só depois do commit: uma queda aqui faz a estação ser carregada de novo (DO NOTHING)
+        self.manifesto.marcar_carregadas(codigos, arquivos)
+        self.carregadas.extend(codigos)
+        self.total_registros += len(registros)
+        print(f"    🗄️ {len(registros)} registros inseridos ({', '.join(codigos)})")
+
+        if self.callback_progresso:
+            self.callback_progresso(len(self.carregadas), self.total_registros)
@@ -1,95 +1,216 @@
 # scripts/logica/play.py - VERSÃO CORRIGIDA PARA NUITKA
-from playwright.sync_api import sync_playwright
-import getpass
+from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
 import os
 import time
 import shutil
 from glob import glob
-from pathlib import Path
 import re
+import tempfile
+import threading
+from threading import Thread
+from concurrent.futures import Future
 from datetime import datetime
 
 # ✅ CORREÇÃO: Import absoluto ao invés de relativo
-from logica.consumo import criar_pasta_base, verificar_arquivo_existe
+from logica.consumo import criar_pasta_base, criar_pasta_staging, separar_estacoes_frescas, verificar_arquivo_existe, ordenar_por_tamanho, ORDEM_ESTACOES
+from logica.diario import DiarioExecucao, carregar_ultima_execucao_incompleta, marcar_como_retomada
+from logica.agendador import ControladorConcorrencia, CONCORRENCIA_MAX_PADRAO
+from logica.seletores import localizar_elemento, finalizar_registro_seletores
+from logica.manifesto import salvar_manifestos
+from logica.cancelamento import OperacaoCancelada, obter_token, aguardar_locator, aguardar_evento_pagina
+from logica.cacheRecursos import CACHE_NAVEGADOR, instalar_cache_recursos, resumo_cache_recursos
+from logica.cacheNegativo import obter_cache_negativo, TTL_NEGATIVO_HORAS
+from logica.telemetria import CronometroEstacao, iniciar_rastro, concluir_cronometro, finalizar_rastro
+from logica.buscaEstacao import eh_resposta_da_busca, interpretar_resposta_busca
+from logica.loteEstacoes import (
+    INEXISTENTE_NAO_CONFIRMADA, SEM_DADOS_NAO_CONFIRMADA, extrair_codigo_do_arquivo, finalizar_download,
+    criar_lote_agendado, registrar_resultado_lote, resultado_da_finalizacao, finalizar_lote, montar_resultado_final
+)
 
-def aguardar_download_completo(pasta_downloads, codigo_estacao, timeout=8):
-    """Aguarda o download ser completado para a estação específica"""
-    padrao = f'Estacao_{codigo_estacao}_CSV_*.zip'
-    start_time = time.time()
-    
-    while time.time() - start_time < timeout:
-        arquivos = glob(os.path.join(pasta_downloads, padrao))
-        if arquivos:
-            arquivo = arquivos[0]
-            
-            if os.path.exists(arquivo) and os.path.getsize(arquivo) > 0:
-                time.sleep(0.1)
-                if os.path.exists(arquivo):
-                    return True
-                
-        time.sleep(0.03)
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:  # Observação de pasta por eventos é opcional
+    Observer = None
+    FileSystemEventHandler = None
+
+# HIDROWEB_URL aponta para outro servidor (ex.: o Hidroweb simulado em logica/servidorSimulado.py)
+URL_SERIES_HISTORICAS = os.environ.get("HIDROWEB_URL") or "https://www.snirh.gov.br/hidroweb/serieshistoricas"
+
+# Estações baixadas há menos de N horas não são baixadas de novo (0 = sempre baixar)
+TTL_FRESCOR_HORAS = float(os.environ.get("HIDROWEB_TTL_FRESCOR_HORAS") or 0)
+
+ARGS_NAVEGADOR = [
+    '--disable-blink-features=AutomationControlled',
+    '--disable-dev-shm-usage',
+    '--no-sandbox',
+    '--disable-gpu',
+    '--disable-extensions',
+    '--disable-plugins',
+    '--disable-background-networking',
+    '--disable-background-timer-throttling',
+    '--disable-renderer-backgrounding',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-features=TranslateUI,VizDisplayCompositor',
+    '--disable-ipc-flooding-protection',
+    '--disable-logging',
+    '--disable-default-apps',
+    '--disable-component-extensions-with-background-pages',
+    '--fast-start',
+    '--aggressive-cache-discard'
+]
+
+SELETORES_CELULA_ESTACAO = [
+    '#mat-tab-content-0-0 > div > ana-card > mat-card > mat-card-content > ana-dados-convencionais-list > div > div.mat-elevation-z8.example-container > table > tbody > tr:nth-child(1) > td.mat-cell.cdk-column-id.mat-column-id.ng-star-inserted > a',
+    'xpath=//*[@id="mat-tab-content-0-0"]/div/ana-card/mat-card/mat-card-content/ana-dados-convencionais-list/div/div[1]/table/tbody/tr[1]/td[2]/a',
+    'td.mat-column-id a'
+]
+
+SELETORES_BOTAO_CSV = [
+    'td.mat-column-csv button',
+    '#mat-tab-content-0-0 > div > ana-card > mat-card > mat-card-content > ana-dados-convencionais-list > div > div.mat-elevation-z8.example-container > table > tbody > tr:nth-child(1) > td.mat-cell.cdk-column-csv.mat-column-csv.mat-table-sticky.ng-star-inserted > button',
+    'button[mattooltip*="CSV"], button[title*="CSV"], td.mat-column-csv button, button:has-text("CSV")'
+]
+
+# Versão CSS dos seletores acima, para esperar a linha da estação com um único wait_for
+SELETOR_CELULA_ESTACAO_CSS = ', '.join(s for s in SELETORES_CELULA_ESTACAO if not s.startswith('xpath='))
+
+# Tempo máximo de espera pela resposta XHR da busca de uma estação
+TIMEOUT_RESPOSTA_BUSCA_MS = 5000
+
+OPCOES_CONTEXTO = {
+    'accept_downloads': True,
+    'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+    'ignore_https_errors': True,
+    'bypass_csp': True,
+    'viewport': {'width': 1280, 'height': 720}
+}
+
+def aguardar_download_completo(download, caminho_destino):
+    """
+    Salva o download assim que o Playwright sinaliza a conclusão.
+    download.failure() só retorna quando os bytes terminaram de chegar (ou o download falhou),
+    então não há varredura da pasta nem pausas fixas.
+    Retorna True se o arquivo foi salvo completo.
+    """
+    falha = download.failure()
+    if falha:
+        print(f"    ❌ Download falhou: {falha}")
+        return False
     
-    return False
+    download.save_as(caminho_destino)
+    return os.path.getsize(caminho_destino) > 0
+
+class _ObservadorDownloads(FileSystemEventHandler if FileSystemEventHandler else object):
+    """Sinaliza quando um ZIP de estação aparece na pasta observada"""
+    
+    def __init__(self, padrao):
+        self.padrao = re.compile(padrao)
+        self.arquivo = None
+        self.evento = threading.Event()
+    
+    def _verificar(self, caminho):
+        if self.padrao.search(os.path.basename(caminho)) and os.path.getsize(caminho) > 0:
+            self.arquivo = caminho
+            self.evento.set()
+    
+    def on_closed(self, event):
+        # inotify (Linux): arquivo fechado após escrita
+        if not event.is_directory:
+            self._verificar(event.src_path)
+    
+    def on_moved(self, event):
+        # Navegadores gravam em .crdownload/.part e renomeiam ao terminar
+        if not event.is_directory:
+            self._verificar(event.dest_path)
+    
+    def on_created(self, event):
+        if not event.is_directory and not event.src_path.endswith(('.crdownload', '.part', '.tmp')):
+            try:
+                self._verificar(event.src_path)
+            except OSError:
+                pass
 
 def aguardar_qualquer_download_completo(pasta_downloads, timeout=8):
-    """Aguarda qualquer download ser completado"""
-    padrao = 'Estacao_*_CSV_*.zip'
-    start_time = time.time()
-    arquivos_iniciais = set(glob(os.path.join(pasta_downloads, padrao)))
+    """
+    Aguarda um novo ZIP de estação ser gravado por um processo externo na pasta.
+    Usa o watchdog (inotify/ReadDirectoryChangesW) quando instalado; sem ele, faz uma
+    verificação leve da pasta a cada 100 ms.
+    """
+    padrao = r'^Estacao_\d+_CSV_.*\.zip$'
     
-    while time.time() - start_time < timeout:
-        arquivos_atuais = set(glob(os.path.join(pasta_downloads, padrao)))
-        novos_arquivos = arquivos_atuais - arquivos_iniciais
-        
-        if novos_arquivos:
-            # Verifica se algum dos novos arquivos está completo
-            for arquivo in novos_arquivos:
-                if os.path.exists(arquivo) and os.path.getsize(arquivo) > 0:
-                    time.sleep(0.1)  # Pequena pausa para garantir que o download terminou
-                    if os.path.exists(arquivo):
-                        return arquivo
-                        
-        time.sleep(0.03)
+    if Observer is not None:
+        observador = _ObservadorDownloads(padrao)
+        watcher = Observer()
+        watcher.schedule(observador, pasta_downloads, recursive=False)
+        watcher.start()
+        try:
+            if observador.evento.wait(timeout):
+                return observador.arquivo
+            return None
+        finally:
+            watcher.stop()
+            watcher.join(1)
+    
+    regex = re.compile(padrao)
+    iniciais = {e.name for e in os.scandir(pasta_downloads) if regex.match(e.name)}
+    limite = time.time() + timeout
+    while time.time() < limite:
+        for entrada in os.scandir(pasta_downloads):
+            if entrada.name not in iniciais and regex.match(entrada.name) and entrada.stat().st_size > 0:
+                return entrada.path
+        time.sleep(0.1)
     
     return None
 
-def extrair_codigo_do_arquivo(nome_arquivo):
-    """Extrai o código da estação do nome do arquivo"""
-    match = re.search(r'Estacao_(\d+)_CSV_', nome_arquivo)
-    return match.group(1) if match else None
+def pesquisar_estacao(page, codigo, timeout=TIMEOUT_RESPOSTA_BUSCA_MS, token=None):
+    """
+    Digita o código no campo de busca e aguarda a resposta da API.
+    Retorna a resposta, ou None se nenhuma requisição da busca respondeu dentro do timeout.
+    Com um token de cancelamento, a espera é fatiada e a parada lança OperacaoCancelada.
+    """
+    campo = page.locator('#mat-input-0').first
+    if not aguardar_locator(campo, 1500, token):
+        raise PlaywrightTimeoutError("Campo de busca não apareceu")
+    
+    respostas = []
+    def ouvinte(resposta):
+        if eh_resposta_da_busca(resposta, codigo):
+            respostas.append(resposta)
+    
+    # Ouvinte antes do fill: uma busca disparada pela digitação (autocomplete) também é capturada
+    page.on("response", ouvinte)
+    try:
+        campo.fill(codigo)
+        campo.press("Enter")
+        return aguardar_evento_pagina(page, respostas, timeout, token, "a resposta da busca")
+    except PlaywrightTimeoutError:
+        return None
+    finally:
+        page.remove_listener("response", ouvinte)
 
-def obter_estacao_atual_carregada(page):
+def aguardar_linha_da_estacao(page, codigo, timeout=3000, token=None):
+    """Aguarda a tabela exibir a célula com o código pesquisado. Retorna True se apareceu."""
+    celula = page.locator(SELETOR_CELULA_ESTACAO_CSS).filter(
+        has_text=re.compile(rf"^\s*{re.escape(codigo)}\s*$")
+    ).first
+    return aguardar_locator(celula, timeout, token)
+
+def obter_estacao_atual_carregada(page, token=None):
     """
     Obtém o código da estação atualmente carregada na página.
     Retorna o código da estação ou None se não conseguir obter.
     """
+    elemento_estacao = localizar_elemento(page, 'celula_estacao', SELETORES_CELULA_ESTACAO, timeout=2000, token=token)
+    if elemento_estacao is None:
+        return None
+    
     try:
-        # Primeiro seletor CSS
-        elemento_estacao = page.locator('#mat-tab-content-0-0 > div > ana-card > mat-card > mat-card-content > ana-dados-convencionais-list > div > div.mat-elevation-z8.example-container > table > tbody > tr:nth-child(1) > td.mat-cell.cdk-column-id.mat-column-id.ng-star-inserted > a').first
-        elemento_estacao.wait_for(timeout=2000, state='visible')
-        codigo_carregado = elemento_estacao.text_content().strip()
-        return codigo_carregado
-        
-    except:
-        try:
-            # XPath alternativo
-            elemento_estacao = page.locator('xpath=//*[@id="mat-tab-content-0-0"]/div/ana-card/mat-card/mat-card-content/ana-dados-convencionais-list/div/div[1]/table/tbody/tr[1]/td[2]/a').first
-            elemento_estacao.wait_for(timeout=2000, state='visible')
-            codigo_carregado = elemento_estacao.text_content().strip()
-            return codigo_carregado
-            
-        except:
-            try:
-                # Seletor mais genérico
-                elemento_estacao = page.locator('td.mat-column-id a').first
-                elemento_estacao.wait_for(timeout=2000, state='visible')
-                codigo_carregado = elemento_estacao.text_content().strip()
-                return codigo_carregado
-                
-            except:
-                return None
+        return elemento_estacao.text_content().strip()
+    except Exception:
+        return None
 
-def validar_e_corrigir_estacao_carregada_rapida(page, codigo_esperado, max_tentativas=2):
+def validar_e_corrigir_estacao_carregada_rapida(page, codigo_esperado, max_tentativas=2, token=None):
     """
     Versão mais rápida da validação - apenas 2 tentativas máximo
     Retorna True se conseguiu carregar a estação correta, False caso contrário.
@@ -100,10 +221,11 @@ def validar_e_corrigir_estacao_carregada_rapida(page, codigo_esperado, max_tenta
         try:
             # Aguarda a tabela carregar - timeout menor
             tabela = page.locator('table.mat-table').first
-            tabela.wait_for(timeout=2000, state='visible')
+            if not aguardar_locator(tabela, 2000, token):
+                raise PlaywrightTimeoutError("Tabela não apareceu")
             
             # Obtém o código da estação atual
-            codigo_carregado = obter_estacao_atual_carregada(page)
+            codigo_carregado = obter_estacao_atual_carregada(page, token)
             
             if codigo_carregado:
                 print(f"    📋 Estação carregada: {codigo_carregado} (esperada: {codigo_esperado})")
@@ -114,25 +236,13 @@ def validar_e_corrigir_estacao_carregada_rapida(page, codigo_esperado, max_tenta
                 else:
                     print(f"    ❌ Estação incorreta! Corrigindo para {codigo_esperado}...")
                     
-                    # Corrige o campo de input
-                    try:
-                        campo = page.locator('#mat-input-0').first
-                        campo.wait_for(timeout=1000)
-                    except:
-                        campo = page.locator('xpath=//*[@id="mat-input-0"]').first
-                        campo.wait_for(timeout=1000)
-                    
-                    campo.fill("")
-                    time.sleep(0.1)
-                    campo.fill(codigo_esperado)
-                    campo.press("Enter")
-                    
-                    time.sleep(0.3)  # Reduzido o tempo de espera
+                    # Refaz a busca e espera a resposta/linha da estação em vez de um tempo fixo
+                    pesquisar_estacao(page, codigo_esperado, token=token)
+                    aguardar_linha_da_estacao(page, codigo_esperado, timeout=1500, token=token)
                     continue
             else:
                 print(f"    ⚠️ Não foi possível obter código da estação carregada (tentativa {tentativa + 1})")
                 if tentativa < max_tentativas - 1:
-                    time.sleep(0.2)  # Reduzido o tempo de espera
                     continue
                 else:
                     # MUDANÇA CRÍTICA: NÃO assume mais que está correto
@@ -140,10 +250,11 @@ def validar_e_corrigir_estacao_carregada_rapida(page, codigo_esperado, max_tenta
                     print(f"    ❌ Não foi possível validar a estação após {max_tentativas} tentativas")
                     return False
                     
+        except OperacaoCancelada:
+            raise
         except Exception as e:
             print(f"    ❌ Erro na validação (tentativa {tentativa + 1}): {str(e)}")
             if tentativa < max_tentativas - 1:
-                time.sleep(0.2)  # Reduzido o tempo de espera
                 continue
             else:
                 return False
@@ -167,115 +278,19 @@ def limpar_downloads_temp_especificos(pasta_downloads, excluir_codigo=None):
         except Exception as e:
             print(f"    ⚠️ Erro ao remover arquivo temp: {e}")
 
-def verificar_se_deve_substituir(pasta_destino, codigo_estacao, novo_arquivo_temp):
-    """
-    Verifica se deve substituir arquivo existente baseado no tamanho.
-    Retorna True se deve substituir, False caso contrário.
-    """
-    try:
-        base_path = Path(pasta_destino)
-        padrao = f'Estacao_{codigo_estacao}_CSV_*.zip'
-        
-        # Busca arquivos existentes da mesma estação
-        arquivos_existentes = list(base_path.glob(padrao))
-        
-        if not arquivos_existentes:
-            return True  # Não existe arquivo, pode baixar
-        
-        # Obter tamanho do novo arquivo
-        novo_tamanho = os.path.getsize(novo_arquivo_temp)
-        
-        # Encontrar o arquivo mais recente
-        arquivo_mais_recente = None
-        data_mais_recente = None
-        
-        for arquivo_path in arquivos_existentes:
-            nome = arquivo_path.name
-            match = re.search(r'Estacao_(\d+)_CSV_(\d{4}-\d{2}-\d{2})T', nome)
-            if match:
-                data_str = match.group(2)
-                try:
-                    data_dt = datetime.strptime(data_str, "%Y-%m-%d")
-                    if data_mais_recente is None or data_dt > data_mais_recente:
-                        data_mais_recente = data_dt
-                        arquivo_mais_recente = arquivo_path
-                except ValueError:
-                    continue
-        
-        if arquivo_mais_recente is None:
-            return True  # Não conseguiu determinar arquivo mais recente, permite download
-        
-        # Comparar tamanhos
-        tamanho_existente = arquivo_mais_recente.stat().st_size
-        
-        if novo_tamanho != tamanho_existente:
-            print(f"    📊 Tamanhos diferentes - Existente: {tamanho_existente} bytes, Novo: {novo_tamanho} bytes")
-            return True  # Tamanhos diferentes, deve substituir
-        else:
-            print(f"    ⚖️ Mesmo tamanho ({tamanho_existente} bytes) - Mantendo arquivo existente")
-            return False  # Mesmo tamanho, não precisa substituir
-            
-    except Exception as e:
-        print(f"    ⚠️ Erro ao verificar substituição: {e}")
-        return True  # Em caso de erro, permite download
-
-def remover_arquivos_antigos_da_estacao(pasta_destino, codigo_estacao):
-    """Remove todos os arquivos antigos da estação especificada"""
-    try:
-        base_path = Path(pasta_destino)
-        padrao = f'Estacao_{codigo_estacao}_CSV_*.zip'
-        
-        arquivos_existentes = list(base_path.glob(padrao))
-        
-        for arquivo in arquivos_existentes:
-            arquivo.unlink()
-            print(f"    🗑️ Removido arquivo antigo: {arquivo.name}")
-            
-    except Exception as e:
-        print(f"    ❌ Erro ao remover arquivos antigos: {e}")
-
-def mover_arquivo_para_destino(arquivo_origem, pasta_destino, codigo_estacao_esperado):
-    """Move arquivo para destino verificando se é da estação correta"""
-    
-    if not os.path.exists(arquivo_origem):
-        return False
-    
-    nome_arquivo = os.path.basename(arquivo_origem)
-    codigo_arquivo = extrair_codigo_do_arquivo(nome_arquivo)
-    
-    # Verifica se o arquivo baixado é da estação correta
-    if codigo_arquivo != codigo_estacao_esperado:
-        print(f"    ⚠️ Arquivo incorreto: esperado {codigo_estacao_esperado}, obtido {codigo_arquivo}")
-        # Remove o arquivo incorreto
-        try:
-            os.remove(arquivo_origem)
-            print(f"    🗑️ Arquivo incorreto removido: {nome_arquivo}")
-        except:
-            pass
-        return False
-    
-    arquivo_destino = os.path.join(pasta_destino, nome_arquivo)
-    
-    try:
-        # Verificar se deve substituir baseado no tamanho
-        if not verificar_se_deve_substituir(pasta_destino, codigo_estacao_esperado, arquivo_origem):
-            # Remove o arquivo temporário e retorna True (considera como sucesso)
-            os.remove(arquivo_origem)
-            return True
-        
-        # Remove arquivos antigos da mesma estação antes de mover o novo
-        remover_arquivos_antigos_da_estacao(pasta_destino, codigo_estacao_esperado)
-        
-        # Move o novo arquivo
-        shutil.move(arquivo_origem, arquivo_destino)
-        return True
-        
-    except Exception as e:
-        print(f"    ❌ Erro ao mover: {str(e)}")
-        return False
-
-def processar_estacao_rapida(page, codigo, pasta_downloads_temp, pasta_destino, idx, total, callback_progresso=None, parar_callback=None, tentativa=1):
-   if parar_callback and parar_callback():
+def processar_estacao_rapida(page, codigo, pasta_downloads_temp, pasta_destino, idx, total, callback_progresso=None, parar_callback=None, tentativa=1, finalizador=None):
+   """
+   Busca e baixa uma estação na página.
+   Retorna True, "estacao_inexistente", "estacao_sem_dados" ou False (falha técnica).
+   Com um finalizador (executor), a verificação e a promoção do ZIP rodam em segundo
+   plano e o retorno é um Future com o resultado final - a página fica livre para o
+   próximo código enquanto o disco trabalha.
+   A duração de cada fase da tentativa vai para o rastro da execução (telemetria).
+   parar_callback pode ser um TokenCancelamento: toda espera da página confere a
+   parada a cada FATIA_ESPERA_MS e a tentativa é abandonada na hora.
+   """
+   token = obter_token(parar_callback)
+   if token.cancelado:
        return False
        
    tentativa_text = f" (Retry {tentativa})" if tentativa > 1 else ""
@@ -285,352 +300,517 @@ def processar_estacao_rapida(page, codigo, pasta_downloads_temp, pasta_destino,
        texto_progresso = f"Baixando {codigo}" + (f" - Retry {tentativa}" if tentativa > 1 else "")
        callback_progresso(idx, total, texto_progresso)
    
+   cronometro = CronometroEstacao(codigo, tentativa)
+   resultado = buscar_e_baixar_estacao(page, codigo, pasta_downloads_temp, pasta_destino, cronometro, finalizador, token)
+   
+   if isinstance(resultado, Future):
+       # O rastro da tentativa só fecha quando a finalização em segundo plano termina
+       resultado.add_done_callback(
+           lambda futuro: concluir_cronometro(cronometro, False if futuro.exception() else futuro.result())
+       )
+   else:
+       concluir_cronometro(cronometro, resultado)
+   return resultado
+
+def descartar_arquivo_parcial(caminho):
+   """Remove o que uma gravação interrompida deixou no staging"""
+   if caminho and os.path.exists(caminho):
+       try:
+           os.remove(caminho)
+       except OSError as e:
+           print(f"    ⚠️ Não foi possível remover {os.path.basename(caminho)}: {e}")
+
+def buscar_e_baixar_estacao(page, codigo, pasta_downloads_temp, pasta_destino, cronometro, finalizador=None, token=None):
+   """Corpo de processar_estacao_rapida, cronometrado fase a fase"""
+   caminho_temp = None
    try:
-       # Limpa downloads temporários antes de começar (exceto da estação atual se existir)
-       limpar_downloads_temp_especificos(pasta_downloads_temp, codigo)
+       # Busca o código e espera a resposta da API (sem pausas fixas)
+       with cronometro.fase('busca'):
+           resposta = pesquisar_estacao(page, codigo, token=token)
+           situacao = interpretar_resposta_busca(resposta, codigo)
        
-       # Preenche o campo de busca
-       try:
-           campo = page.locator('#mat-input-0').first
-           campo.wait_for(timeout=1500)
-       except:
-           campo = page.locator('xpath=//*[@id="mat-input-0"]').first
-           campo.wait_for(timeout=1500)
+       if situacao == "inexistente":
+           # O JSON da busca já diz que o código não existe: nada a esperar no DOM
+           print(f"    ❌ Estação {codigo} não encontrada na busca - não existe")
+           return "estacao_inexistente"
        
-       campo.fill("")
-       campo.fill(codigo)
-       campo.press("Enter")
+       if situacao == "sem_dados":
+           print(f"    📋 Estação {codigo} sem dados (informado pela busca)")
+           return "estacao_sem_dados"
        
-       time.sleep(0.1)
+       if situacao == "encontrada":
+           # Estação confirmada pelo JSON: só falta a linha renderizar para clicar no botão
+           with cronometro.fase('tabela'):
+               linha_renderizada = aguardar_linha_da_estacao(page, codigo, timeout=3000, token=token)
+           if not linha_renderizada:
+               print(f"    ⚠️ {codigo} confirmada pela API, mas a tabela não renderizou")
+               return False
        
-       # Verifica se existe algum resultado (tabela com dados)
-       try:
-           tabela = page.locator('table.mat-table').first
-           tabela.wait_for(timeout=3000, state='visible')
-       except:
-           print(f"    ❌ Estação {codigo} não encontrada - não existe ou não possui dados")
-           return "estacao_inexistente"
+       else:
+           # Sem payload reconhecível: validação pelo DOM
+           with cronometro.fase('tabela'):
+               linha_renderizada = aguardar_linha_da_estacao(page, codigo, timeout=1500 if resposta is not None else 3000, token=token)
+           
+           # Negativos do DOM voltam como no fluxo original, mas sem confirmação da API:
+           # entram no resultado e ficam fora do cache negativo (página lenta dá o mesmo sinal)
+           if not linha_renderizada:
+               with cronometro.fase('validacao'):
+                   if not page.locator('table.mat-table').first.is_visible():
+                       print(f"    ❌ Estação {codigo} não encontrada - não existe ou não possui dados")
+                       return INEXISTENTE_NAO_CONFIRMADA
+                   
+                   # A tabela mostra outra estação: corrige a busca
+                   if not validar_e_corrigir_estacao_carregada_rapida(page, codigo, token=token):
+                       print(f"    ❌ Não foi possível carregar a estação {codigo} corretamente")
+                       return INEXISTENTE_NAO_CONFIRMADA
        
-       # VERIFICAÇÃO RÁPIDA DO BOTÃO - SEM MÚLTIPLAS TENTATIVAS
-       # Tenta encontrar o botão de download IMEDIATAMENTE
-       botao_encontrado = False
-       botao_download = None
+       # A linha da estação já está renderizada: o botão aparece junto com ela
+       with cronometro.fase('botao'):
+           botao_download = localizar_elemento(page, 'botao_csv', SELETORES_BOTAO_CSV, timeout=1000, token=token)
+           habilitado = botao_download is not None and botao_download.is_enabled()
        
-       try:
-           # Primeira tentativa - seletor principal
-           botao_download = page.locator('td.mat-column-csv button').first
-           botao_download.wait_for(timeout=1500, state='visible')
-           if botao_download.is_visible() and botao_download.is_enabled():
-               botao_encontrado = True
-       except:
-           try:
-               # Segunda tentativa - seletor específico
-               botao_download = page.locator('#mat-tab-content-0-0 > div > ana-card > mat-card > mat-card-content > ana-dados-convencionais-list > div > div.mat-elevation-z8.example-container > table > tbody > tr:nth-child(1) > td.mat-cell.cdk-column-csv.mat-column-csv.mat-table-sticky.ng-star-inserted > button').first
-               botao_download.wait_for(timeout=1000, state='visible')
-               if botao_download.is_visible() and botao_download.is_enabled():
-                   botao_encontrado = True
-           except:
-               try:
-                   # Terceira tentativa - seletor genérico
-                   botao_download = page.locator('button[mattooltip*="CSV"], button[title*="CSV"], td.mat-column-csv button, button:has-text("CSV")').first
-                   botao_download.wait_for(timeout=1000, state='visible')
-                   if botao_download.is_visible() and botao_download.is_enabled():
-                       botao_encontrado = True
-               except:
-                   pass
-       
-       # Se não encontrou o botão, descarta IMEDIATAMENTE
-       if not botao_encontrado:
+       if botao_download is None:
            print(f"    ❌ Estação {codigo} não possui dados para download - botão CSV não encontrado")
-           return "estacao_inexistente"
-       
-       # VALIDAÇÃO DA ESTAÇÃO CARREGADA - APENAS SE O BOTÃO FOI ENCONTRADO
-       # Valida e verifica se o botão ainda existe após correção
-       if not validar_e_corrigir_estacao_carregada_rapida(page, codigo):
-           print(f"    ❌ Não foi possível carregar a estação {codigo} corretamente")
-           return "estacao_inexistente"
+           # Com a estação confirmada pela API, falta só o dado
+           return SEM_DADOS_NAO_CONFIRMADA if situacao == "encontrada" else INEXISTENTE_NAO_CONFIRMADA
        
-       # REVERIFICA O BOTÃO APÓS VALIDAÇÃO/CORREÇÃO
-       # Se houve correção, precisa verificar se o botão ainda existe
-       try:
-           botao_download = page.locator('td.mat-column-csv button').first
-           botao_download.wait_for(timeout=1000, state='visible')
-           if not (botao_download.is_visible() and botao_download.is_enabled()):
-               raise Exception("Botão não visível/habilitado")
-       except:
-           try:
-               botao_download = page.locator('#mat-tab-content-0-0 > div > ana-card > mat-card > mat-card-content > ana-dados-convencionais-list > div > div.mat-elevation-z8.example-container > table > tbody > tr:nth-child(1) > td.mat-cell.cdk-column-csv.mat-column-csv.mat-table-sticky.ng-star-inserted > button').first
-               botao_download.wait_for(timeout=800, state='visible')
-               if not (botao_download.is_visible() and botao_download.is_enabled()):
-                   raise Exception("Botão não visível/habilitado")
-           except:
-               print(f"    ❌ Estação {codigo} não possui botão de download após validação")
-               return "estacao_inexistente"
+       if not habilitado:
+           print(f"    📋 Estação {codigo} sem dados - botão CSV desabilitado")
+           return SEM_DADOS_NAO_CONFIRMADA
        
        # PROCESSO DE DOWNLOAD - botão já foi encontrado e validado
        try:
-           # Estratégia única e direta: usar expect_download
-           with page.expect_download(timeout=8000) as download_info:
-               botao_download.click()
-           
-           download = download_info.value
-           nome_arquivo = download.suggested_filename
-           caminho_temp = os.path.join(pasta_downloads_temp, nome_arquivo)
-           
-           print(f"    💾 {nome_arquivo}")
-           
-           # Verifica se o arquivo baixado é da estação correta antes mesmo de salvar
-           codigo_arquivo = extrair_codigo_do_arquivo(nome_arquivo)
-           if codigo_arquivo != codigo:
-               print(f"    ⚠️ Download incorreto: esperado {codigo}, obtido {codigo_arquivo}")
-               return False
+           with cronometro.fase('download'):
+               # O evento de download é esperado em fatias para atender a parada durante os 8 s
+               downloads = []
+               ouvinte = downloads.append
+               page.on("download", ouvinte)
+               try:
+                   botao_download.click()
+                   download = aguardar_evento_pagina(page, downloads, 8000, token, "o download")
+               finally:
+                   page.remove_listener("download", ouvinte)
+               nome_arquivo = download.suggested_filename
+               caminho_temp = os.path.join(pasta_downloads_temp, nome_arquivo)
+               
+               print(f"    💾 {nome_arquivo}")
+               
+               # Verifica se o arquivo baixado é da estação correta antes mesmo de salvar
+               codigo_arquivo = extrair_codigo_do_arquivo(nome_arquivo)
+               if codigo_arquivo != codigo:
+                   print(f"    ⚠️ Download incorreto: esperado {codigo}, obtido {codigo_arquivo}")
+                   return False
+               
+               # Salva assim que o Playwright sinaliza que os bytes chegaram
+               if not aguardar_download_completo(download, caminho_temp):
+                   descartar_arquivo_parcial(caminho_temp)
+                   return False
            
-           download.save_as(caminho_temp)
+           cronometro.bytes = os.path.getsize(caminho_temp)
            
-           # Aguarda o arquivo estar realmente disponível
-           if aguardar_download_completo(pasta_downloads_temp, codigo, timeout=5):
-               if mover_arquivo_para_destino(caminho_temp, pasta_destino, codigo):
-                   print(f"    ✅ OK!")
-                   return True
-               else:
-                   return False
-           else:
-               print(f"    ⏱️ Timeout no download específico")
-               return False
+           if finalizador is not None:
+               return finalizador.submit(finalizar_download, caminho_temp, pasta_destino, codigo, cronometro)
+           return finalizar_download(caminho_temp, pasta_destino, codigo, cronometro)
                
+       except OperacaoCancelada:
+           raise
        except Exception as e:
            print(f"    ❌ Erro no download: {str(e)}")
+           descartar_arquivo_parcial(caminho_temp)
            # Se falhar no download, é problema técnico, não de estação inexistente
            return False
            
+   except OperacaoCancelada:
+       print(f"    ⏹️ {codigo} interrompida")
+       descartar_arquivo_parcial(caminho_temp)
+       return False
    except Exception as e:
        print(f"    ❌ Erro geral: {str(e)}")
        return False
     
-def processar_lote_com_fallback(page, estacoes, pasta_downloads_temp, pasta_destino, callback_progresso=None, parar_callback=None):
-    estacoes_baixadas = []
-    estacoes_problematicas = []
-    estacoes_inexistentes = []
-    estacoes_sem_dados = []
-    total_estacoes = len(estacoes)
-    
-    print(f"\n🚀 PROCESSAMENTO RÁPIDO - {total_estacoes} ESTAÇÕES")
+def reciclar_pagina(page):
+    """Fecha o contexto da página e abre outro no mesmo navegador, já na tela de busca"""
+    browser = page.context.browser
+    try:
+        page.context.close()
+    except Exception:
+        pass
+    nova_pagina = criar_pagina(browser)
+    acessar_site(nova_pagina)
+    return nova_pagina
+
+def consumir_lote_na_pagina(page, lote, pasta_downloads_temp, pasta_destino, callback_progresso=None, parar_callback=None, rotulo=""):
+    """
+    Loop de uma página: pega a próxima estação pronta (nova ou retry vencido) até o lote acabar.
+    A página é reciclada quando o orçamento de memória do lote pede; retorna a página em uso.
+    """
+    agendador = lote['agendador']
+    controlador = lote['controlador']
+    orcamento = lote['orcamento']
+    estacoes_na_pagina = 0
     
-    # PRIMEIRA TENTATIVA
-    for idx, codigo in enumerate(estacoes, start=1):
+    while not agendador.finalizado:
         if parar_callback and parar_callback():
-            print("⏹️ Interrompido")
             break
-            
-        resultado = processar_estacao_rapida(
-            page, codigo, pasta_downloads_temp, pasta_destino, 
-            idx, total_estacoes, callback_progresso, parar_callback, tentativa=1
-        )
         
-        if resultado == True:
-            estacoes_baixadas.append(codigo)
-        elif resultado == "estacao_inexistente":
-            estacoes_inexistentes.append(codigo)
-        elif resultado == "estacao_sem_dados":
-            estacoes_sem_dados.append(codigo)
-        else:  # False ou outros erros
-            estacoes_problematicas.append(codigo)
+        motivo = orcamento.motivo_reciclagem(estacoes_na_pagina)
+        if motivo:
+            orcamento.registrar_reciclagem(motivo, rotulo)
+            try:
+                page = reciclar_pagina(page)
+            except Exception as e:
+                # Sem página não há como seguir; o restante fica para as outras páginas ou para a retomada
+                print(f"    ❌ {rotulo}Falha ao reciclar a página: {e}")
+                break
+            estacoes_na_pagina = 0
         
-        if idx < total_estacoes:
-            time.sleep(0.02)
-    
-    # SEGUNDA TENTATIVA - APENAS para estações que tiveram problemas técnicos (não inexistentes)
-    if estacoes_problematicas and not (parar_callback and parar_callback()):
-        print(f"\n🔄 RETRY 2ª TENTATIVA - {len(estacoes_problematicas)} ESTAÇÕES")
+        if not lote['disjuntor'].aguardar(parar_callback):
+            break
+        if controlador and not controlador.adquirir(parar_callback):
+            break
         
-        estacoes_segunda_tentativa = []
+        item = agendador.proxima()
+        if item is None:
+            if controlador:
+                controlador.devolver()
+            continue
+        codigo, tentativa = item
         
-        for idx, codigo in enumerate(estacoes_problematicas, start=1):
-            if parar_callback and parar_callback():
-                break
-            
-            idx_progress = total_estacoes + idx
-            total_progress = total_estacoes + len(estacoes_problematicas)
-            
+        with lote['trava']:
+            lote['iniciadas'] += 1
+            idx = min(lote['iniciadas'], lote['total'])
+        estacoes_na_pagina += 1
+        
+        inicio = time.perf_counter()
+        try:
             resultado = processar_estacao_rapida(
                 page, codigo, pasta_downloads_temp, pasta_destino,
-                idx_progress, total_progress, callback_progresso, parar_callback, tentativa=2
+                idx, lote['total'], callback_progresso, parar_callback, tentativa=tentativa,
+                finalizador=lote['finalizador']
             )
-            
-            if resultado == True:
-                estacoes_baixadas.append(codigo)
-                print(f"    🎉 Recuperada na 2ª tentativa!")
-            elif resultado == "estacao_inexistente":
-                estacoes_inexistentes.append(codigo)
-                print(f"    ❌ Confirmado: estação {codigo} não existe")
-            elif resultado == "estacao_sem_dados":
-                estacoes_sem_dados.append(codigo)
-                print(f"    ❌ Confirmado: estação {codigo} sem dados para download")
-            else:  # False ou outros erros
-                estacoes_segunda_tentativa.append(codigo)
-            
-            if idx < len(estacoes_problematicas):
-                time.sleep(0.05)
-        
-        estacoes_problematicas = estacoes_segunda_tentativa
-    
-    # TERCEIRA TENTATIVA - APENAS para estações que continuaram com problemas técnicos
-    if estacoes_problematicas and not (parar_callback and parar_callback()):
-        print(f"\n🔄 RETRY 3ª TENTATIVA - {len(estacoes_problematicas)} ESTAÇÕES")
+        except Exception as e:
+            print(f"    ❌ {rotulo}Erro inesperado em {codigo}: {e}")
+            resultado = False
         
-        estacoes_finalmente_falharam = []
+        latencia = time.perf_counter() - inicio
+        with lote['trava']:
+            lote['latencias'].append(latencia)
+        if controlador:
+            controlador.liberar(latencia, resultado)
         
-        for idx, codigo in enumerate(estacoes_problematicas, start=1):
-            if parar_callback and parar_callback():
-                break
-            
-            # Ajustar o progress considerando as tentativas anteriores
-            idx_progress = total_estacoes + len(estacoes) + idx
-            total_progress = total_estacoes + len(estacoes) + len(estacoes_problematicas)
-            
-            print(f"🔁 3ª Tentativa {codigo}")
-            
-            resultado = processar_estacao_rapida(
-                page, codigo, pasta_downloads_temp, pasta_destino,
-                idx_progress, total_progress, callback_progresso, parar_callback, tentativa=3
+        if isinstance(resultado, Future):
+            # Finalização em segundo plano: o resultado é registrado quando o ZIP for promovido
+            resultado.add_done_callback(
+                lambda futuro, codigo=codigo, tentativa=tentativa: registrar_resultado_lote(
+                    lote, codigo, resultado_da_finalizacao(futuro, codigo), tentativa, parar_callback
+                )
             )
-            
-            if resultado == True:
-                estacoes_baixadas.append(codigo)
-                print(f"    🎉 Recuperada na 3ª tentativa!")
-            elif resultado == "estacao_inexistente":
-                estacoes_inexistentes.append(codigo)
-                print(f"    ❌ Confirmado: estação {codigo} não existe")
-            elif resultado == "estacao_sem_dados":
-                estacoes_sem_dados.append(codigo)
-                print(f"    ❌ Confirmado: estação {codigo} sem dados")
-            else:  # False ou outros erros
-                estacoes_finalmente_falharam.append(codigo)
-            
-            if idx < len(estacoes_problematicas):
-                time.sleep(0.1)  # Pausa um pouco maior na 3ª tentativa
-        
-        estacoes_problematicas = estacoes_finalmente_falharam
+        else:
+            registrar_resultado_lote(lote, codigo, resultado, tentativa, parar_callback)
     
-    return estacoes_baixadas, estacoes_problematicas, estacoes_inexistentes, estacoes_sem_dados
+    return page
 
-def baixar_estacoes(estacoes, callback_progresso=None, parar_callback=None, tipo_consulta="normal"):
+def processar_lote_com_fallback(page, estacoes, pasta_downloads_temp, pasta_destino, callback_progresso=None, parar_callback=None, finalizar_em_paralelo=False, diario=None):
+    """
+    Processa as estações em uma única página.
+    
+    Falhas técnicas voltam para a fila com backoff exponencial e são intercaladas
+    com as estações novas (até MAX_TENTATIVAS); se a taxa de falhas disparar, o
+    disjuntor pausa o lote antes de continuar. Com finalizar_em_paralelo, hash e
+    promoção do ZIP anterior rodam enquanto a página já pesquisa o próximo código.
+    
+    Returns:
+        tuple: ((baixadas, falharam, inexistentes, sem_dados), página em uso) - se o orçamento
+        de memória reciclou a página no meio do lote, é a nova, que fica a cargo de quem chamou
+    """
+    print(f"\n🚀 PROCESSAMENTO RÁPIDO - {len(estacoes)} ESTAÇÕES")
+    
+    lote = criar_lote_agendado(estacoes, finalizar_em_paralelo=finalizar_em_paralelo, diario=diario)
+    page = consumir_lote_na_pagina(page, lote, pasta_downloads_temp, pasta_destino, callback_progresso, parar_callback)
+    return finalizar_lote(lote, parar_callback), page
+
+def abrir_navegador(p):
+    """Inicia o Chromium headless com as opções de desempenho"""
+    return p.chromium.launch(headless=True, args=ARGS_NAVEGADOR)
+
+def criar_pagina(browser):
+    """Cria um contexto isolado e uma página com bloqueio de recursos pesados"""
+    context = browser.new_context(**OPCOES_CONTEXTO)
+    page = context.new_page()
+    
+    page.route("**/*.{png,jpg,jpeg,gif,svg,ico,woff,woff2,ttf,eot}", lambda route: route.abort())
+    page.route("**/*.css", lambda route: route.fulfill(status=200, body=""))
+    page.route("**/analytics/**", lambda route: route.abort())
+    page.route("**/gtag/**", lambda route: route.abort())
+    page.route("**/google-analytics.**", lambda route: route.abort())
+    
+    if CACHE_NAVEGADOR:
+        # Bundles do Angular servidos do disco nos próximos lançamentos
+        instalar_cache_recursos(page, URL_SERIES_HISTORICAS)
+    
+    return page
+
+def acessar_site(page):
+    """Abre a página de séries históricas do Hidroweb"""
+    print("🌐 Acessando site...")
+    try:
+        page.goto(URL_SERIES_HISTORICAS, timeout=6000, wait_until='domcontentloaded')
+    except:
+        page.goto(URL_SERIES_HISTORICAS, timeout=12000, wait_until='networkidle')
+    
+    # Pronto quando o campo de busca estiver disponível
+    page.locator('#mat-input-0').first.wait_for(timeout=5000)
+
+def processar_lote_paralelo(estacoes, pasta_downloads_temp, pasta_destino, num_paginas, callback_progresso=None, parar_callback=None, controlador=None, finalizar_em_paralelo=False, diario=None):
+    """
+    Processa as estações com várias páginas simultâneas consumindo um agendador compartilhado.
+    
+    Cada página roda em sua própria thread (a API síncrona do Playwright não pode ser
+    compartilhada entre threads) com navegador e pasta temporária próprios. Estações com
+    falha técnica voltam à fila com backoff até MAX_TENTATIVAS, e o disjuntor pausa
+    todas as páginas quando a taxa de falhas dispara. Com um ControladorConcorrencia,
+    num_paginas é o teto e o controlador decide quantas páginas trabalham por vez.
+    
+    Returns:
+        tuple: (baixadas, falharam, inexistentes, sem_dados)
+    """
+    num_paginas = max(1, min(num_paginas, len(estacoes)))
+    lote = criar_lote_agendado(estacoes, controlador, finalizar_em_paralelo, diario, navegadores=num_paginas)
+    pastas_paginas = []
+    
+    print(f"\n🚀 PROCESSAMENTO PARALELO - {len(estacoes)} ESTAÇÕES EM {num_paginas} PÁGINAS")
+    
+    def trabalhador(numero):
+        pasta_pagina = tempfile.mkdtemp(prefix=f"hidroweb_pagina{numero}_", dir=pasta_downloads_temp)
+        pastas_paginas.append(pasta_pagina)
+        try:
+            with sync_playwright() as p:
+                browser = abrir_navegador(p)
+                try:
+                    page = criar_pagina(browser)
+                    acessar_site(page)
+                    consumir_lote_na_pagina(
+                        page, lote, pasta_pagina, pasta_destino, callback_progresso, parar_callback,
+                        rotulo=f"[Página {numero}] "
+                    )
+                finally:
+                    browser.close()
+        except Exception as e:
+            print(f"❌ [Página {numero}] Encerrada por erro: {e}")
+    
+    threads = [Thread(target=trabalhador, args=(n,), daemon=True) for n in range(1, num_paginas + 1)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    
+    resultado = finalizar_lote(lote, parar_callback)
+    
+    # Só depois da finalização: promoções em segundo plano ainda podem ler dessas pastas
+    for pasta_pagina in pastas_paginas:
+        shutil.rmtree(pasta_pagina, ignore_errors=True)
+    
+    return resultado
+
+def baixar_estacoes_navegador(estacoes, callback_progresso=None, parar_callback=None, tipo_consulta="normal", num_paginas=1, reutilizar_sessao=False, pasta_staging=None, estacoes_frescas=None, controlador=None, finalizar_em_paralelo=False, diario=None):
+    """Motor síncrono de baixar_estacoes (página única, sessão persistente ou várias páginas)"""
+    pasta_destino = criar_pasta_base(tipo_consulta)
+    
+    # Staging exclusivo desta execução: nada a varrer ou limpar entre estações
+    pasta_temp = tempfile.mkdtemp(prefix="execucao_", dir=criar_pasta_staging(pasta_staging))
+    
+    print(f"📂 Destino: {pasta_destino}")
+    print(f"🎯 Total: {len(estacoes)} estações")
+    print(f"📋 Tipo de consulta: {tipo_consulta}")
+    if controlador:
+        print(f"🎚️ Concorrência adaptativa: até {num_paginas} páginas")
+    elif num_paginas > 1:
+        print(f"🧵 Páginas simultâneas: {num_paginas}")
+    
+    try:
+        if not estacoes:
+            estacoes_baixadas, estacoes_falharam, estacoes_inexistentes, estacoes_sem_dados = [], [], [], []
+        elif num_paginas > 1:
+            estacoes_baixadas, estacoes_falharam, estacoes_inexistentes, estacoes_sem_dados = processar_lote_paralelo(
+                estacoes, pasta_temp, pasta_destino, num_paginas, callback_progresso, parar_callback, controlador,
+                finalizar_em_paralelo, diario
+            )
+        elif reutilizar_sessao:
+            from logica.sessaoNavegador import obter_sessao
+            estacoes_baixadas, estacoes_falharam, estacoes_inexistentes, estacoes_sem_dados = obter_sessao().executar(
+                lambda page: processar_lote_com_fallback(
+                    page, estacoes, pasta_temp, pasta_destino, callback_progresso, parar_callback, finalizar_em_paralelo,
+                    diario
+                ),
+                num_estacoes=len(estacoes),
+                troca_pagina=True
+            )
+        else:
+            with sync_playwright() as p:
+                browser = abrir_navegador(p)
+                page = criar_pagina(browser)
+                acessar_site(page)
+                
+                resultados, page = processar_lote_com_fallback(
+                    page, estacoes, pasta_temp, pasta_destino, callback_progresso, parar_callback, finalizar_em_paralelo,
+                    diario
+                )
+                estacoes_baixadas, estacoes_falharam, estacoes_inexistentes, estacoes_sem_dados = resultados
+                
+                browser.close()
+    finally:
+        # Remove o staging da execução (inclui downloads incompletos ou rejeitados)
+        shutil.rmtree(pasta_temp, ignore_errors=True)
+        salvar_manifestos()
+    
+    resultado = montar_resultado_final(
+        estacoes, estacoes_baixadas, estacoes_falharam, estacoes_inexistentes, estacoes_sem_dados, pasta_destino,
+        estacoes_frescas
+    )
+    resumir_navegacao()
+    return resultado
+
+def resumir_navegacao():
+    """Fecha o relatório dos motores com navegador: seletores e cache de recursos desta execução"""
+    # Taxa de acerto dos seletores nesta execução (e grava o ranking para as próximas)
+    finalizar_registro_seletores()
+    resumo_cache_recursos()
+
+def baixar_estacoes(estacoes, callback_progresso=None, parar_callback=None, tipo_consulta="normal", num_paginas=1, motor="sincrono", reutilizar_sessao=False, pasta_staging=None, ttl_frescor_horas=None, concorrencia_adaptativa=False, finalizar_em_paralelo=False, registrar_diario=True, retomar_de=None, ao_concluir_estacao=None, ttl_negativo_horas=None, reverificar_negativos=False, ordem_estacoes=None):
     """
     Baixa estações com suporte a diferentes tipos de consulta.
     
     Args:
         estacoes: Lista de códigos das estações
         callback_progresso: Função de callback para progresso
-        parar_callback: Função de callback para parar
+        parar_callback: Função de callback para parar, ou um TokenCancelamento. As esperas do navegador
+            conferem a parada a cada FATIA_ESPERA_MS
         tipo_consulta: "normal" para pasta principal, "consultadas" para pasta consultadas
+        num_paginas: Número de páginas simultâneas (1 = processamento sequencial)
+        motor: "sincrono" (threads + sync_playwright), "assincrono" (asyncio + async_playwright)
+               ou "http" (requisição direta ao endpoint do CSV, sem navegador)
+               ou "processos" (fila SQLite compartilhada, num_paginas processos com navegador próprio;
+               outras máquinas podem ajudar rodando python -m logica.filaCompartilhada)
+        reutilizar_sessao: Usa a sessão persistente do navegador (mantida aberta entre execuções)
+        pasta_staging: Pasta onde os ZIPs são gravados antes de irem ao destino (ver criar_pasta_staging)
+        ttl_frescor_horas: Pula estações baixadas há menos de N horas (None = TTL_FRESCOR_HORAS, 0 = desativado).
+            As puladas voltam em 'ignoradas_frescas'
+        concorrencia_adaptativa: Ajusta o número de páginas/conexões durante o lote (AIMD).
+            num_paginas passa a ser o teto (CONCORRENCIA_MAX_PADRAO se for 1)
+        finalizar_em_paralelo: Verifica/move o ZIP anterior em segundo plano enquanto a página
+            já pesquisa o próximo código (motores com navegador)
+        registrar_diario: Grava o diário da execução (Scripts/dados/execucoes) para retomada após queda
+        retomar_de: Caminho do diário que este lote está retomando (ver diario.carregar_ultima_execucao_incompleta)
+        ao_concluir_estacao: Chamada com (codigo, resultado) assim que cada estação é resolvida - mesmos
+            resultados do diário, incluindo as frescas (ex.: PipelineCarga.ao_concluir_estacao). Ativa o diário
+        ttl_negativo_horas: Códigos que voltaram inexistentes/sem dados há menos de N horas não são consultados
+            (None = TTL_NEGATIVO_HORAS, 0 = desativado). Entram no resultado como 'inexistentes'/'sem_dados'
+            e também em 'ignoradas_cache_negativo'
+        reverificar_negativos: Consulta todos os códigos, mesmo os que estão no cache negativo
+        ordem_estacoes: "maiores_primeiro", "menores_primeiro" ou "original", pelo tamanho dos ZIPs já
+            baixados nas pastas normal e consultadas (None = ORDEM_ESTACOES)
     """
     pasta_destino = criar_pasta_base(tipo_consulta)
-    usuario = getpass.getuser()
-    pasta_temp = f"C:\\Users\\{usuario}\\Downloads"
+    # Um único token para todas as páginas/threads: a parada é vista em até FATIA_ESPERA_MS
+    parar_callback = obter_token(parar_callback)
     
-    print(f"📂 Destino: {pasta_destino}")
-    print(f"🎯 Total: {len(estacoes)} estações")
-    print(f"📋 Tipo de consulta: {tipo_consulta}")
+    diario = None
+    if registrar_diario or ao_concluir_estacao:
+        diario = DiarioExecucao.criar(estacoes, tipo_consulta, retomada_de=retomar_de)
+        if ao_concluir_estacao:
+            diario.adicionar_ouvinte(ao_concluir_estacao)
+    if retomar_de:
+        marcar_como_retomada(retomar_de)
     
-    # Limpeza inicial de arquivos temporários
-    limpar_downloads_temp_especificos(pasta_temp)
-    
-    with sync_playwright() as p:
-        browser = p.chromium.launch(
-            headless=True,
-            args=[
-                '--disable-blink-features=AutomationControlled',
-                '--disable-dev-shm-usage',
-                '--no-sandbox',
-                '--disable-gpu',
-                '--disable-extensions',
-                '--disable-plugins',
-                '--disable-background-networking',
-                '--disable-background-timer-throttling',
-                '--disable-renderer-backgrounding',
-                '--disable-backgrounding-occluded-windows',
-                '--disable-features=TranslateUI,VizDisplayCompositor',
-                '--disable-ipc-flooding-protection',
-                '--disable-logging',
-                '--disable-default-apps',
-                '--disable-component-extensions-with-background-pages',
-                '--fast-start',
-                '--aggressive-cache-discard',
-                '--memory-pressure-off',
-                '--max_old_space_size=4096'
-            ]
-        )
+    concluido = False
+    try:
+        # Política de frescor avaliada antes de abrir qualquer navegador
+        if ttl_frescor_horas is None:
+            ttl_frescor_horas = TTL_FRESCOR_HORAS
+        estacoes, estacoes_frescas = separar_estacoes_frescas(estacoes, pasta_destino, ttl_frescor_horas)
+        if estacoes_frescas:
+            print(f"🕒 {len(estacoes_frescas)} estações baixadas nas últimas {ttl_frescor_horas:g}h serão ignoradas")
+            if diario:
+                diario.registrar_varias(estacoes_frescas, "fresca")
         
-        context = browser.new_context(
-            accept_downloads=True,
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-            ignore_https_errors=True,
-            bypass_csp=True,
-            viewport={'width': 1280, 'height': 720}
-        )
+        # Códigos sabidamente inválidos não chegam ao navegador
+        cache_negativo = obter_cache_negativo()
+        if ttl_negativo_horas is None:
+            ttl_negativo_horas = TTL_NEGATIVO_HORAS
+        conhecidas_inexistentes, conhecidas_sem_dados = [], []
+        if not reverificar_negativos:
+            estacoes, conhecidas_inexistentes, conhecidas_sem_dados = cache_negativo.separar(estacoes, ttl_negativo_horas)
+            if conhecidas_inexistentes or conhecidas_sem_dados:
+                print(f"🚫 {len(conhecidas_inexistentes) + len(conhecidas_sem_dados)} códigos inexistentes/sem dados "
+                      f"verificados nas últimas {ttl_negativo_horas:g}h serão ignorados")
+                if diario:
+                    diario.registrar_varias(conhecidas_inexistentes, "inexistente")
+                    diario.registrar_varias(conhecidas_sem_dados, "sem_dados")
         
-        page = context.new_page()
+        # Retries continuam intercalados pelo agendador; só a ordem das estações novas muda
+        estacoes = ordenar_por_tamanho(
+            estacoes, [criar_pasta_base("normal"), criar_pasta_base("consultadas")], ordem_estacoes or ORDEM_ESTACOES
+        )
         
-        page.route("**/*.{png,jpg,jpeg,gif,svg,ico,woff,woff2,ttf,eot}", lambda route: route.abort())
-        page.route("**/*.css", lambda route: route.fulfill(status=200, body=""))
-        page.route("**/analytics/**", lambda route: route.abort())
-        page.route("**/gtag/**", lambda route: route.abort())
-        page.route("**/google-analytics.**", lambda route: route.abort())
+        controlador = None
+        if concorrencia_adaptativa:
+            if num_paginas <= 1:
+                num_paginas = CONCORRENCIA_MAX_PADRAO
+            controlador = ControladorConcorrencia(maximo=num_paginas)
         
-        print("🌐 Acessando site...")
-        try:
-            page.goto("https://www.snirh.gov.br/hidroweb/serieshistoricas", 
-                     timeout=6000, wait_until='domcontentloaded')
-        except:
-            page.goto("https://www.snirh.gov.br/hidroweb/serieshistoricas", 
-                     timeout=12000, wait_until='networkidle')
+        iniciar_rastro(tipo_consulta)
         
-        time.sleep(0.2)
+        if motor == "assincrono":
+            from logica.playAsync import baixar_estacoes_assincrono
+            resultado = baixar_estacoes_assincrono(
+                estacoes, callback_progresso, parar_callback, tipo_consulta, concorrencia=num_paginas,
+                pasta_staging=pasta_staging, estacoes_frescas=estacoes_frescas, controlador=controlador,
+                finalizar_em_paralelo=finalizar_em_paralelo, diario=diario
+            )
+        elif motor == "http":
+            from logica.downloadHttp import baixar_estacoes_http
+            resultado = baixar_estacoes_http(
+                estacoes, callback_progresso, parar_callback, tipo_consulta, num_conexoes=num_paginas,
+                pasta_staging=pasta_staging, estacoes_frescas=estacoes_frescas, controlador=controlador,
+                diario=diario
+            )
+        elif motor == "processos":
+            from logica.filaCompartilhada import coordenar_lote
+            resultado = coordenar_lote(
+                estacoes, callback_progresso, parar_callback, tipo_consulta, num_processos=num_paginas,
+                estacoes_frescas=estacoes_frescas, diario=diario
+            )
+        else:
+            resultado = baixar_estacoes_navegador(
+                estacoes, callback_progresso, parar_callback, tipo_consulta, num_paginas, reutilizar_sessao,
+                pasta_staging, estacoes_frescas, controlador, finalizar_em_paralelo, diario
+            )
         
-        estacoes_baixadas, estacoes_falharam, estacoes_inexistentes, estacoes_sem_dados = processar_lote_com_fallback(
-            page, estacoes, pasta_temp, pasta_destino, callback_progresso, parar_callback
-        )
+        # Interrompido pelo usuário: o diário continua disponível para retomada
+        concluido = not (parar_callback and parar_callback())
         
-        browser.close()
-    
-    # Limpeza final de arquivos temporários
-    limpar_downloads_temp_especificos(pasta_temp)
-    
-    total_solicitadas = len(estacoes)
-    total_baixadas = len(estacoes_baixadas)
-    total_falharam = len(estacoes_falharam) 
-    total_inexistentes = len(estacoes_inexistentes)
-    total_sem_dados = len(estacoes_sem_dados)
-    
-    print(f"\n📊 RESULTADO FINAL")
-    print(f"   📥 Baixadas: {total_baixadas}/{total_solicitadas}")
-    print(f"   📁 Local: {pasta_destino}")
-    
-    if total_baixadas > 0:
-        taxa_sucesso = (total_baixadas/total_solicitadas*100)
-        print(f"   📈 Taxa: {taxa_sucesso:.1f}%")
-    
-    # Relatório detalhado dos problemas
-    if estacoes_falharam:
-        print(f"   ❌ Falharam após 3 tentativas: {', '.join(estacoes_falharam)}")
-        print(f"      💡 Possíveis problemas técnicos ou de conectividade")
-    
-    if estacoes_inexistentes:
-        print(f"   🚫 Estações inexistentes: {', '.join(estacoes_inexistentes)}")
-        print(f"      💡 Códigos não encontrados no sistema ou sem botão de download")
-    
-    if estacoes_sem_dados:
-        print(f"   📋 Sem dados para download: {', '.join(estacoes_sem_dados)}")
-        print(f"      💡 Estações existem mas não possuem dados CSV disponíveis")
-    
-    if not estacoes_falharam and not estacoes_inexistentes and not estacoes_sem_dados:
-        print(f"   🎉 TODAS PROCESSADAS COM SUCESSO!")
-    
-    return {
-        'sucesso': total_baixadas == total_solicitadas,
-        'baixadas': estacoes_baixadas,
-        'falharam': estacoes_falharam,
-        'inexistentes': estacoes_inexistentes,
-        'sem_dados': estacoes_sem_dados,
-        'pasta_destino': pasta_destino
-    }
\ No newline at end of file
+        cache_negativo.atualizar(resultado)
+        resultado['inexistentes'] = resultado['inexistentes'] + conhecidas_inexistentes
+        resultado['sem_dados'] = resultado['sem_dados'] + conhecidas_sem_dados
+        resultado['ignoradas_cache_negativo'] = conhecidas_inexistentes + conhecidas_sem_dados
+        return resultado
+    finally:
+        finalizar_rastro()
+        if diario:
+            diario.finalizar(concluido)
+
+def retomar_ultima_execucao(callback_progresso=None, parar_callback=None, **opcoes):
+    """
+    Retoma o último lote interrompido com as estações pendentes ou que falharam.
+    Retorna o resultado de baixar_estacoes, ou None se não houver o que retomar.
+    """
+    info = carregar_ultima_execucao_incompleta()
+    if info is None:
+        print("ℹ️ Nenhuma execução interrompida para retomar")
+        return None
+    
+    print(f"⏯️ Retomando execução de {info.get('em')}: {len(info['pendentes'])} de {len(info['estacoes'])} estações pendentes")
+    return baixar_estacoes(
+        info['pendentes'], callback_progresso, parar_callback, tipo_consulta=info['tipo_consulta'],
+        retomar_de=info['caminho'], **opcoes
+    )
@@ -0,0 +1,433 @@
+# scripts/logica/playAsync.py - MOTOR ASSÍNCRONO DE DOWNLOAD (playwright.async_api)
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeoutError
+import asyncio
+import os
+import re
+import shutil
+import tempfile
+import time
+
+from logica.agendador import DisjuntorFalhas, calcular_backoff
+from logica.cacheRecursos import CACHE_NAVEGADOR, instalar_cache_recursos_async
+from logica.consumo import criar_pasta_base, criar_pasta_staging
+from logica.manifesto import salvar_manifestos
+from logica.memoriaNavegador import OrcamentoMemoria
+from logica.seletores import localizar_elemento_async
+from logica.buscaEstacao import eh_resposta_da_busca, classificar_dados_busca
+from logica.loteEstacoes import (
+    MAX_TENTATIVAS, INEXISTENTE_NAO_CONFIRMADA, SEM_DADOS_NAO_CONFIRMADA, extrair_codigo_do_arquivo, resumir_latencias,
+    finalizar_download, montar_resultado_final, anotar_negativo_nao_confirmado
+)
+from logica.play import (
+    URL_SERIES_HISTORICAS, ARGS_NAVEGADOR, OPCOES_CONTEXTO,
+    SELETORES_CELULA_ESTACAO, SELETORES_BOTAO_CSV, SELETOR_CELULA_ESTACAO_CSS, TIMEOUT_RESPOSTA_BUSCA_MS,
+    resumir_navegacao
+)
+
+# Intervalo de verificação do parar_callback
+INTERVALO_VERIFICACAO_PARADA = 0.05
+
+async def criar_pagina_async(browser):
+    """Cria um contexto isolado e uma página com bloqueio de recursos pesados"""
+    context = await browser.new_context(**OPCOES_CONTEXTO)
+    page = await context.new_page()
+
+    await page.route("**/*.{png,jpg,jpeg,gif,svg,ico,woff,woff2,ttf,eot}", lambda route: route.abort())
+    await page.route("**/*.css", lambda route: route.fulfill(status=200, body=""))
+    await page.route("**/analytics/**", lambda route: route.abort())
+    await page.route("**/gtag/**", lambda route: route.abort())
+    await page.route("**/google-analytics.**", lambda route: route.abort())
+
+    if CACHE_NAVEGADOR:
+        await instalar_cache_recursos_async(page, URL_SERIES_HISTORICAS)
+
+    return page
+
+async def acessar_site_async(page):
+    """Abre a página de séries históricas do Hidroweb"""
+    try:
+        await page.goto(URL_SERIES_HISTORICAS, timeout=6000, wait_until='domcontentloaded')
+    except Exception:
+        await page.goto(URL_SERIES_HISTORICAS, timeout=12000, wait_until='networkidle')
+    await page.locator('#mat-input-0').first.wait_for(timeout=5000)
+
+async def reciclar_pagina_async(page):
+    """Versão assíncrona de play.reciclar_pagina"""
+    browser = page.context.browser
+    try:
+        await page.context.close()
+    except Exception:
+        pass
+    nova_pagina = await criar_pagina_async(browser)
+    await acessar_site_async(nova_pagina)
+    return nova_pagina
+
+async def buscar_codigo_async(page, codigo, timeout=TIMEOUT_RESPOSTA_BUSCA_MS):
+    """Preenche o campo de busca, dispara a pesquisa e aguarda a resposta da API (ou None)"""
+    campo = page.locator('#mat-input-0').first
+    await campo.wait_for(timeout=1500)
+    
+    try:
+        # fill dentro do expect_response: uma busca disparada pela digitação também é capturada
+        async with page.expect_response(lambda r: eh_resposta_da_busca(r, codigo), timeout=timeout) as resposta_info:
+            await campo.fill(codigo)
+            await campo.press("Enter")
+        return await resposta_info.value
+    except PlaywrightTimeoutError:
+        return None
+
+async def interpretar_resposta_busca_async(resposta, codigo):
+    """Versão assíncrona de buscaEstacao.interpretar_resposta_busca"""
+    if resposta is None:
+        return None
+    if resposta.status == 404:
+        return "inexistente"
+    if not resposta.ok:
+        return None
+
+    try:
+        dados = await resposta.json()
+    except Exception:
+        return None
+    return classificar_dados_busca(dados, codigo)
+
+async def aguardar_linha_da_estacao_async(page, codigo, timeout=3000):
+    """Aguarda a tabela exibir a célula com o código pesquisado. Retorna True se apareceu."""
+    celula = page.locator(SELETOR_CELULA_ESTACAO_CSS).filter(
+        has_text=re.compile(rf"^\s*{re.escape(codigo)}\s*$")
+    ).first
+    try:
+        await celula.wait_for(timeout=timeout, state='visible')
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+async def validar_estacao_carregada_async(page, codigo_esperado, max_tentativas=2):
+    """
+    Confere se a estação exibida na tabela é a esperada, corrigindo a busca se necessário.
+    Retorna True se a estação correta foi carregada.
+    """
+    for tentativa in range(max_tentativas):
+        celula = await localizar_elemento_async(page, 'celula_estacao', SELETORES_CELULA_ESTACAO, timeout=2000)
+        if celula is None:
+            continue
+
+        codigo_carregado = (await celula.text_content() or "").strip()
+        if codigo_carregado == codigo_esperado:
+            return True
+
+        print(f"    ❌ Estação incorreta ({codigo_carregado})! Corrigindo para {codigo_esperado}...")
+        await buscar_codigo_async(page, codigo_esperado)
+        await aguardar_linha_da_estacao_async(page, codigo_esperado, timeout=1500)
+
+    return False
+
+async def processar_estacao_async(page, codigo, pasta_downloads_temp, pasta_destino, tentativa=1, finalizar_em_paralelo=False, finalizacoes=None):
+    """
+    Versão assíncrona de processar_estacao_rapida.
+    Retorna True, "estacao_inexistente", "estacao_sem_dados" ou False (falha técnica). Com finalizar_em_paralelo,
+    retorna um Future com a verificação/promoção do ZIP para que a página seja liberada antes.
+    As promoções em andamento ficam no conjunto finalizacoes: a thread continua mesmo
+    se a tarefa da estação for cancelada, e o lote espera por elas antes de limpar as pastas.
+    """
+    tentativa_text = f" (Retry {tentativa})" if tentativa > 1 else ""
+    print(f"🚀 {codigo}{tentativa_text}")
+
+    try:
+        resposta = await buscar_codigo_async(page, codigo)
+        situacao = await interpretar_resposta_busca_async(resposta, codigo)
+
+        if situacao == "inexistente":
+            print(f"    ❌ Estação {codigo} não encontrada na busca - não existe")
+            return "estacao_inexistente"
+
+        if situacao == "sem_dados":
+            print(f"    📋 Estação {codigo} sem dados (informado pela busca)")
+            return "estacao_sem_dados"
+
+        if situacao == "encontrada":
+            if not await aguardar_linha_da_estacao_async(page, codigo, timeout=3000):
+                print(f"    ⚠️ {codigo} confirmada pela API, mas a tabela não renderizou")
+                return False
+
+        elif not await aguardar_linha_da_estacao_async(page, codigo, timeout=1500 if resposta is not None else 3000):
+            # Negativos do DOM não têm confirmação da API: entram no resultado, não no cache negativo
+            if not await page.locator('table.mat-table').first.is_visible():
+                print(f"    ❌ Estação {codigo} não encontrada - não existe ou não possui dados")
+                return INEXISTENTE_NAO_CONFIRMADA
+
+            if not await validar_estacao_carregada_async(page, codigo):
+                print(f"    ❌ Não foi possível carregar a estação {codigo} corretamente")
+                return INEXISTENTE_NAO_CONFIRMADA
+
+        botao_download = await localizar_elemento_async(page, 'botao_csv', SELETORES_BOTAO_CSV, timeout=1000)
+        if botao_download is None:
+            print(f"    ❌ Estação {codigo} não possui dados para download - botão CSV não encontrado")
+            return SEM_DADOS_NAO_CONFIRMADA if situacao == "encontrada" else INEXISTENTE_NAO_CONFIRMADA
+
+        if not await botao_download.is_enabled():
+            print(f"    📋 Estação {codigo} sem dados - botão CSV desabilitado")
+            return SEM_DADOS_NAO_CONFIRMADA
+
+        async with page.expect_download(timeout=8000) as download_info:
+            await botao_download.click()
+
+        download = await download_info.value
+        nome_arquivo = download.suggested_filename
+
+        codigo_arquivo = extrair_codigo_do_arquivo(nome_arquivo)
+        if codigo_arquivo != codigo:
+            print(f"    ⚠️ Download incorreto: esperado {codigo}, obtido {codigo_arquivo}")
+            return False
+
+        # failure() só resolve quando o download termina
+        falha = await download.failure()
+        if falha:
+            print(f"    ❌ Download falhou: {falha}")
+            return False
+
+        caminho_temp = os.path.join(pasta_downloads_temp, nome_arquivo)
+        await download.save_as(caminho_temp)
+        print(f"    💾 {nome_arquivo}")
+
+        # Operações de disco fora do loop de eventos
+        finalizacao = asyncio.get_running_loop().run_in_executor(None, finalizar_download, caminho_temp, pasta_destino, codigo)
+        if finalizacoes is not None:
+            finalizacoes.add(finalizacao)
+            finalizacao.add_done_callback(finalizacoes.discard)
+        if finalizar_em_paralelo:
+            return asyncio.shield(finalizacao)
+        return await asyncio.shield(finalizacao)
+
+    except asyncio.CancelledError:
+        raise
+    except Exception as e:
+        print(f"    ❌ Erro em {codigo}: {str(e)}")
+        return False
+
+async def processar_lote_async(browser, estacoes, pasta_downloads_temp, pasta_destino, concorrencia, callback_progresso=None, parar_callback=None, controlador=None, finalizar_em_paralelo=False, diario=None):
+    """
+    Processa as estações como corrotinas independentes.
+
+    Um semáforo limita quantas estações estão em andamento; cada uma pega uma página
+    livre do pool. Esperas são awaitables, então nenhuma thread fica bloqueada.
+    Com um ControladorConcorrencia, concorrencia é o tamanho do pool e o controlador
+    decide quantas páginas trabalham por vez. Com finalizar_em_paralelo a página volta
+    ao pool assim que o ZIP é salvo, antes da verificação/promoção.
+
+    Returns:
+        tuple: (baixadas, falharam, inexistentes, sem_dados)
+    """
+    total_estacoes = len(estacoes)
+    concorrencia = max(1, min(concorrencia, total_estacoes))
+    resultados = {'baixadas': [], 'falharam': [], 'inexistentes': [], 'sem_dados': []}
+    estado = {'iniciadas': 0}
+    latencias = []
+
+    print(f"\n🚀 PROCESSAMENTO ASSÍNCRONO - {total_estacoes} ESTAÇÕES, CONCORRÊNCIA {concorrencia}")
+
+    semaforo = asyncio.Semaphore(concorrencia)
+    disjuntor = DisjuntorFalhas()
+    orcamento = OrcamentoMemoria()
+    paginas_livres = asyncio.Queue()
+    paginas = []
+    usos_por_pagina = {}
+    finalizacoes = set()
+
+    for numero in range(1, concorrencia + 1):
+        page = await criar_pagina_async(browser)
+        pasta_pagina = tempfile.mkdtemp(prefix=f"hidroweb_async{numero}_", dir=pasta_downloads_temp)
+        paginas.append((page, pasta_pagina))
+        paginas_livres.put_nowait((page, pasta_pagina))
+
+    await asyncio.gather(*(acessar_site_async(page) for page, _ in paginas))
+
+    async def obter_pagina():
+        # Páginas do pool também envelhecem: recicla antes de entregar, se o orçamento pedir
+        page, pasta_pagina = await paginas_livres.get()
+        motivo = orcamento.motivo_reciclagem(usos_por_pagina.get(pasta_pagina, 0))
+        if motivo:
+            orcamento.registrar_reciclagem(motivo)
+            try:
+                page = await reciclar_pagina_async(page)
+                usos_por_pagina[pasta_pagina] = 0
+            except asyncio.CancelledError:
+                # Parada no meio da reciclagem: a página volta ao pool em vez de se perder
+                paginas_livres.put_nowait((page, pasta_pagina))
+                raise
+            except Exception as e:
+                # A estação falha tecnicamente nesta página e volta com retry; a reciclagem é tentada de novo
+                print(f"    ❌ Falha ao reciclar a página: {e}")
+        usos_por_pagina[pasta_pagina] = usos_por_pagina.get(pasta_pagina, 0) + 1
+        return page, pasta_pagina
+
+    def registrar_no_diario(codigo, situacao, tentativa):
+        if diario:
+            diario.registrar(codigo, situacao, tentativa)
+
+    async def ocupar_vaga():
+        if controlador is None:
+            await semaforo.acquire()
+            return
+        while not controlador.tentar_adquirir():
+            await asyncio.sleep(INTERVALO_VERIFICACAO_PARADA)
+
+    async def processar_com_retry(codigo):
+        for tentativa in range(1, MAX_TENTATIVAS + 1):
+            # Disjuntor aberto: ninguém ocupa página até a pausa acabar
+            while disjuntor.tempo_restante() > 0:
+                await asyncio.sleep(min(INTERVALO_VERIFICACAO_PARADA, disjuntor.tempo_restante()))
+
+            await ocupar_vaga()
+            resultado = False
+            cancelada = False
+            inicio = time.perf_counter()
+            page = None
+            try:
+                page, pasta_pagina = await obter_pagina()
+                if tentativa == 1:
+                    estado['iniciadas'] += 1
+                    if callback_progresso:
+                        callback_progresso(estado['iniciadas'], total_estacoes, f"Baixando {codigo}")
+
+                resultado = await processar_estacao_async(
+                    page, codigo, pasta_pagina, pasta_destino, tentativa, finalizar_em_paralelo, finalizacoes
+                )
+            except asyncio.CancelledError:
+                cancelada = True
+                raise
+            finally:
+                latencia = time.perf_counter() - inicio
+                if page is not None:
+                    paginas_livres.put_nowait((page, pasta_pagina))
+                if controlador is None:
+                    semaforo.release()
+                elif cancelada:
+                    # Cancelamento não é resposta do servidor: a vaga volta sem mexer na janela AIMD
+                    controlador.devolver()
+                else:
+                    controlador.liberar(latencia, resultado)
+                if not cancelada:
+                    latencias.append(latencia)
+
+            if isinstance(resultado, asyncio.Future):
+                # A página já voltou ao pool; aguarda só a promoção do ZIP
+                try:
+                    resultado = await resultado
+                except Exception as e:
+                    print(f"    ❌ Erro ao finalizar {codigo}: {e}")
+                    resultado = False
+
+            disjuntor.registrar(resultado is not False)
+
+            if resultado == True:
+                resultados['baixadas'].append(codigo)
+                registrar_no_diario(codigo, "baixada", tentativa)
+                return
+            if resultado == "estacao_inexistente":
+                resultados['inexistentes'].append(codigo)
+                anotar_negativo_nao_confirmado(codigo, resultado)
+                registrar_no_diario(codigo, "inexistente", tentativa)
+                return
+            if resultado == "estacao_sem_dados":
+                resultados['sem_dados'].append(codigo)
+                anotar_negativo_nao_confirmado(codigo, resultado)
+                registrar_no_diario(codigo, "sem_dados", tentativa)
+                return
+
+            # Backoff sem segurar a página: outras estações usam o slot enquanto isso
+            if tentativa < MAX_TENTATIVAS:
+                await asyncio.sleep(calcular_backoff(tentativa))
+
+        resultados['falharam'].append(codigo)
+        registrar_no_diario(codigo, "falhou", MAX_TENTATIVAS)
+
+    tarefas = [asyncio.create_task(processar_com_retry(codigo)) for codigo in estacoes]
+
+    async def vigiar_parada():
+        while parar_callback is not None:
+            if parar_callback():
+                print("⏹️ Interrompido")
+                for tarefa in tarefas:
+                    tarefa.cancel()
+                return
+            await asyncio.sleep(INTERVALO_VERIFICACAO_PARADA)
+
+    vigia = asyncio.create_task(vigiar_parada())
+    try:
+        await asyncio.gather(*tarefas, return_exceptions=True)
+    finally:
+        vigia.cancel()
+        # Promoções canceladas no meio ainda rodam em threads: esperar antes de apagar o staging
+        if finalizacoes:
+            await asyncio.gather(*list(finalizacoes), return_exceptions=True)
+        for _, pasta_pagina in paginas:
+            shutil.rmtree(pasta_pagina, ignore_errors=True)
+
+    # Estações canceladas pela parada contam como falha no relatório (como no drenar do motor síncrono),
+    # mas não vão para o diário: continuam pendentes para a retomada
+    resolvidas = {codigo for lista in resultados.values() for codigo in lista}
+    for codigo in estacoes:
+        if codigo not in resolvidas:
+            resultados['falharam'].append(codigo)
+            resolvidas.add(codigo)
+
+    resumir_latencias(latencias)
+    if controlador:
+        controlador.resumo()
+    orcamento.resumo()
+    return resultados['baixadas'], resultados['falharam'], resultados['inexistentes'], resultados['sem_dados']
+
+async def baixar_estacoes_async(estacoes, callback_progresso=None, parar_callback=None, tipo_consulta="normal", concorrencia=4, pasta_staging=None, estacoes_frescas=None, controlador=None, finalizar_em_paralelo=False, diario=None):
+    """
+    Equivalente assíncrono de play.baixar_estacoes.
+
+    Args:
+        estacoes: Lista de códigos das estações
+        callback_progresso: Função de callback para progresso
+        parar_callback: Função de callback para parar (verificada a cada 50 ms)
+        tipo_consulta: "normal" para pasta principal, "consultadas" para pasta consultadas
+        concorrencia: Número máximo de estações em andamento ao mesmo tempo
+        pasta_staging: Pasta onde os ZIPs são gravados antes de irem ao destino
+        estacoes_frescas: Estações já filtradas pela política de frescor (só entram no relatório)
+        controlador: ControladorConcorrencia opcional (concorrencia passa a ser o teto)
+        finalizar_em_paralelo: Libera a página antes de verificar/mover o ZIP
+        diario: DiarioExecucao onde cada estação resolvida é registrada
+    """
+    pasta_destino = criar_pasta_base(tipo_consulta)
+    pasta_temp = tempfile.mkdtemp(prefix="execucao_", dir=criar_pasta_staging(pasta_staging))
+
+    print(f"📂 Destino: {pasta_destino}")
+    print(f"🎯 Total: {len(estacoes)} estações")
+    print(f"📋 Tipo de consulta: {tipo_consulta}")
+
+    try:
+        if estacoes:
+            async with async_playwright() as p:
+                browser = await p.chromium.launch(headless=True, args=ARGS_NAVEGADOR)
+                try:
+                    estacoes_baixadas, estacoes_falharam, estacoes_inexistentes, estacoes_sem_dados = await processar_lote_async(
+                        browser, estacoes, pasta_temp, pasta_destino, concorrencia, callback_progresso, parar_callback,
+                        controlador, finalizar_em_paralelo, diario
+                    )
+                finally:
+                    await browser.close()
+        else:
+            estacoes_baixadas, estacoes_falharam, estacoes_inexistentes, estacoes_sem_dados = [], [], [], []
+    finally:
+        shutil.rmtree(pasta_temp, ignore_errors=True)
+        salvar_manifestos()
+
+    resultado = montar_resultado_final(
+        estacoes, estacoes_baixadas, estacoes_falharam, estacoes_inexistentes, estacoes_sem_dados, pasta_destino,
+        estacoes_frescas
+    )
+    resumir_navegacao()
+    return resultado
+
+def baixar_estacoes_assincrono(estacoes, callback_progresso=None, parar_callback=None, tipo_consulta="normal", concorrencia=4, pasta_staging=None, estacoes_frescas=None, controlador=None, finalizar_em_paralelo=False, diario=None):
+    """Executa baixar_estacoes_async em um loop de eventos próprio (uso a partir de threads da interface)"""
+    return asyncio.run(baixar_estacoes_async(
+        estacoes, callback_progresso, parar_callback, tipo_consulta, concorrencia, pasta_staging, estacoes_frescas,
+        controlador, finalizar_em_paralelo, diario
+    ))
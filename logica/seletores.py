@@ -0,0 +1,166 @@
+# scripts/logica/seletores.py - REGISTRO DE SELETORES (RANKING DAS VARIANTES QUE FUNCIONAM)
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from logica.cancelamento import OperacaoCancelada, aguardar_locator
+from logica.consumo import criar_pasta_base
+
+NOME_REGISTRO = "seletores.json"
+
+# Intervalo mínimo entre gravações automáticas do registro (segundos)
+INTERVALO_GRAVACAO = 5.0
+
+class RegistroSeletores:
+    """
+    Guarda quantas vezes cada variante de seletor encontrou (ou não) o elemento,
+    por grupo ('botao_csv', 'celula_estacao'...). A variante que mais acerta é
+    tentada primeiro nas próximas estações e o ranking persiste entre execuções.
+    """
+
+    def __init__(self, caminho=None):
+        if caminho is None:
+            caminho = Path(criar_pasta_base()) / "Scripts" / "dados" / NOME_REGISTRO
+        self.caminho = Path(caminho)
+        self._trava = threading.Lock()
+        self._grupos = {}
+        self._execucao = {}
+        self._alterado = False
+        self._ultima_gravacao = 0.0
+        self.carregar()
+
+    def carregar(self):
+        with self._trava:
+            try:
+                with open(self.caminho, 'r', encoding='utf-8') as f:
+                    self._grupos = json.load(f)
+            except FileNotFoundError:
+                self._grupos = {}
+            except Exception as e:
+                print(f"⚠️ Registro de seletores inválido, recriando: {e}")
+                self._grupos = {}
+
+    def salvar(self, forcar=True):
+        """Grava o registro de forma atômica (arquivo temporário + rename)"""
+        with self._trava:
+            if not self._alterado:
+                return
+            if not forcar and time.time() - self._ultima_gravacao < INTERVALO_GRAVACAO:
+                return
+
+            self.caminho.parent.mkdir(parents=True, exist_ok=True)
+            temporario = str(self.caminho) + ".tmp"
+            with open(temporario, 'w', encoding='utf-8') as f:
+                json.dump(self._grupos, f, ensure_ascii=False, indent=1)
+            os.replace(temporario, self.caminho)
+
+            self._alterado = False
+            self._ultima_gravacao = time.time()
+
+    def ordenar(self, grupo, seletores):
+        """Retorna os seletores do mais acertado para o menos (empates mantêm a ordem original)"""
+        with self._trava:
+            estatisticas = self._grupos.get(grupo, {})
+            return sorted(
+                seletores,
+                key=lambda seletor: -estatisticas.get(seletor, {}).get('acertos', 0)
+            )
+
+    def registrar(self, grupo, seletor, acertou):
+        chave = 'acertos' if acertou else 'erros'
+        with self._trava:
+            for contadores in (self._grupos, self._execucao):
+                entrada = contadores.setdefault(grupo, {}).setdefault(seletor, {'acertos': 0, 'erros': 0})
+                entrada[chave] += 1
+            self._alterado = True
+        self.salvar(forcar=False)
+
+    def relatorio(self):
+        """Imprime a taxa de acerto de cada seletor usado desde o último relatório"""
+        with self._trava:
+            execucao = self._execucao
+            self._execucao = {}
+
+        if not execucao:
+            return
+
+        print(f"   🎯 Seletores:")
+        for grupo, seletores in execucao.items():
+            for seletor, contadores in sorted(seletores.items(), key=lambda item: -item[1]['acertos']):
+                tentativas = contadores['acertos'] + contadores['erros']
+                taxa = contadores['acertos'] / tentativas * 100
+                resumo = seletor if len(seletor) <= 50 else seletor[:47] + "..."
+                print(f"      {grupo}: {resumo} - {taxa:.0f}% ({contadores['acertos']}/{tentativas})")
+
+def localizar_elemento(page, grupo, seletores, timeout=1500, token=None):
+    """
+    Retorna o primeiro locator visível entre os seletores, ou None.
+
+    Só a variante mais bem ranqueada espera o timeout; as demais são conferidas na
+    hora, pois a página já teve tempo de renderizar durante a primeira espera.
+    Com um token de cancelamento a espera é fatiada (ver logica.cancelamento).
+    """
+    registro = obter_registro()
+    for posicao, seletor in enumerate(registro.ordenar(grupo, seletores)):
+        elemento = page.locator(seletor).first
+        try:
+            if posicao == 0:
+                encontrado = aguardar_locator(elemento, timeout, token)
+            else:
+                encontrado = elemento.is_visible()
+        except OperacaoCancelada:
+            raise
+        except Exception:
+            encontrado = False
+
+        registro.registrar(grupo, seletor, encontrado)
+        if encontrado:
+            return elemento
+
+    return None
+
+async def localizar_elemento_async(page, grupo, seletores, timeout=1500):
+    """Versão assíncrona de localizar_elemento"""
+    registro = obter_registro()
+    for posicao, seletor in enumerate(registro.ordenar(grupo, seletores)):
+        elemento = page.locator(seletor).first
+        try:
+            if posicao == 0:
+                await elemento.wait_for(timeout=timeout, state='visible')
+                encontrado = True
+            else:
+                encontrado = await elemento.is_visible()
+        except Exception:
+            encontrado = False
+
+        registro.registrar(grupo, seletor, encontrado)
+        if encontrado:
+            return elemento
+
+    return None
+
+# Registro compartilhado por todas as páginas/threads
+_registro = None
+_trava_registro = threading.Lock()
+
+def obter_registro():
+    """Retorna o registro global, carregando-o na primeira chamada"""
+    global _registro
+    with _trava_registro:
+        if _registro is None:
+            _registro = RegistroSeletores()
+        return _registro
+
+def finalizar_registro_seletores():
+    """Grava o ranking e imprime as taxas de acerto da execução (se o registro foi usado)"""
+    with _trava_registro:
+        registro = _registro
+    if registro is None:
+        return
+    try:
+        registro.salvar()
+    except Exception as e:
+        print(f"⚠️ Erro ao salvar registro de seletores: {e}")
+    registro.relatorio()
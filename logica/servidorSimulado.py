@@ -0,0 +1,320 @@
+# scripts/logica/servidorSimulado.py - HIDROWEB SIMULADO PARA TESTES DE CARGA OFFLINE
+import argparse
+import hashlib
+import io
+import json
+import random
+import threading
+import time
+import zipfile
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from logica.manifesto import LINHAS_METADADOS_COTAS
+
+CAMINHO_PAGINA = "/hidroweb/serieshistoricas"
+CAMINHO_BUSCA = "/hidroweb/rest/api/estacoes"
+CAMINHO_DOWNLOAD = "/hidroweb/rest/api/documento/convencionais"
+CAMINHO_BUNDLE = "/hidroweb/main.5f3c1a.js"
+# Listas fixas que a página carrega ao abrir (filtros de entidade/bacia no site real)
+CAMINHO_METADADOS = "/hidroweb/rest/api/entidades"
+
+COLUNAS_COTAS = (
+    ['EstacaoCodigo', 'NivelConsistencia', 'Data', 'hora', 'TipoMedicaoCotas', 'Maxima', 'Minima', 'Media']
+    + [f'Cota{dia:02d}' for dia in range(1, 32)]
+    + ['MaximaStatus', 'MinimaStatus', 'MediaStatus']
+    + [f'Cota{dia:02d}Status' for dia in range(1, 32)]
+)
+
+# Mesma estrutura de seletores da página real: campo de busca, tabela, célula do código e botão CSV
+PAGINA_SERIES_HISTORICAS = """<!DOCTYPE html>
+<html>
+<head><meta charset="utf-8"><title>Séries Históricas (simulado)</title></head>
+<body>
+<input id="mat-input-0" placeholder="Código da estação">
+<div id="mat-tab-content-0-0">
+  <table class="mat-table">
+    <thead><tr><th>Código</th><th>CSV</th></tr></thead>
+    <tbody></tbody>
+  </table>
+</div>
+<script src="__BUNDLE__"></script>
+</body>
+</html>
+"""
+
+# Código da página; o bundle real do Angular tem alguns MB, simulados com um comentário de preenchimento
+SCRIPT_PAGINA = """
+const campo = document.getElementById('mat-input-0');
+const corpo = document.querySelector('table.mat-table tbody');
+fetch('__METADADOS__');
+
+function baixar(codigo) {
+  const link = document.createElement('a');
+  link.href = '__DOWNLOAD__?tipo=3&documentos=' + encodeURIComponent(codigo);
+  link.download = '';
+  document.body.appendChild(link);
+  link.click();
+  link.remove();
+}
+
+campo.addEventListener('keydown', async (evento) => {
+  if (evento.key !== 'Enter') return;
+  const codigo = campo.value.trim();
+  corpo.innerHTML = '';
+  const resposta = await fetch('__BUSCA__?codigo=' + encodeURIComponent(codigo));
+  if (!resposta.ok) return;
+  const dados = await resposta.json();
+  for (const estacao of dados.content) {
+    const linha = document.createElement('tr');
+    linha.className = 'mat-row';
+    linha.innerHTML = '<td class="mat-cell mat-column-id"><a></a></td>'
+      + '<td class="mat-cell mat-column-csv"><button title="CSV">CSV</button></td>';
+    linha.querySelector('a').textContent = estacao.codigoestacao;
+    const botao = linha.querySelector('button');
+    botao.disabled = !estacao.possuiDados;
+    botao.addEventListener('click', () => baixar(estacao.codigoestacao));
+    corpo.appendChild(linha);
+  }
+});
+""".replace('__BUSCA__', CAMINHO_BUSCA).replace('__DOWNLOAD__', CAMINHO_DOWNLOAD).replace('__METADADOS__', CAMINHO_METADADOS)
+
+PAGINA_SERIES_HISTORICAS = PAGINA_SERIES_HISTORICAS.replace('__BUNDLE__', CAMINHO_BUNDLE)
+
+def fracao_do_codigo(codigo):
+    """Número em [0, 1) fixo para cada código: a mesma estação é sempre inexistente/sem dados"""
+    return int(hashlib.sha256(codigo.encode()).hexdigest()[:8], 16) / 0x100000000
+
+def gerar_cotas_csv(codigo, tamanho_kb):
+    """*_Cotas.csv sintético no formato do Hidroweb (metadados + ';'), com cerca de tamanho_kb"""
+    gerador = random.Random(codigo)
+    linhas = [f"// Estação {codigo} - arquivo gerado pelo Hidroweb simulado"] * LINHAS_METADADOS_COTAS
+    linhas.append(';'.join(COLUNAS_COTAS))
+
+    tamanho = sum(len(linha) + 1 for linha in linhas)
+    mes = 0
+    while tamanho < tamanho_kb * 1024:
+        # Meses a partir de 1900; acima de 200 anos o nível de consistência muda para não repetir a chave
+        ano, nivel = 1900 + (mes // 12) % 200, 1 + (mes // 2400) % 2
+        cotas = [gerador.randint(50, 900) for _ in range(31)]
+        valores = (
+            [codigo, str(nivel), f"01/{mes % 12 + 1:02d}/{ano}", "07:00", "1", str(max(cotas)), str(min(cotas)), str(sum(cotas) // 31)]
+            + [str(cota) for cota in cotas]
+            + ["1", "1", "1"]
+            + ["1"] * 31
+        )
+        linha = ';'.join(valores)
+        linhas.append(linha)
+        tamanho += len(linha) + 1
+        mes += 1
+
+    return ('\n'.join(linhas) + '\n').encode('ISO-8859-1')
+
+class ServidorSimulado:
+    """
+    Servidor HTTP local que imita a página de séries históricas do Hidroweb para
+    medir e testar o downloader sem acessar o snirh.gov.br.
+
+    Serve a página com os mesmos seletores usados em play.py (#mat-input-0,
+    table.mat-table, td.mat-column-id a, td.mat-column-csv button), a API de busca
+    chamada pelo Enter e o endpoint de download do CSV (também usado pelo motor "http").
+    Os ZIPs são sintéticos e fixos por estação; latência, tamanho e falhas são configuráveis.
+    """
+
+    def __init__(self, porta=0, tamanho_kb=64, latencia_ms=150, taxa_falhas=0.0, taxa_inexistentes=0.05, taxa_sem_dados=0.05, semente=None, tamanho_bundle_kb=2048, banda_kbps=0):
+        """
+        Args:
+            porta: Porta local (0 = escolhida pelo sistema)
+            tamanho_kb: Tamanho aproximado do _Cotas.csv dentro de cada ZIP
+            latencia_ms: Atraso de cada resposta da busca e do download (com ±25% de variação)
+            taxa_falhas: Fração dos downloads respondidos com HTTP 503
+            taxa_inexistentes: Fração dos códigos que a busca não encontra
+            taxa_sem_dados: Fração dos códigos encontrados sem CSV (botão desabilitado / HTTP 204)
+            semente: Semente das falhas e da latência (None = aleatória)
+            tamanho_bundle_kb: Tamanho do script da página (o bundle do Angular real tem alguns MB)
+            banda_kbps: Velocidade de envio do script da página (0 = sem limite)
+        """
+        self.tamanho_kb = tamanho_kb
+        self.latencia_ms = latencia_ms
+        self.taxa_falhas = taxa_falhas
+        self.taxa_inexistentes = taxa_inexistentes
+        self.taxa_sem_dados = taxa_sem_dados
+        self.banda_kbps = banda_kbps
+        preenchimento = "/* " + "x" * max(0, tamanho_bundle_kb * 1024 - len(SCRIPT_PAGINA) - 6) + " */"
+        self.bundle = (SCRIPT_PAGINA + preenchimento).encode('utf-8')
+
+        self.contadores = {'paginas': 0, 'bundles': 0, 'metadados': 0, 'buscas': 0, 'downloads': 0, 'falhas': 0, 'bytes': 0}
+        self._aleatorio = random.Random(semente)
+        self._zips = {}
+        self._trava = threading.Lock()
+
+        self._servidor = ThreadingHTTPServer(("127.0.0.1", porta), _ManipuladorSimulado)
+        self._servidor.daemon_threads = True
+        self._servidor.simulacao = self
+        self._thread = None
+
+    @property
+    def url(self):
+        """URL da página de séries históricas (use em HIDROWEB_URL)"""
+        return f"http://127.0.0.1:{self._servidor.server_address[1]}{CAMINHO_PAGINA}"
+
+    @property
+    def url_download(self):
+        """Modelo da URL do CSV com {codigo} (use em HIDROWEB_URL_CSV)"""
+        return f"http://127.0.0.1:{self._servidor.server_address[1]}{CAMINHO_DOWNLOAD}?tipo=3&documentos={{codigo}}"
+
+    def iniciar(self):
+        self._thread = threading.Thread(target=self._servidor.serve_forever, name="servidor-simulado", daemon=True)
+        self._thread.start()
+        return self
+
+    def encerrar(self):
+        self._servidor.shutdown()
+        self._servidor.server_close()
+
+    def situacao(self, codigo):
+        """"inexistente", "sem_dados" ou "disponivel" (fixa por código)"""
+        fracao = fracao_do_codigo(codigo)
+        if fracao < self.taxa_inexistentes:
+            return "inexistente"
+        if fracao < self.taxa_inexistentes + self.taxa_sem_dados:
+            return "sem_dados"
+        return "disponivel"
+
+    def esperar(self):
+        """Simula a latência do servidor real"""
+        if self.latencia_ms:
+            with self._trava:
+                variacao = self._aleatorio.uniform(0.75, 1.25)
+            time.sleep(self.latencia_ms * variacao / 1000)
+
+    def sortear_falha(self):
+        with self._trava:
+            return self._aleatorio.random() < self.taxa_falhas
+
+    def zip_da_estacao(self, codigo):
+        """ZIP da estação, gerado uma vez e reaproveitado (downloads repetidos têm o mesmo conteúdo)"""
+        with self._trava:
+            conteudo = self._zips.get(codigo)
+        if conteudo is not None:
+            return conteudo
+
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as arquivo_zip:
+            arquivo_zip.writestr(f"{codigo}_Cotas.csv", gerar_cotas_csv(codigo, self.tamanho_kb))
+        conteudo = buffer.getvalue()
+
+        with self._trava:
+            self._zips[codigo] = conteudo
+        return conteudo
+
+    def contar(self, chave, quantidade=1):
+        with self._trava:
+            self.contadores[chave] += quantidade
+
+class _ManipuladorSimulado(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, formato, *args):
+        pass  # Sem uma linha de log por requisição
+
+    def do_GET(self):
+        simulacao = self.server.simulacao
+        partes = urlsplit(self.path)
+        parametros = parse_qs(partes.query)
+
+        if partes.path == CAMINHO_PAGINA:
+            simulacao.contar('paginas')
+            simulacao.esperar()
+            self._responder(200, PAGINA_SERIES_HISTORICAS.encode('utf-8'), "text/html; charset=utf-8")
+
+        elif partes.path == CAMINHO_BUNDLE:
+            simulacao.contar('bundles')
+            simulacao.esperar()
+            self._responder(200, simulacao.bundle, "application/javascript", banda_kbps=simulacao.banda_kbps)
+
+        elif partes.path == CAMINHO_METADADOS:
+            simulacao.contar('metadados')
+            simulacao.esperar()
+            corpo = json.dumps({'content': [{'id': 1, 'nome': 'ANA'}, {'id': 2, 'nome': 'CPRM'}]}).encode('utf-8')
+            self._responder(200, corpo, "application/json")
+
+        elif partes.path == CAMINHO_BUSCA:
+            codigo = parametros.get('codigo', [''])[0].strip()
+            simulacao.contar('buscas')
+            simulacao.esperar()
+            situacao = simulacao.situacao(codigo)
+            estacoes = [] if situacao == "inexistente" or not codigo else [
+                {'id': codigo, 'codigoestacao': codigo, 'possuiDados': situacao == "disponivel"}
+            ]
+            corpo = json.dumps({'content': estacoes, 'totalElements': len(estacoes)}).encode('utf-8')
+            self._responder(200, corpo, "application/json")
+
+        elif partes.path == CAMINHO_DOWNLOAD:
+            codigo = parametros.get('documentos', [''])[0].strip()
+            simulacao.esperar()
+            situacao = simulacao.situacao(codigo)
+
+            if situacao == "inexistente" or not codigo:
+                self._responder(404, b"", "text/plain")
+            elif situacao == "sem_dados":
+                self._responder(204, None, "text/plain")
+            elif simulacao.sortear_falha():
+                simulacao.contar('falhas')
+                self._responder(503, b"Servico indisponivel", "text/plain")
+            else:
+                conteudo = simulacao.zip_da_estacao(codigo)
+                simulacao.contar('downloads')
+                simulacao.contar('bytes', len(conteudo))
+                nome = f"Estacao_{codigo}_CSV_{datetime.now().strftime('%Y-%m-%dT%H%M%S')}.zip"
+                self._responder(200, conteudo, "application/zip", {'Content-Disposition': f'attachment; filename="{nome}"'})
+
+        else:
+            self._responder(404, b"", "text/plain")
+
+    def _responder(self, status, corpo, tipo, cabecalhos=None, banda_kbps=0):
+        self.send_response(status)
+        self.send_header("Content-Type", tipo)
+        for nome, valor in (cabecalhos or {}).items():
+            self.send_header(nome, valor)
+        if corpo is not None:
+            self.send_header("Content-Length", str(len(corpo)))
+        self.end_headers()
+        if not corpo:
+            return
+        if not banda_kbps:
+            self.wfile.write(corpo)
+            return
+        # Envio em blocos de 1/10 s para simular um link lento
+        bloco = max(1, banda_kbps * 1024 // 10)
+        for inicio in range(0, len(corpo), bloco):
+            self.wfile.write(corpo[inicio:inicio + bloco])
+            time.sleep(0.1)
+
+if __name__ == "__main__":
+    # Servidor avulso: python -m logica.servidorSimulado --porta 8765 (depois HIDROWEB_URL=<url exibida>)
+    argumentos = argparse.ArgumentParser(description="Hidroweb simulado para testes de carga")
+    argumentos.add_argument("--porta", type=int, default=8765)
+    argumentos.add_argument("--tamanho-kb", type=int, default=64, help="Tamanho aproximado do _Cotas.csv de cada estação")
+    argumentos.add_argument("--latencia-ms", type=int, default=150, help="Atraso de cada resposta da busca e do download")
+    argumentos.add_argument("--taxa-falhas", type=float, default=0.0, help="Fração dos downloads que respondem HTTP 503")
+    argumentos.add_argument("--taxa-inexistentes", type=float, default=0.05)
+    argumentos.add_argument("--taxa-sem-dados", type=float, default=0.05)
+    argumentos.add_argument("--tamanho-bundle-kb", type=int, default=2048, help="Tamanho do script da página")
+    argumentos.add_argument("--banda-kbps", type=int, default=0, help="Velocidade de envio do script (0 = sem limite)")
+    opcoes = argumentos.parse_args()
+
+    servidor = ServidorSimulado(
+        opcoes.porta, opcoes.tamanho_kb, opcoes.latencia_ms, opcoes.taxa_falhas,
+        opcoes.taxa_inexistentes, opcoes.taxa_sem_dados,
+        tamanho_bundle_kb=opcoes.tamanho_bundle_kb, banda_kbps=opcoes.banda_kbps
+    ).iniciar()
+    print(f"🧪 Hidroweb simulado em {servidor.url}")
+    print(f"   HIDROWEB_URL={servidor.url}")
+    print(f"   HIDROWEB_URL_CSV={servidor.url_download}")
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        servidor.encerrar()
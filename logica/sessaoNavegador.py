@@ -0,0 +1,206 @@
+# scripts/logica/sessaoNavegador.py - SESSÃO DE NAVEGADOR PERSISTENTE ENTRE EXECUÇÕES
+from playwright.sync_api import sync_playwright
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from logica.memoriaNavegador import medir_memoria_navegador_mb
+from logica.play import abrir_navegador, criar_pagina, acessar_site, URL_SERIES_HISTORICAS
+
+# Reciclagem padrão da sessão
+MAX_ESTACOES_POR_SESSAO = 500
+LIMITE_MEMORIA_MB = 1500
+TEMPO_OCIOSO_MAX = 30 * 60  # Fecha o navegador após 30 min sem uso
+
+class SessaoNavegador:
+    """
+    Mantém um Chromium com a página de séries históricas aberta entre execuções.
+
+    A API síncrona do Playwright só pode ser usada pela thread que a criou, então a
+    sessão tem uma thread própria e as tarefas são enviadas para ela via executar().
+    O navegador é iniciado sob demanda, verificado antes de cada tarefa e reciclado
+    após max_estacoes estações ou quando a memória ultrapassa limite_memoria_mb.
+    """
+
+    def __init__(self, max_estacoes=MAX_ESTACOES_POR_SESSAO, limite_memoria_mb=LIMITE_MEMORIA_MB, tempo_ocioso_max=TEMPO_OCIOSO_MAX):
+        self.max_estacoes = max_estacoes
+        self.limite_memoria_mb = limite_memoria_mb
+        self.tempo_ocioso_max = tempo_ocioso_max
+
+        self._tarefas = queue.Queue()
+        self._thread = None
+        self._trava = threading.Lock()
+
+        self._playwright = None
+        self._browser = None
+        self._page = None
+        self.estacoes_na_sessao = 0
+        self.reciclagens = 0
+
+    # ---- API pública (qualquer thread) ----
+
+    def executar(self, funcao, num_estacoes=0, troca_pagina=False):
+        """
+        Executa funcao(page) na thread da sessão e retorna seu resultado.
+        num_estacoes é somado ao contador usado para reciclar o navegador.
+        Com troca_pagina, funcao retorna (resultado, página em uso): se ela reciclou a
+        página no meio do caminho, a sessão adota a nova em vez de abrir outra.
+        """
+        futuro = Future()
+        self._garantir_thread()
+        self._tarefas.put((funcao, num_estacoes, troca_pagina, futuro))
+        return futuro.result()
+
+    def aquecer(self):
+        """Inicia o navegador em segundo plano sem aguardar"""
+        self._garantir_thread()
+        self._tarefas.put((None, 0, False, None))
+
+    def encerrar(self, timeout=10):
+        """Fecha o navegador e encerra a thread da sessão"""
+        with self._trava:
+            thread = self._thread
+        if thread is None:
+            return
+        self._tarefas.put(None)
+        thread.join(timeout)
+
+    @property
+    def ativa(self):
+        return self._page is not None
+
+    # ---- Thread da sessão ----
+
+    def _garantir_thread(self):
+        with self._trava:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._loop, daemon=True, name="SessaoNavegador")
+                self._thread.start()
+
+    def _loop(self):
+        try:
+            while True:
+                try:
+                    item = self._tarefas.get(timeout=self.tempo_ocioso_max)
+                except queue.Empty:
+                    if self._page is not None:
+                        print("💤 Sessão do navegador ociosa - fechando")
+                        self._fechar()
+                    continue
+
+                if item is None:
+                    break
+
+                funcao, num_estacoes, troca_pagina, futuro = item
+                try:
+                    page = self._obter_pagina_saudavel()
+                    resultado = funcao(page) if funcao else None
+                    if troca_pagina:
+                        resultado, pagina_atual = resultado
+                        self._adotar_pagina(pagina_atual)
+                    self.estacoes_na_sessao += num_estacoes
+                    if futuro:
+                        futuro.set_result(resultado)
+                except Exception as e:
+                    # Sessão em estado desconhecido: descarta para a próxima tarefa
+                    self._fechar()
+                    if futuro:
+                        futuro.set_exception(e)
+        finally:
+            self._fechar()
+            with self._trava:
+                self._thread = None
+
+    def _iniciar(self):
+        print("🌐 Iniciando sessão persistente do navegador...")
+        self._playwright = sync_playwright().start()
+        self._browser = abrir_navegador(self._playwright)
+        self._page = criar_pagina(self._browser)
+        acessar_site(self._page)
+        self.estacoes_na_sessao = 0
+
+    def _fechar(self):
+        try:
+            if self._browser is not None:
+                self._browser.close()
+        except Exception:
+            pass
+        try:
+            if self._playwright is not None:
+                self._playwright.stop()
+        except Exception:
+            pass
+        self._playwright = None
+        self._browser = None
+        self._page = None
+
+    def _adotar_pagina(self, page):
+        """Passa a usar a página devolvida pela tarefa, fechando o contexto da anterior"""
+        if page is None or page is self._page:
+            return
+        try:
+            if self._page is not None and not self._page.is_closed():
+                self._page.context.close()
+        except Exception:
+            pass
+        self._page = page
+
+    def _precisa_reciclar(self):
+        if self.estacoes_na_sessao >= self.max_estacoes:
+            print(f"♻️ Reciclando sessão após {self.estacoes_na_sessao} estações")
+            return True
+
+        memoria = medir_memoria_navegador_mb()
+        if memoria is not None and memoria > self.limite_memoria_mb:
+            print(f"♻️ Reciclando sessão - memória do navegador em {memoria:.0f} MB")
+            return True
+
+        return False
+
+    def _pagina_saudavel(self):
+        try:
+            if self._page is None or self._page.is_closed() or not self._browser.is_connected():
+                return False
+            self._page.evaluate("1")
+            return True
+        except Exception:
+            return False
+
+    def _obter_pagina_saudavel(self):
+        if self._page is not None and self._page.is_closed() and self._browser.is_connected():
+            # A reciclagem do lote anterior falhou depois de fechar a página: reaproveita o navegador
+            self._page = criar_pagina(self._browser)
+            acessar_site(self._page)
+
+        if self._page is not None and (self._precisa_reciclar() or not self._pagina_saudavel()):
+            self._fechar()
+            self.reciclagens += 1
+
+        if self._page is None:
+            inicio = time.time()
+            self._iniciar()
+            print(f"✅ Sessão pronta em {time.time() - inicio:.1f}s")
+        elif not self._page.url.startswith(URL_SERIES_HISTORICAS):
+            acessar_site(self._page)
+
+        return self._page
+
+# Sessão compartilhada pela interface
+_sessao_global = None
+_trava_global = threading.Lock()
+
+def obter_sessao():
+    """Retorna a sessão global, criando-a na primeira chamada"""
+    global _sessao_global
+    with _trava_global:
+        if _sessao_global is None:
+            _sessao_global = SessaoNavegador()
+        return _sessao_global
+
+def encerrar_sessao():
+    """Encerra a sessão global, se existir"""
+    with _trava_global:
+        sessao = _sessao_global
+    if sessao is not None:
+        sessao.encerrar()
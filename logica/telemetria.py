@@ -0,0 +1,167 @@
+# scripts/logica/telemetria.py - CRONÔMETROS POR FASE E RASTRO DA EXECUÇÃO (JSON LINES)
+import json
+import math
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+from logica.consumo import criar_pasta_base
+
+# Quantos rastros antigos manter na pasta
+MAX_RASTROS = 20
+
+# Ordem das fases no resumo (fases desconhecidas vão para o fim)
+ORDEM_FASES = ('busca', 'tabela', 'validacao', 'botao', 'download', 'analise', 'comparacao', 'movimentacao')
+
+# Retorno de processar_estacao_rapida → resultado gravado no rastro
+RESULTADOS = {True: "baixada", "estacao_inexistente": "inexistente", "estacao_sem_dados": "sem_dados"}
+
+def criar_pasta_rastros():
+    """Pasta dos rastros: Estações_Hidroweb/Scripts/dados/rastros"""
+    pasta = Path(criar_pasta_base()) / "Scripts" / "dados" / "rastros"
+    pasta.mkdir(parents=True, exist_ok=True)
+    return pasta
+
+def percentil(valores, p):
+    """Percentil p (0-100) pelo método do posto mais próximo"""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return None
+    posto = max(1, math.ceil(p / 100 * len(ordenados)))
+    return ordenados[posto - 1]
+
+class CronometroEstacao:
+    """Duração de cada fase de uma tentativa de download (busca, tabela, botão, download, movimentação...)"""
+
+    def __init__(self, codigo, tentativa=1):
+        self.codigo = codigo
+        self.tentativa = tentativa
+        self.fases = {}
+        self.bytes = None
+        self._inicio = time.perf_counter()
+
+    @contextmanager
+    def fase(self, nome):
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.fases[nome] = self.fases.get(nome, 0.0) + time.perf_counter() - inicio
+
+    def registro(self, resultado):
+        return {
+            'codigo': self.codigo,
+            'tentativa': self.tentativa,
+            'resultado': RESULTADOS.get(resultado, "falha"),
+            'total': round(time.perf_counter() - self._inicio, 4),
+            'bytes': self.bytes,
+            'fases': {nome: round(duracao, 4) for nome, duracao in self.fases.items()}
+        }
+
+class RastroExecucao:
+    """
+    Rastro de uma execução em JSON Lines: uma linha por tentativa de estação com as
+    durações de cada fase, bytes baixados e resultado. Ao final, resumo() imprime
+    p50/p95 por fase para mostrar onde o tempo do lote foi gasto.
+    """
+
+    def __init__(self, caminho):
+        self.caminho = Path(caminho)
+        self._trava = threading.Lock()
+        self._registros = []
+        self._arquivo = open(self.caminho, 'a', encoding='utf-8')
+        self._inicio = time.perf_counter()
+        # Segundos do início da execução (antes de abrir o navegador) até o primeiro ZIP salvo
+        self.primeiro_download = None
+
+    @classmethod
+    def criar(cls, tipo_consulta="normal"):
+        pasta = criar_pasta_rastros()
+        rastro = cls(pasta / f"rastro_{datetime.now().strftime('%Y-%m-%dT%H%M%S_%f')}_{tipo_consulta}.jsonl")
+        limpar_rastros_antigos(pasta)
+        return rastro
+
+    def registrar(self, cronometro, resultado):
+        registro = cronometro.registro(resultado)
+        linha = json.dumps(registro, ensure_ascii=False)
+        with self._trava:
+            self._registros.append(registro)
+            if registro['resultado'] == "baixada" and self.primeiro_download is None:
+                self.primeiro_download = time.perf_counter() - self._inicio
+            if not self._arquivo.closed:
+                self._arquivo.write(linha + "\n")
+                self._arquivo.flush()
+
+    def resumo(self):
+        with self._trava:
+            registros = list(self._registros)
+        if not registros:
+            return
+
+        duracoes = {}
+        for registro in registros:
+            for nome, duracao in registro['fases'].items():
+                duracoes.setdefault(nome, []).append(duracao)
+        ordem = [nome for nome in ORDEM_FASES if nome in duracoes] + sorted(set(duracoes) - set(ORDEM_FASES))
+
+        print(f"   🔬 Fases por tentativa (p50 / p95) - {len(registros)} tentativas:")
+        for nome in ordem:
+            valores = duracoes[nome]
+            print(f"      {nome:<13} {percentil(valores, 50):.2f}s / {percentil(valores, 95):.2f}s  ({len(valores)}x)")
+        totais = [registro['total'] for registro in registros]
+        print(f"      {'total':<13} {percentil(totais, 50):.2f}s / {percentil(totais, 95):.2f}s")
+
+        if self.primeiro_download is not None:
+            print(f"   🥇 Primeiro download após {self.primeiro_download:.1f}s (inclui abrir o navegador e o site)")
+
+        baixados = [registro['bytes'] for registro in registros if registro['bytes']]
+        if baixados:
+            print(f"   📦 ZIPs: {len(baixados)} | {sum(baixados) / 1024 / 1024:.1f} MB | p50 {percentil(baixados, 50) / 1024:.0f} KB")
+        print(f"   📝 Rastro: {self.caminho}")
+
+    def fechar(self):
+        with self._trava:
+            self._arquivo.close()
+
+def limpar_rastros_antigos(pasta, manter=MAX_RASTROS):
+    rastros = sorted(Path(pasta).glob("rastro_*.jsonl"))
+    for caminho in rastros[:-manter]:
+        try:
+            caminho.unlink()
+        except OSError:
+            pass
+
+# Rastro da execução em andamento (um por vez, compartilhado por páginas/threads)
+_rastro = None
+_trava_rastro = threading.Lock()
+
+def iniciar_rastro(tipo_consulta="normal"):
+    """Abre o rastro da execução; falha ao criar o arquivo só desativa a telemetria"""
+    global _rastro
+    with _trava_rastro:
+        if _rastro is None:
+            try:
+                _rastro = RastroExecucao.criar(tipo_consulta)
+            except OSError as e:
+                print(f"⚠️ Rastro da execução desativado: {e}")
+        return _rastro
+
+def concluir_cronometro(cronometro, resultado):
+    """Grava a tentativa no rastro em andamento (se houver)"""
+    with _trava_rastro:
+        rastro = _rastro
+    if rastro is not None:
+        rastro.registrar(cronometro, resultado)
+
+def finalizar_rastro():
+    """Imprime p50/p95 por fase e fecha o rastro da execução (se houver)"""
+    global _rastro
+    with _trava_rastro:
+        rastro = _rastro
+        _rastro = None
+    if rastro is None:
+        return
+    rastro.resumo()
+    rastro.fechar()
@@ -0,0 +1,18 @@
+# tests/conftest.py - PASTA DE TESTE ISOLADA E IMPORTS DE logica/*
+import sys
+from pathlib import Path
+
+import pytest
+
+# Os módulos são importados como logica.* a partir da raiz do projeto (como em Interfaces/interface.py)
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+@pytest.fixture(autouse=True)
+def pasta_base(tmp_path, monkeypatch):
+    """Estações_Hidroweb temporária: nenhum teste toca a pasta Downloads real"""
+    pasta = tmp_path / "Estações_Hidroweb"
+    monkeypatch.setenv("HIDROWEB_PASTA_BASE", str(pasta))
+    monkeypatch.delenv("HIDROWEB_STAGING", raising=False)
+    # O cache negativo é um por processo: cada teste carrega o da sua pasta
+    monkeypatch.setattr("logica.cacheNegativo._cache", None)
+    return pasta
@@ -0,0 +1,76 @@
+from logica import agendador
+from logica.agendador import AgendadorTentativas, ControladorConcorrencia, JANELA_CONTROLADOR, LATENCIA_SUSPEITA
+
+def test_agendador_entrega_novas_na_ordem():
+    fila = AgendadorTentativas(["1", "2", "3"], max_tentativas=3)
+    assert [fila.proxima(), fila.proxima(), fila.proxima()] == [("1", 1), ("2", 1), ("3", 1)]
+    assert fila.proxima(timeout=0.01) is None
+    assert not fila.finalizado
+
+def test_agendador_retry_vencido_passa_na_frente(monkeypatch):
+    monkeypatch.setattr(agendador, "calcular_backoff", lambda tentativa: 0.0)
+    fila = AgendadorTentativas(["1", "2"], max_tentativas=3)
+
+    codigo, tentativa = fila.proxima()
+    assert fila.reagendar(codigo, tentativa)
+    assert fila.proxima() == ("1", 2)
+    assert fila.proxima() == ("2", 1)
+
+def test_agendador_desiste_apos_max_tentativas():
+    fila = AgendadorTentativas(["1"], max_tentativas=2)
+    fila.proxima()
+    assert not fila.reagendar("1", 2)
+    assert fila.concluir("1")
+    assert fila.finalizado
+
+def test_agendador_conclui_cada_entrega_uma_vez(monkeypatch):
+    monkeypatch.setattr(agendador, "calcular_backoff", lambda tentativa: 0.0)
+    fila = AgendadorTentativas(["1", "2"], max_tentativas=3)
+    assert not fila.concluir("1")
+
+    fila.proxima()
+    fila.reagendar("1", 1)
+    assert not fila.concluir("1")
+
+    fila.proxima()
+    assert fila.concluir("1")
+    assert not fila.concluir("1")
+    assert not fila.finalizado
+
+def test_agendador_drenar_devolve_pendentes(monkeypatch):
+    monkeypatch.setattr(agendador, "calcular_backoff", lambda tentativa: 60.0)
+    fila = AgendadorTentativas(["1", "2", "3"], max_tentativas=3)
+    fila.proxima()
+    fila.reagendar("1", 1)
+
+    assert sorted(fila.drenar()) == ["1", "2", "3"]
+    assert fila.finalizado
+
+def test_controlador_limita_vagas():
+    controlador = ControladorConcorrencia(maximo=4, inicial=2)
+    assert controlador.tentar_adquirir()
+    assert controlador.tentar_adquirir()
+    assert not controlador.tentar_adquirir()
+
+    controlador.devolver()
+    assert controlador.tentar_adquirir()
+
+def test_controlador_corta_pela_metade_no_erro_e_sobe_com_latencia_saudavel():
+    controlador = ControladorConcorrencia(maximo=4, inicial=2)
+    controlador.tentar_adquirir()
+    controlador.tentar_adquirir()
+
+    controlador.liberar(0.5, False)
+    assert controlador.limite == 1
+    controlador.liberar(0.5, True)
+
+    for _ in range(JANELA_CONTROLADOR):
+        assert controlador.tentar_adquirir()
+        controlador.liberar(0.5, True)
+    assert controlador.limite == 2
+
+def test_controlador_trata_inexistente_lento_como_timeout():
+    controlador = ControladorConcorrencia(maximo=4, inicial=4)
+    controlador.tentar_adquirir()
+    controlador.liberar(LATENCIA_SUSPEITA + 1, "estacao_inexistente")
+    assert controlador.limite == 2
@@ -0,0 +1,44 @@
+from logica.buscaEstacao import classificar_dados_busca, eh_requisicao_da_busca
+
+def test_lista_vazia_e_inexistente():
+    assert classificar_dados_busca({'content': [], 'totalElements': 0}, "123") == "inexistente"
+    assert classificar_dados_busca([], "123") == "inexistente"
+
+def test_registro_com_o_codigo_pesquisado_e_encontrada():
+    dados = {'content': [{'id': 99, 'codigoestacao': "00123", 'possuiDados': True}]}
+    assert classificar_dados_busca(dados, "123") == "encontrada"
+
+def test_possui_dados_falso_e_sem_dados():
+    dados = {'content': [{'id': 99, 'codigoestacao': "123", 'possuiDados': False}]}
+    assert classificar_dados_busca(dados, "123") == "sem_dados"
+
+def test_registro_de_outro_codigo_nao_decide():
+    # Pode ser a resposta de uma busca anterior: quem decide é o DOM
+    assert classificar_dados_busca({'content': [{'codigoestacao': "456"}]}, "123") is None
+
+def test_id_interno_nao_conta_como_codigo():
+    assert classificar_dados_busca({'content': [{'id': "123", 'nome': "Rio"}]}, "123") is None
+
+def test_formato_desconhecido_nao_decide():
+    assert classificar_dados_busca({'mensagem': "erro"}, "123") is None
+    assert classificar_dados_busca("texto", "123") is None
+
+URL_BUSCA = "http://127.0.0.1:8080/hidroweb/rest/api/estacoes"
+
+def test_requisicao_da_busca_compara_o_codigo_por_igualdade():
+    assert eh_requisicao_da_busca(f"{URL_BUSCA}?codigo=1234", None, "1234")
+    assert eh_requisicao_da_busca(f"{URL_BUSCA}?codigoEstacao=01234&page=0", None, "1234")
+    # Resposta atrasada da busca de um código mais longo
+    assert not eh_requisicao_da_busca(f"{URL_BUSCA}?codigo=12345", None, "1234")
+
+def test_requisicao_da_busca_le_o_corpo_json_ou_formulario():
+    assert eh_requisicao_da_busca(URL_BUSCA, '{"filtro": {"codigoestacao": 1234}}', "1234")
+    assert eh_requisicao_da_busca(URL_BUSCA, 'codigo=1234&tipo=1', "1234")
+    assert not eh_requisicao_da_busca(URL_BUSCA, '{"nome": "Rio 1234"}', "1234")
+
+def test_so_a_listagem_de_estacoes_conta_como_busca():
+    assert not eh_requisicao_da_busca(
+        "http://127.0.0.1:8080/hidroweb/rest/api/documento/convencionais?tipo=3&documentos=1234", None, "1234"
+    )
+    assert not eh_requisicao_da_busca("http://127.0.0.1:8080/hidroweb/rest/api/entidades?codigo=1234", None, "1234")
+    assert not eh_requisicao_da_busca("http://127.0.0.1:8080/analytics/collect?codigo=1234", None, "1234")
@@ -0,0 +1,61 @@
+from datetime import datetime, timedelta
+
+from logica.cacheNegativo import CacheNegativo
+
+def envelhecer(cache, codigo, horas):
+    verificado_em = datetime.now() - timedelta(hours=horas)
+    cache._codigos[codigo]['verificado_em'] = verificado_em.isoformat(timespec='seconds')
+
+def test_negativo_vale_ate_o_ttl(tmp_path):
+    cache = CacheNegativo(tmp_path / "cache_negativo.json")
+    cache.registrar("1", "inexistente")
+    assert cache.situacao("1", ttl_horas=24) == "inexistente"
+
+    envelhecer(cache, "1", 48)
+    assert cache.situacao("1", ttl_horas=24) is None
+    assert cache.situacao("1", ttl_horas=72) == "inexistente"
+
+def test_ttl_zero_desativa_o_cache(tmp_path):
+    cache = CacheNegativo(tmp_path / "cache_negativo.json")
+    cache.registrar("1", "sem_dados")
+    assert cache.situacao("1", ttl_horas=0) is None
+
+def test_separar_preserva_a_ordem(tmp_path):
+    cache = CacheNegativo(tmp_path / "cache_negativo.json")
+    cache.registrar("2", "inexistente")
+    cache.registrar("4", "sem_dados")
+    assert cache.separar(["1", "2", "3", "4"], ttl_horas=24) == (["1", "3"], ["2"], ["4"])
+
+def test_atualizar_grava_e_remove_estacoes_baixadas(tmp_path):
+    caminho = tmp_path / "cache_negativo.json"
+    cache = CacheNegativo(caminho)
+    cache.atualizar({'inexistentes': ["1"], 'sem_dados': ["2"], 'baixadas': []})
+    cache.atualizar({'inexistentes': [], 'sem_dados': [], 'baixadas': ["2"]})
+
+    relido = CacheNegativo(caminho)
+    assert relido.situacao("1", ttl_horas=24) == "inexistente"
+    assert relido.situacao("2", ttl_horas=24) is None
+
+def test_salvar_preserva_codigos_gravados_por_outro_processo(tmp_path):
+    caminho = tmp_path / "cache_negativo.json"
+    primeiro = CacheNegativo(caminho)
+    segundo = CacheNegativo(caminho)
+
+    primeiro.registrar("1", "inexistente")
+    primeiro.salvar()
+    segundo.registrar("2", "inexistente")
+    segundo.salvar()
+
+    relido = CacheNegativo(caminho)
+    assert relido.separar(["1", "2"], ttl_horas=24) == ([], ["1", "2"], [])
+
+def test_negativo_nao_confirmado_fica_fora_do_cache(tmp_path):
+    cache = CacheNegativo(tmp_path / "cache_negativo.json")
+    cache.marcar_nao_confirmado("1")
+    cache.atualizar({'inexistentes': ["1", "2"], 'sem_dados': [], 'baixadas': []})
+    assert cache.situacao("1", ttl_horas=24) is None
+    assert cache.situacao("2", ttl_horas=24) == "inexistente"
+
+    # A marca vale só para a execução em que foi feita
+    cache.atualizar({'inexistentes': ["1"], 'sem_dados': [], 'baixadas': []})
+    assert cache.situacao("1", ttl_horas=24) == "inexistente"
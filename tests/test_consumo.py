@@ -0,0 +1,110 @@
+import os
+import time
+
+import pytest
+
+from logica.consumo import (
+    IndiceEstacoes, listar_estacoes_baixadas, ordenar_por_tamanho, separar_estacoes_frescas, verificar_arquivo_mais_recente
+)
+
+def criar_zip(pasta, nome, conteudo=b'PK'):
+    caminho = os.path.join(pasta, nome)
+    with open(caminho, 'wb') as f:
+        f.write(conteudo)
+    return caminho
+
+def mudar_mtime_pasta(pasta):
+    """Simula outra alteração na pasta com mtime garantidamente diferente (a resolução do sistema de arquivos pode ser grossa)"""
+    mtime = os.stat(pasta).st_mtime_ns + 1_000_000
+    os.utime(pasta, ns=(mtime, mtime))
+
+@pytest.fixture
+def pasta(tmp_path):
+    return str(tmp_path)
+
+def test_indice_agrupa_versoes_por_codigo(pasta):
+    criar_zip(pasta, "Estacao_1_CSV_2024-01-01T100000.zip")
+    criar_zip(pasta, "Estacao_1_CSV_2024-02-01T100000.zip", b'PK' * 10)
+    criar_zip(pasta, "Estacao_2_CSV_2024-01-05T100000.zip")
+    criar_zip(pasta, "anotacoes.txt")
+    indice = IndiceEstacoes(pasta)
+
+    assert sorted(indice.codigos()) == ["1", "2"]
+    assert len(indice.versoes("1")) == 2
+    assert indice.mais_recente("1")['nome'] == "Estacao_1_CSV_2024-02-01T100000.zip"
+    assert indice.mais_recente("1")['tamanho'] == 20
+    assert indice.versoes("3") == []
+
+def test_indice_percebe_alteracao_externa(pasta):
+    indice = IndiceEstacoes(pasta)
+    assert indice.codigos() == []
+
+    criar_zip(pasta, "Estacao_7_CSV_2024-01-01T100000.zip")
+    mudar_mtime_pasta(pasta)
+    assert indice.codigos() == ["7"]
+
+def test_indice_adota_alteracao_propria_sem_varrer(pasta, monkeypatch):
+    indice = IndiceEstacoes(pasta)
+    indice.codigos()
+
+    marca = indice.marca()
+    caminho = criar_zip(pasta, "Estacao_1_CSV_2024-01-01T100000.zip")
+    indice.adicionar(caminho, marca)
+
+    monkeypatch.setattr(indice, "recarregar", lambda: pytest.fail("não deveria varrer a pasta"))
+    assert indice.codigos() == ["1"]
+
+    marca = indice.marca()
+    os.remove(caminho)
+    indice.remover(caminho, marca)
+    assert indice.codigos() == []
+
+def test_indice_invalida_quando_outro_processo_mexeu_antes(pasta):
+    indice = IndiceEstacoes(pasta)
+    indice.codigos()
+
+    # Outro processo grava depois da última leitura e antes da nossa operação
+    criar_zip(pasta, "Estacao_9_CSV_2024-01-01T100000.zip")
+    mudar_mtime_pasta(pasta)
+
+    marca = indice.marca()
+    caminho = criar_zip(pasta, "Estacao_1_CSV_2024-01-01T100000.zip")
+    indice.adicionar(caminho, marca)
+
+    assert sorted(indice.codigos()) == ["1", "9"]
+
+def test_indice_sem_marca_refaz_na_proxima_leitura(pasta):
+    indice = IndiceEstacoes(pasta)
+    indice.codigos()
+    caminho = criar_zip(pasta, "Estacao_1_CSV_2024-01-01T100000.zip")
+    criar_zip(pasta, "Estacao_2_CSV_2024-01-01T100000.zip")
+    indice.adicionar(caminho)
+    assert sorted(indice.codigos()) == ["1", "2"]
+
+def test_funcoes_de_consulta_usam_o_indice(pasta):
+    criar_zip(pasta, "Estacao_1_CSV_2024-01-01T100000.zip")
+    criar_zip(pasta, "Estacao_1_CSV_2024-03-01T100000.zip")
+
+    info = verificar_arquivo_mais_recente(pasta, "1")
+    assert info['nome'] == "Estacao_1_CSV_2024-03-01T100000.zip"
+    assert sorted(e['data'] for e in listar_estacoes_baixadas(pasta)) == ["2024-01-01", "2024-03-01"]
+
+def test_frescas_sao_as_baixadas_dentro_do_ttl(pasta):
+    criar_zip(pasta, "Estacao_1_CSV_2024-01-01T100000.zip")
+    antigo = criar_zip(pasta, "Estacao_2_CSV_2024-01-01T100000.zip")
+    dois_dias = time.time() - 48 * 3600
+    os.utime(antigo, (dois_dias, dois_dias))
+
+    assert separar_estacoes_frescas(["3", "2", "1"], pasta, ttl_horas=24) == (["3", "2"], ["1"])
+    assert separar_estacoes_frescas(["3", "2", "1"], pasta, ttl_horas=0) == (["3", "2", "1"], [])
+
+def test_ordem_pelo_tamanho_dos_downloads_anteriores(pasta):
+    criar_zip(pasta, "Estacao_1_CSV_2024-01-01T100000.zip", b'PK')
+    criar_zip(pasta, "Estacao_2_CSV_2024-01-01T100000.zip", b'PK' * 5)
+    criar_zip(pasta, "Estacao_3_CSV_2024-01-01T100000.zip", b'PK' * 10)
+    estacoes = ["1", "4", "2", "3"]
+
+    # A estação 4 nunca foi baixada: vale a mediana das conhecidas (a 2)
+    assert ordenar_por_tamanho(estacoes, pasta, "maiores_primeiro") == ["3", "4", "2", "1"]
+    assert ordenar_por_tamanho(estacoes, pasta, "menores_primeiro") == ["1", "4", "2", "3"]
+    assert ordenar_por_tamanho(estacoes, pasta, "original") == estacoes
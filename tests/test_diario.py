@@ -0,0 +1,39 @@
+from logica.diario import DiarioExecucao, carregar_ultima_execucao_incompleta, descartar_ultima_execucao
+
+def test_retomada_oferece_pendentes_e_falhas_na_ordem():
+    diario = DiarioExecucao.criar(["1", "2", "3", "4"])
+    diario.registrar("1", "baixada")
+    diario.registrar("2", "falhou", 3)
+    diario.registrar("4", "inexistente")
+    diario.finalizar(concluido=False)
+
+    info = carregar_ultima_execucao_incompleta()
+    assert info['pendentes'] == ["2", "3"]
+    assert info['resultados'] == {"1": "baixada", "2": "falhou", "4": "inexistente"}
+
+def test_retomada_tolera_ultima_linha_truncada():
+    diario = DiarioExecucao.criar(["1", "2"])
+    diario.registrar("1", "baixada")
+    diario.finalizar(concluido=False)
+    with open(diario.caminho, 'a', encoding='utf-8') as f:
+        f.write('{"tipo": "estacao", "codigo": "2", "resul')
+
+    assert carregar_ultima_execucao_incompleta()['pendentes'] == ["2"]
+
+def test_lote_concluido_ou_descartado_nao_e_oferecido():
+    diario = DiarioExecucao.criar(["1"])
+    diario.finalizar()
+    assert carregar_ultima_execucao_incompleta() is None
+
+    diario = DiarioExecucao.criar(["1", "2"])
+    diario.finalizar(concluido=False)
+    descartar_ultima_execucao()
+    assert carregar_ultima_execucao_incompleta() is None
+
+def test_ouvinte_recebe_cada_resultado():
+    recebidos = []
+    diario = DiarioExecucao.criar(["1"])
+    diario.adicionar_ouvinte(lambda codigo, resultado: recebidos.append((codigo, resultado)))
+    diario.registrar("1", "sem_dados")
+    diario.finalizar()
+    assert recebidos == [("1", "sem_dados")]
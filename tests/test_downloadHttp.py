@@ -0,0 +1,103 @@
+import threading
+
+import pytest
+
+from logica import agendador, downloadHttp
+from logica.consumo import obter_indice
+from logica.diario import DiarioExecucao
+from logica.downloadHttp import baixar_estacoes_http
+from logica.loteEstacoes import MAX_TENTATIVAS
+from logica.servidorSimulado import ServidorSimulado
+
+CODIGOS = ["10000001", "10000002", "10000003"]
+
+@pytest.fixture(autouse=True)
+def sem_backoff(monkeypatch):
+    monkeypatch.setattr(agendador, "calcular_backoff", lambda tentativa: 0.0)
+
+@pytest.fixture
+def iniciar_servidor():
+    servidores = []
+
+    def iniciar(**opcoes):
+        opcoes.setdefault('latencia_ms', 0)
+        opcoes.setdefault('tamanho_kb', 4)
+        opcoes.setdefault('taxa_inexistentes', 0.0)
+        opcoes.setdefault('taxa_sem_dados', 0.0)
+        servidor = ServidorSimulado(semente=1, **opcoes).iniciar()
+        servidores.append(servidor)
+        return servidor
+
+    yield iniciar
+    for servidor in servidores:
+        servidor.encerrar()
+
+def baixar(servidor, estacoes=CODIGOS, **opcoes):
+    return baixar_estacoes_http(estacoes, num_conexoes=2, url_download=servidor.url_download, **opcoes)
+
+def baixar_sem_travar(servidor, **opcoes):
+    """Um item nunca concluído deixa os trabalhadores girando: o lote tem que terminar em segundos"""
+    resultado = {}
+    thread = threading.Thread(target=lambda: resultado.update(baixar(servidor, **opcoes)), daemon=True)
+    thread.start()
+    thread.join(timeout=15)
+    assert not thread.is_alive(), "o lote não terminou"
+    return resultado
+
+def test_estacoes_disponiveis_sao_baixadas(iniciar_servidor):
+    servidor = iniciar_servidor()
+    resultado = baixar(servidor)
+
+    assert sorted(resultado['baixadas']) == CODIGOS
+    assert resultado['falharam'] == resultado['inexistentes'] == resultado['sem_dados'] == []
+    for codigo in CODIGOS:
+        assert obter_indice(resultado['pasta_destino']).versoes(codigo)
+
+def test_http_404_e_inexistente(iniciar_servidor):
+    resultado = baixar(iniciar_servidor(taxa_inexistentes=1.0))
+    assert sorted(resultado['inexistentes']) == CODIGOS
+    assert resultado['baixadas'] == []
+
+def test_http_204_e_sem_dados(iniciar_servidor):
+    resultado = baixar(iniciar_servidor(taxa_sem_dados=1.0))
+    assert sorted(resultado['sem_dados']) == CODIGOS
+    assert resultado['baixadas'] == []
+
+def test_http_503_volta_para_a_fila(iniciar_servidor):
+    servidor = iniciar_servidor()
+    falhas = iter([True])
+    servidor.sortear_falha = lambda: next(falhas, False)
+
+    resultado = baixar(servidor, ["10000001"])
+    assert resultado['baixadas'] == ["10000001"]
+    assert servidor.contadores['falhas'] == 1
+
+def test_http_503_persistente_falha_apos_max_tentativas(iniciar_servidor):
+    servidor = iniciar_servidor(taxa_falhas=1.0)
+    resultado = baixar(servidor, ["10000001"])
+
+    assert resultado['falharam'] == ["10000001"]
+    assert servidor.contadores['falhas'] == MAX_TENTATIVAS
+
+def test_download_repetido_com_mesmo_conteudo_mantem_o_arquivo(iniciar_servidor):
+    servidor = iniciar_servidor()
+    baixar(servidor, ["10000001"])
+    pasta = baixar(servidor, ["10000001"])['pasta_destino']
+    assert len(obter_indice(pasta).versoes("10000001")) == 1
+
+def test_erro_ao_registrar_resolve_a_estacao_como_falha(iniciar_servidor, monkeypatch):
+    def registrar_com_erro(*args, **kwargs):
+        raise RuntimeError("falha simulada")
+    monkeypatch.setattr(downloadHttp, "registrar_resultado_lote", registrar_com_erro)
+
+    resultado = baixar_sem_travar(iniciar_servidor())
+    assert sorted(resultado['falharam']) == CODIGOS
+
+def test_diario_com_erro_nao_trava_o_lote(iniciar_servidor, monkeypatch):
+    diario = DiarioExecucao.criar(CODIGOS)
+    def gravar_com_erro(registro):
+        raise OSError("disco cheio")
+    monkeypatch.setattr(diario, "_gravar", gravar_com_erro)
+
+    resultado = baixar_sem_travar(iniciar_servidor(), diario=diario)
+    assert sorted(resultado['baixadas']) == CODIGOS
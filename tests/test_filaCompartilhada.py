@@ -0,0 +1,16 @@
+from logica.filaCompartilhada import FilaCompartilhada, situacao_da_fila
+from logica.loteEstacoes import INEXISTENTE_NAO_CONFIRMADA
+
+def test_negativo_nao_confirmado_atravessa_a_fila(tmp_path):
+    fila = FilaCompartilhada(str(tmp_path / "fila.db"))
+    lote = fila.criar_lote(["1", "2", "3"], "normal", str(tmp_path))
+    situacoes = {"1": situacao_da_fila(True), "2": situacao_da_fila("estacao_inexistente"),
+                 "3": situacao_da_fila(INEXISTENTE_NAO_CONFIRMADA)}
+    for _ in situacoes:
+        item = fila.reservar("teste", lote)
+        fila.concluir(lote, item['codigo'], situacoes[item['codigo']])
+
+    assert fila.resultados(lote) == (["1"], [], ["2", "3"], [])
+    assert fila.nao_confirmadas(lote) == ["3"]
+    assert sorted(fila.concluidas(lote)) == [("1", "baixada"), ("2", "inexistente"), ("3", "inexistente")]
+    fila.fechar()
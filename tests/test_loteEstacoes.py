@@ -0,0 +1,22 @@
+from logica.cacheNegativo import obter_cache_negativo
+from logica.loteEstacoes import (
+    INEXISTENTE_NAO_CONFIRMADA, SEM_DADOS_NAO_CONFIRMADA, criar_lote_agendado, finalizar_lote, registrar_resultado_lote
+)
+
+def resolver(lote, resultados):
+    for codigo, resultado in resultados.items():
+        assert lote['agendador'].proxima() == (codigo, 1)
+        registrar_resultado_lote(lote, codigo, resultado, 1)
+    return finalizar_lote(lote)
+
+def test_negativos_do_dom_entram_no_resultado_mas_nao_no_cache():
+    lote = criar_lote_agendado(["1", "2", "3", "4"])
+    baixadas, falharam, inexistentes, sem_dados = resolver(lote, {
+        "1": "estacao_inexistente", "2": INEXISTENTE_NAO_CONFIRMADA,
+        "3": "estacao_sem_dados", "4": SEM_DADOS_NAO_CONFIRMADA,
+    })
+    assert (baixadas, falharam, inexistentes, sem_dados) == ([], [], ["1", "2"], ["3", "4"])
+
+    cache = obter_cache_negativo()
+    cache.atualizar({'inexistentes': inexistentes, 'sem_dados': sem_dados, 'baixadas': baixadas})
+    assert cache.separar(["1", "2", "3", "4"], ttl_horas=24) == (["2", "4"], ["1"], ["3"])
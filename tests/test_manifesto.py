@@ -0,0 +1,31 @@
+import zipfile
+
+from logica.manifesto import ManifestoDownloads, analisar_zip_estacao
+
+def criar_zip_estacao(pasta, codigo, cotas=b'cotas'):
+    caminho = pasta / f"Estacao_{codigo}_CSV_2024-01-01T100000.zip"
+    with zipfile.ZipFile(caminho, 'w') as zip_ref:
+        zip_ref.writestr(f"{codigo}_Cotas.csv", cotas)
+    return str(caminho)
+
+def test_marcar_carregadas_registra_estacao_sem_entrada(tmp_path):
+    caminho_zip = criar_zip_estacao(tmp_path, "1")
+    manifesto = ManifestoDownloads(tmp_path)
+    assert manifesto.precisa_carregar("1")
+
+    manifesto.marcar_carregadas(["1"], {"1": caminho_zip})
+    assert not manifesto.precisa_carregar("1")
+    assert manifesto.obter("1")['arquivo'] == "Estacao_1_CSV_2024-01-01T100000.zip"
+
+    # Gravado em disco: a próxima execução também pula a estação
+    assert not ManifestoDownloads(tmp_path).precisa_carregar("1")
+
+def test_conteudo_novo_volta_a_precisar_carregar(tmp_path):
+    manifesto = ManifestoDownloads(tmp_path)
+    manifesto.marcar_carregadas(["1"], {"1": criar_zip_estacao(tmp_path, "1")})
+
+    pasta_nova = tmp_path / "novo"
+    pasta_nova.mkdir()
+    novo_zip = criar_zip_estacao(pasta_nova, "1", b'cotas atualizadas')
+    manifesto.registrar("1", "novo.zip", analisar_zip_estacao(novo_zip))
+    assert manifesto.precisa_carregar("1")